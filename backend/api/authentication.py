@@ -0,0 +1,84 @@
+from django.core.cache import cache
+from django.db import router
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+
+from core.fragments import cache_is_shared, fragment_versions
+from core.models import User
+
+# The columns request.user is built from; everything else loads on first access
+AUTH_USER_FIELDS = ('id', 'username', 'role', 'is_active', 'is_staff', 'is_superuser', 'account_locked', 'locked_until')
+AUTH_CACHE_TIMEOUT = 3600
+# With a per-process cache, other workers' version bumps never arrive: a locked
+# or deactivated user is only seen there once the cached row expires
+LOCAL_AUTH_CACHE_TIMEOUT = 5
+
+
+def resolve_user(user_id):
+    """The user with ``user_id`` built from a small cached row, or None if there is no such user.
+
+    Entries are keyed by the user's fragment version, which every save, lock
+    and login replaces, so a changed user is read from the database again.
+    That only holds across workers with a shared cache; otherwise entries
+    expire after ``LOCAL_AUTH_CACHE_TIMEOUT`` seconds.
+    Other columns are deferred and load together on first access.
+    """
+    version = fragment_versions(User._meta.label_lower, [user_id])[user_id]
+    key = f'auth-user:{user_id}:{version}'
+    values = cache.get(key)
+    if values is None:
+        values = User.objects.filter(pk=user_id).values_list(*_auth_columns()).first()
+        if values is None:
+            return None
+        cache.set(key, values, AUTH_CACHE_TIMEOUT if cache_is_shared() else LOCAL_AUTH_CACHE_TIMEOUT)
+    return User.from_db(router.db_for_read(User), _auth_columns(), values)
+
+
+def _auth_columns():
+    # Model.from_db() takes a partial row in concrete field order
+    return tuple(field.attname for field in User._meta.concrete_fields if field.attname in AUTH_USER_FIELDS)
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    """JWT authentication that resolves ``request.user`` from the auth cache instead of a query.
+
+    Tokens of locked accounts are rejected as well as those of inactive ones.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.CHECK_REVOKE_TOKEN or api_settings.USER_ID_FIELD != 'id':
+            # Needs columns the cache doesn't hold
+            return super().get_user(validated_token)
+        try:
+            user_id = int(validated_token[api_settings.USER_ID_CLAIM])
+        except (KeyError, TypeError, ValueError):
+            raise InvalidToken(_('Token contained no recognizable user identification'))
+
+        user = resolve_user(user_id)
+        if user is None:
+            raise AuthenticationFailed(_('User not found'), code='user_not_found')
+        if not user.is_active:
+            raise AuthenticationFailed(_('User is inactive'), code='user_inactive')
+        if user.is_account_locked():
+            raise AuthenticationFailed(_('Account is locked'), code='user_locked')
+        return user
+
+
+class QueryTokenJWTAuthentication(CachedJWTAuthentication):
+    """JWT authentication that also accepts the access token as ``?token=``.
+
+    Browser APIs such as EventSource and navigator.sendBeacon cannot set an
+    Authorization header, so endpoints built for them allow the query param.
+    """
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is not None:
+            return result
+        raw_token = request.query_params.get('token')
+        if not raw_token:
+            return None
+        validated_token = self.get_validated_token(raw_token.encode('utf-8'))
+        return self.get_user(validated_token), validated_token
@@ -0,0 +1,225 @@
+"""Compiled read path for list endpoints.
+
+``compile_serializer()`` turns a serializer, after any sparse fieldset has
+been applied, into a plan that builds each item straight from ``.values()``
+rows. The plan fetches columns by path and flattens joined nested serializers
+into the same row. Each field's conversion is resolved once, so no model
+instances or per-row field lookups are needed. Related objects that need their own query are
+fetched with one query per relation and rendered by their regular
+serializer: ``many=True`` relations, and nested serializers with
+annotations or method fields.
+
+The output is identical to the regular serializer's; ``core.tests`` holds
+the parity checks. Serializers the plan can't express return None, and
+callers fall back to the regular path.
+"""
+from collections import defaultdict
+
+from django.db.models.fields.files import FieldFile
+from rest_framework import serializers
+from rest_framework.response import Response
+
+from .query_planner import _model_field, _plan, plan_queryset
+from .serializers import FragmentCacheMixin
+
+# Serializer fields whose to_representation() returns database values unchanged
+PASSTHROUGH_FIELDS = (
+    serializers.IntegerField, serializers.CharField, serializers.EmailField,
+    serializers.ChoiceField, serializers.BooleanField, serializers.IPAddressField,
+)
+
+
+class NotCompilable(Exception):
+    pass
+
+
+def compile_serializer(serializer):
+    """A CompiledSerializer for ``serializer``, or None if it has to use the regular path"""
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+    try:
+        return CompiledSerializer(serializer)
+    except NotCompilable:
+        return None
+
+
+class CompiledSerializer:
+    def __init__(self, serializer):
+        self.model = serializer.Meta.model
+        self.columns = []
+        self.annotations = {}
+        self.lookups = []
+        self.extras = dict(getattr(serializer, 'compiled_extras', {}))
+        if _overrides_representation(serializer) and not self.extras:
+            raise NotCompilable
+        self.readers = self._compile(serializer)
+
+    def rows(self, queryset, required=()):
+        """``queryset`` as the ``.values()`` rows ``render()`` expects; ``required`` adds columns"""
+        queryset = queryset.prefetch_related(None)
+        missing = {name: value for name, value in self.annotations.items() if name not in queryset.query.annotations}
+        if missing:
+            queryset = queryset.annotate(**missing)
+        extras = [name for name in self.extras if name in queryset.query.extra_select]
+        return queryset.values(*dict.fromkeys([*self.columns, *extras, *required]))
+
+    def render(self, rows):
+        """Serialized items for ``rows``, as the regular serializer would return them"""
+        rows = list(rows)
+        state = {}
+        for lookup in self.lookups:
+            lookup(rows, state)
+        items = []
+        for row in rows:
+            item = {key: read(row, state) for key, read in self.readers}
+            for name, render_extra in self.extras.items():
+                if row.get(name) is not None:
+                    item[name] = render_extra(row[name])
+            items.append(item)
+        return items
+
+    def _compile(self, serializer, prefix=''):
+        """(key, reader) pairs for ``serializer`` on rows whose columns start with ``prefix``"""
+        if getattr(serializer, 'prefetched_fields', None):
+            raise NotCompilable
+        model = serializer.Meta.model
+        annotated = getattr(serializer, 'annotated_fields', {})
+        readers = []
+        for name, field in serializer.fields.items():
+            if field.write_only:
+                continue
+            if name in annotated:
+                if prefix:
+                    raise NotCompilable
+                self.annotations[name] = annotated[name]
+                readers.append((name, self._column(name)))
+                continue
+
+            model_field = _model_field(model, field)
+            if model_field is None:
+                raise NotCompilable
+            if isinstance(field, (serializers.ListSerializer, serializers.ManyRelatedField)):
+                if prefix or not model_field.one_to_many:
+                    raise NotCompilable
+                readers.append((name, self._many(model, model_field, field)))
+            elif isinstance(field, serializers.ModelSerializer):
+                readers.append((name, self._nested(prefix, model_field, field)))
+            elif isinstance(field, serializers.PrimaryKeyRelatedField):
+                if field.pk_field is not None:
+                    raise NotCompilable
+                readers.append((name, self._column(prefix + model_field.attname)))
+            elif model_field.concrete and not model_field.is_relation:
+                readers.append((name, self._column(prefix + model_field.attname, _converter(field, model_field))))
+            else:
+                raise NotCompilable
+        return readers
+
+    def _column(self, path, convert=None):
+        self.columns.append(path)
+        if convert is None:
+            return lambda row, state: row[path]
+        return lambda row, state: None if row[path] is None else convert(row[path])
+
+    def _nested(self, prefix, model_field, field):
+        """A nested serializer on a foreign key: joined into the row when possible, else looked up"""
+        key = prefix + model_field.attname
+        self.columns.append(key)
+
+        select, prefetch, annotations, _ = _plan(field)
+        if not prefetch and not annotations and not _overrides_representation(field):
+            mark = len(self.columns)
+            try:
+                readers = self._compile(field, f'{prefix}{model_field.name}__')
+            except NotCompilable:
+                del self.columns[mark:]
+            else:
+                def read(row, state):
+                    if row[key] is None:
+                        return None
+                    return {name: read_field(row, state) for name, read_field in readers}
+                return read
+
+        def lookup(rows, state):
+            ids = {row[key] for row in rows} - {None}
+            objs = list(plan_queryset(field.Meta.model._default_manager.filter(pk__in=ids), field))
+            if isinstance(field, FragmentCacheMixin):
+                field.prefetch_fragments(objs)
+            state[lookup] = {obj.pk: field.to_representation(obj) for obj in objs}
+
+        self.lookups.append(lookup)
+        return lambda row, state: None if row[key] is None else state[lookup].get(row[key])
+
+    def _many(self, model, model_field, field):
+        """A reverse foreign key, fetched for the whole page in one query and grouped by parent"""
+        pk = model._meta.pk.attname
+        self.columns.append(pk)
+        remote = model_field.field
+
+        def lookup(rows, state):
+            ids = {row[pk] for row in rows}
+            queryset = model_field.related_model._default_manager.filter(**{f'{remote.name}__in': ids})
+            groups = defaultdict(list)
+            if isinstance(field, serializers.ManyRelatedField):
+                for parent, value in queryset.values_list(remote.attname, 'pk'):
+                    groups[parent].append(value)
+            else:
+                objs = list(plan_queryset(queryset, field.child, required=[remote.name]))
+                if isinstance(field.child, FragmentCacheMixin):
+                    field.child.prefetch_fragments(objs)
+                for obj in objs:
+                    groups[getattr(obj, remote.attname)].append(field.child.to_representation(obj))
+            state[lookup] = groups
+
+        self.lookups.append(lookup)
+        return lambda row, state: state[lookup].get(row[pk], [])
+
+
+def _overrides_representation(serializer):
+    # Fragment caching changes where values come from, not what they are
+    return type(serializer).to_representation not in (
+        serializers.Serializer.to_representation, FragmentCacheMixin.to_representation,
+    )
+
+
+def _converter(field, model_field):
+    """The conversion to apply to non-null column values of ``field``; None if they pass through"""
+    if type(field) in PASSTHROUGH_FIELDS:
+        return None
+    if isinstance(field, serializers.JSONField) and not field.binary:
+        return None
+    if isinstance(field, serializers.FileField):
+        return lambda name: field.to_representation(FieldFile(None, model_field, name))
+    return field.to_representation
+
+
+class CompiledListMixin:
+    """Serve ``list()`` from the compiled read path.
+
+    Set ``compiled_list = False`` on a viewset to switch it back to the
+    regular serializer. ``compiled_required`` names columns the paginator
+    reads from each row.
+    """
+    compiled_list = True
+    compiled_required = ()
+
+    def get_compiled_serializer(self):
+        if not self.compiled_list:
+            return None
+        return compile_serializer(self.get_serializer())
+
+    def list(self, request, *args, **kwargs):
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return super().list(request, *args, **kwargs)
+        rows = compiled.rows(self.filter_queryset(self.get_queryset()), required=self.compiled_required)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(compiled.render(page))
+        return Response(compiled.render(rows))
+
+    def list_data(self, queryset):
+        """Serialized items of ``queryset`` without pagination, compiled when possible"""
+        compiled = self.get_compiled_serializer()
+        if compiled is None:
+            return self.get_serializer(queryset, many=True).data
+        return compiled.render(compiled.rows(queryset))
@@ -0,0 +1,70 @@
+"""Conditional GET: ETag / Last-Modified validators checked before any serialization runs."""
+import hashlib
+
+from django.db.models import Max, Q
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import http_date, quote_etag
+
+from core.access import visible_projects
+from core.models import SyncChange, TaskAccess
+
+
+def make_etag(request, *parts):
+    """Weak ETag for this user, URL (including page/cursor params) and state ``parts``"""
+    key = ':'.join(str(part) for part in (request.user.pk, request.get_full_path(), *parts))
+    return 'W/' + quote_etag(hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+
+def collection_state(user):
+    """Per-user collection version: the latest journal entry touching anything the user can see.
+
+    Every task, project and membership write appends to the SyncChange journal,
+    and so do comment writes and user edits for the rows that embed them, so
+    this changes whenever a task or project list for the user could differ.
+    Returns ``(version, last_modified)``.
+    """
+    state = SyncChange.objects.filter(
+        Q(project_id__in=visible_projects(user).values('id')) | Q(user_id=user.pk)
+        # Assignees and creators keep their tasks after leaving the project
+        | Q(entity_type='task', entity_id__in=TaskAccess.objects.filter(user=user).values('task_id'))
+    ).aggregate(version=Max('id'), last_modified=Max('timestamp'))
+    return state['version'] or 0, state['last_modified']
+
+
+def conditional_response(request, etag, last_modified=None):
+    """Return a 304 response if the client's validators still match, otherwise None"""
+    timestamp = int(last_modified.timestamp()) if last_modified else None
+    return get_conditional_response(request, etag=etag, last_modified=timestamp)
+
+
+def set_validators(response, etag, last_modified=None):
+    if response.status_code not in (200, 304):
+        return response
+    response['ETag'] = etag
+    if last_modified:
+        response['Last-Modified'] = http_date(last_modified.timestamp())
+    # Representations are per user: shared caches must not reuse them
+    response['Cache-Control'] = 'private, no-cache'
+    patch_vary_headers(response, ('Authorization',))
+    return response
+
+
+class ConditionalGetMixin:
+    """Answer If-None-Match / If-Modified-Since on list and retrieve with 304 before querying rows"""
+
+    def get_validators(self, request):
+        version, last_modified = collection_state(request.user)
+        return make_etag(request, version), last_modified
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, render, request, *args, **kwargs):
+        etag, last_modified = self.get_validators(request)
+        response = conditional_response(request, etag, last_modified)
+        if response is None:
+            response = render(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
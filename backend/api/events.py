@@ -1,17 +1,44 @@
-from rest_framework.decorators import api_view, permission_classes
+from rest_framework.decorators import api_view, authentication_classes, permission_classes
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from django.db.models import Count, Q
 from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 import json
-from datetime import timedelta
+from collections import defaultdict
+from datetime import timedelta, timezone as dt_timezone
 from core.models import AnalyticsEvent, User, Project, Task
+from core import analytics_buffer
+from core.rollups import event_counts
+from core.task_metrics import task_time_metrics
+from core.access import visible_projects, visible_tasks
+from core.project_stats import project_analytics
 from .serializers import AnalyticsEventSerializer
+from .pagination import EventKeysetPagination
+from .query_planner import plan_queryset
+from .compiled import compile_serializer
+from .authentication import QueryTokenJWTAuthentication
+
+MAX_BATCH_EVENTS = 5000
+EVENT_TYPES = {choice for choice, _ in AnalyticsEvent.EVENT_TYPES}
+ENTITY_TYPE_MAX_LENGTH = AnalyticsEvent._meta.get_field('entity_type').max_length
+
+# Dashboard activity buckets
+BUCKET_SIZES = {'hour': timedelta(hours=1), 'day': timedelta(days=1), 'week': timedelta(weeks=1)}
+BUCKET_LABELS = {'hour': '%Y-%m-%dT%H:00', 'day': '%Y-%m-%d', 'week': '%Y-%m-%d'}
+MAX_PERIODS = 366
+# Summary windows; far larger values overflow the date arithmetic
+MAX_DAYS = 3650
 
 @api_view(["POST"])
 @permission_classes([IsAuthenticated])
 def create_event(request):
-    """Create a new analytics event"""
+    """Create a new analytics event.
+
+    Responds 201 with the stored event, as before, when the event is written
+    synchronously. With the write-behind buffer on it responds 202: the event
+    carries its ``timestamp`` but ``id`` is null until the buffer flushes it.
+    """
     user = request.user
     data = request.data
     
@@ -21,20 +48,127 @@ def create_event(request):
         if field not in data:
             return Response({'status': 'error', 'message': f'Missing required field: {field}'}, status=400)
     
-    # Create event
-    event = AnalyticsEvent.objects.create(
-        user=user,
-        event_type=data['event_type'],
-        entity_type=data['entity_type'],
-        entity_id=data['entity_id'],
-        metadata=data.get('metadata', {}),
-        ip_address=request.META.get('REMOTE_ADDR'),
-        user_agent=request.META.get('HTTP_USER_AGENT', '')
+    # Validate before queueing; the buffered write happens after the response
+    serializer = AnalyticsEventSerializer(data={
+        'event_type': data['event_type'],
+        'entity_type': data['entity_type'],
+        'entity_id': data['entity_id'],
+        'metadata': data.get('metadata', {}),
+        'ip_address': request.META.get('REMOTE_ADDR'),
+        'user_agent': request.META.get('HTTP_USER_AGENT', ''),
+    })
+    if not serializer.is_valid():
+        return Response({'status': 'error', 'message': serializer.errors}, status=400)
+
+    event = analytics_buffer.emit(user=user, **serializer.validated_data)
+    if event is None:
+        return Response({'status': 'error', 'message': 'Analytics queue is full, retry later'}, status=503)
+    return Response(
+        {'status': 'success', 'data': AnalyticsEventSerializer(event).data},
+        status=201 if event.pk else 202,
     )
-    
-    # Serialize event
-    serialized_event = AnalyticsEventSerializer(event).data
-    return Response({'status': 'success', 'data': serialized_event}, status=201)
+
+@api_view(["POST"])
+@authentication_classes([QueryTokenJWTAuthentication])
+@permission_classes([IsAuthenticated])
+def create_event_batch(request):
+    """Ingest many analytics events in one request.
+
+    The body is a JSON array or ``{"events": [...]}``, or NDJSON (one event
+    per line) when sent as ``application/x-ndjson`` or with ``?ndjson=1``.
+    ``text/plain`` is read like JSON, and the token may be passed as
+    ``?token=``, so ``navigator.sendBeacon`` can post without a preflight.
+    Valid events are written with a single ``bulk_create``; invalid ones are
+    reported by index.
+    """
+    content_type = request.content_type.split(';')[0].strip()
+    ndjson = content_type == 'application/x-ndjson' or request.query_params.get('ndjson') == '1'
+    try:
+        items = _load_batch(request.body, ndjson)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
+    if len(items) > MAX_BATCH_EVENTS:
+        return Response({'status': 'error', 'message': f'At most {MAX_BATCH_EVENTS} events per batch'}, status=400)
+
+    user = request.user
+    now = timezone.now()
+    ip_address = request.META.get('REMOTE_ADDR')
+    user_agent = request.META.get('HTTP_USER_AGENT', '')
+    events, errors = [], []
+    for index, item in enumerate(items):
+        try:
+            fields = _validate_batch_event(item, now)
+        except ValueError as e:
+            errors.append({'index': index, 'error': str(e)})
+            continue
+        event = AnalyticsEvent(user=user, ip_address=ip_address, user_agent=user_agent, **fields)
+        event.promote_metadata()
+        events.append(event)
+
+    if events:
+        AnalyticsEvent.objects.bulk_create(events)
+    return Response({'status': 'success', 'accepted': len(events), 'rejected': len(errors), 'errors': errors})
+
+
+def _load_batch(body, ndjson):
+    """Decode a batch body into a list of items; NDJSON lines that don't parse are kept as errors"""
+    try:
+        text = body.decode('utf-8')
+    except UnicodeDecodeError:
+        raise ValueError('Body must be UTF-8')
+    if ndjson:
+        items = []
+        for line in text.splitlines():
+            if not line.strip():
+                continue
+            try:
+                items.append(json.loads(line))
+            except json.JSONDecodeError:
+                items.append(None)
+        return items
+    try:
+        data = json.loads(text)
+    except json.JSONDecodeError as e:
+        raise ValueError(f'Invalid JSON: {e}')
+    if isinstance(data, dict) and 'events' in data:
+        data = data['events']
+    if not isinstance(data, list):
+        raise ValueError('Expected a list of events')
+    return data
+
+
+def _validate_batch_event(item, now):
+    if not isinstance(item, dict):
+        raise ValueError('Event must be a JSON object')
+    event_type = item.get('event_type')
+    if event_type not in EVENT_TYPES:
+        raise ValueError(f'Invalid event_type: {event_type}')
+    entity_type = item.get('entity_type')
+    if not isinstance(entity_type, str) or not entity_type or len(entity_type) > ENTITY_TYPE_MAX_LENGTH:
+        raise ValueError('Invalid entity_type')
+    entity_id = item.get('entity_id')
+    if isinstance(entity_id, bool) or not isinstance(entity_id, (int, str)):
+        raise ValueError('Invalid entity_id')
+    try:
+        entity_id = int(entity_id)
+    except ValueError:
+        raise ValueError('Invalid entity_id')
+    metadata = item.get('metadata', {})
+    if not isinstance(metadata, dict):
+        raise ValueError('metadata must be an object')
+
+    fields = {'event_type': event_type, 'entity_type': entity_type, 'entity_id': entity_id, 'metadata': metadata}
+    # Beacons are often sent well after the interaction; keep the client's time when it is sane
+    if item.get('timestamp'):
+        timestamp = parse_datetime(str(item['timestamp']))
+        if timestamp is None:
+            raise ValueError('Invalid timestamp')
+        if timezone.is_naive(timestamp):
+            timestamp = timezone.make_aware(timestamp, dt_timezone.utc)
+        if timestamp > now + timedelta(minutes=5):
+            raise ValueError('timestamp is in the future')
+        fields['timestamp'] = timestamp
+    return fields
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
@@ -60,128 +194,200 @@ def get_events(request):
         events = events.filter(event_type=event_type)
     if entity_type:
         events = events.filter(entity_type=entity_type)
+    context = {'request': request}
+    serializer = AnalyticsEventSerializer(context=context)
+    events = plan_queryset(events, serializer, required=EventKeysetPagination.ordering_fields)
+
+    # Rows are built straight from .values() when the (sparse) serializer allows it
+    compiled = compile_serializer(serializer)
+    if compiled is not None:
+        events = compiled.rows(events, required=('id', *EventKeysetPagination.ordering_fields))
+
+    def serialize(rows):
+        if compiled is not None:
+            return compiled.render(rows)
+        return AnalyticsEventSerializer(rows, many=True, context=context).data
+    
+    # Opt-in keyset pagination: ?cursor= for the first page, then follow next/previous
+    if EventKeysetPagination.cursor_query_param in request.query_params:
+        paginator = EventKeysetPagination()
+        page = paginator.paginate_queryset(events, request)
+        return Response({
+            'status': 'success',
+            'data': serialize(page),
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link(),
+        })
     
     # Order by timestamp
     events = events.order_by('-timestamp')
     
     # Serialize events
-    serialized_events = AnalyticsEventSerializer(events, many=True).data
+    serialized_events = serialize(events)
     return Response({'status': 'success', 'data': serialized_events})
 
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_dashboard_analytics(request):
-    """Get dashboard analytics data"""
+    """Get dashboard analytics data.
+
+    ``days`` sets the summary window (default 30). Activity over time covers the
+    last ``periods`` buckets (default 7) of ``granularity``: hour, day or week.
+    Counts come from the analytics rollups, so long windows stay cheap.
+    """
     user = request.user
-    days = int(request.GET.get('days', 30))
-    
-    # Set time range
-    start_date = timezone.now() - timedelta(days=days)
-    
-    # Get events in time range
-    events = AnalyticsEvent.objects.filter(
-        user=user,
-        timestamp__gte=start_date
-    )
-    
-    # Task events
-    task_events = events.filter(entity_type='task')
-    task_created = task_events.filter(event_type='task_created').count()
-    task_completed = task_events.filter(event_type='task_completed').count()
-    task_moved = task_events.filter(event_type='task_moved').count()
-    
-    # Project events
-    project_events = events.filter(entity_type='project')
-    project_created = project_events.filter(event_type='project_created').count()
-    
-    # Activity over time (last 7 days)
-    activity_data = []
-    for i in range(7):
-        date = timezone.now() - timedelta(days=i)
-        day_start = date.replace(hour=0, minute=0, second=0, microsecond=0)
-        day_end = day_start + timedelta(days=1)
-        
-        day_events = events.filter(timestamp__gte=day_start, timestamp__lt=day_end)
-        activity_data.append({
-            'date': day_start.strftime('%Y-%m-%d'),
-            'events': day_events.count(),
-            'task_created': day_events.filter(event_type='task_created').count(),
-            'task_completed': day_events.filter(event_type='task_completed').count(),
-        })
-    
-    # Event type distribution
-    event_distribution = events.values('event_type').annotate(count=Count('id'))
-    
-    # Most active projects
-    project_activity = events.filter(
-        entity_type='project'
-    ).values('entity_id').annotate(count=Count('id')).order_by('-count')[:5]
-    
-    # Add project names
-    for item in project_activity:
-        try:
-            project = Project.objects.get(id=item['entity_id'])
-            item['project_name'] = project.name
-        except Project.DoesNotExist:
-            item['project_name'] = 'Unknown Project'
-    
+    try:
+        days = _days_param(request)
+        granularity, periods = _bucket_params(request, default_periods=7)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
+
+    now = timezone.now()
+    start_date = now - timedelta(days=days)
+    buckets = _bucket_starts(now, granularity, periods)
+
+    # Both reads come from the hourly/daily rollups plus the not yet rolled up tail
+    summary = {'task_created': 0, 'task_completed': 0, 'task_moved': 0, 'project_created': 0, 'total_events': 0}
+    distribution = defaultdict(int)
+    project_counts = defaultdict(int)
+    for row in event_counts(user, start_date, ('event_type', 'entity_type', 'project_id')):
+        event_type = row['event_type']
+        summary['total_events'] += row['count']
+        distribution[event_type] += row['count']
+        if row['entity_type'] == 'task' and event_type in ('task_created', 'task_completed', 'task_moved'):
+            summary[event_type] += row['count']
+        elif row['entity_type'] == 'project':
+            project_counts[row['project_id']] += row['count']
+            if event_type == 'project_created':
+                summary[event_type] += row['count']
+
+    activity = {bucket: {'events': 0, 'task_created': 0, 'task_completed': 0} for bucket in buckets}
+    for row in event_counts(user, buckets[-1], ('event_type',), granularity=granularity):
+        counts = activity.get(row['bucket'])
+        if counts is not None:
+            counts['events'] += row['count']
+            if row['event_type'] in counts:
+                counts[row['event_type']] += row['count']
+
+    activity_data = [
+        {'date': bucket.strftime(BUCKET_LABELS[granularity]), **counts}
+        for bucket, counts in activity.items()
+    ]
+
+    # Most active projects, named with one extra query
+    top_projects = sorted(project_counts.items(), key=lambda item: item[1], reverse=True)[:5]
+    projects = Project.objects.only('name').in_bulk([project_id for project_id, _ in top_projects])
+    project_activity = [
+        {
+            'entity_id': project_id,
+            'count': count,
+            'project_name': projects[project_id].name if project_id in projects else 'Unknown Project',
+        }
+        for project_id, count in top_projects
+    ]
+
     return Response({'status': 'success', 'data': {
-        'summary': {
-            'task_created': task_created,
-            'task_completed': task_completed,
-            'task_moved': task_moved,
-            'project_created': project_created,
-            'total_events': events.count()
-        },
+        'summary': summary,
+        'granularity': granularity,
         'activity_over_time': activity_data,
-        'event_distribution': list(event_distribution),
-        'most_active_projects': list(project_activity)
+        'event_distribution': [{'event_type': event_type, 'count': count} for event_type, count in distribution.items()],
+        'most_active_projects': project_activity
     }})
 
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_project_analytics(request, project_id):
+    """Analytics for one project the user can see.
+
+    Covers the status breakdown, overdue counts, per-member workload and, over
+    the last ``periods`` buckets of ``granularity`` (default 30 days),
+    throughput and burndown. Results are cached until the next task write.
+    """
+    project = visible_projects(request.user).filter(pk=project_id).first()
+    if project is None:
+        return Response({'status': 'error', 'message': 'Project not found'}, status=404)
+    try:
+        granularity, periods = _bucket_params(request, default_periods=30)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
+
+    buckets = _bucket_starts(timezone.now(), granularity, periods)
+    return Response({'status': 'success', 'data': project_analytics(project, buckets, granularity)})
+
+
+def _days_param(request, default=30):
+    """``?days=`` as an int between 0 and MAX_DAYS; raises ValueError with the message to return"""
+    try:
+        days = int(request.GET.get('days', default))
+    except ValueError:
+        raise ValueError('days must be an integer')
+    if not 0 <= days <= MAX_DAYS:
+        raise ValueError(f'days must be between 0 and {MAX_DAYS}')
+    return days
+
+
+def _bucket_params(request, default_periods):
+    """``(granularity, periods)`` from the query string; raises ValueError with the message to return"""
+    try:
+        periods = int(request.GET.get('periods', default_periods))
+    except ValueError:
+        raise ValueError('periods must be an integer')
+    granularity = request.GET.get('granularity', 'day')
+    if granularity not in BUCKET_SIZES:
+        raise ValueError(f'granularity must be one of: {", ".join(BUCKET_SIZES)}')
+    if not 1 <= periods <= MAX_PERIODS:
+        raise ValueError(f'periods must be between 1 and {MAX_PERIODS}')
+    return granularity, periods
+
+
+def _bucket_starts(now, granularity, periods):
+    """Start of the current bucket and the ``periods - 1`` before it, newest first"""
+    current = now.replace(minute=0, second=0, microsecond=0)
+    if granularity != 'hour':
+        current = current.replace(hour=0)
+    if granularity == 'week':
+        current -= timedelta(days=current.weekday())
+    return [current - BUCKET_SIZES[granularity] * i for i in range(periods)]
+
 @api_view(["GET"])
 @permission_classes([IsAuthenticated])
 def get_task_analytics(request):
-    """Get task-specific analytics"""
+    """Get task-specific analytics.
+
+    Lead time (created to done) and cycle time (first in-progress to done) are
+    reported in hours with p50/p90/p99 per priority, assignee and project, for
+    visible tasks completed in the last ``days`` days.
+    """
     user = request.user
-    days = int(request.GET.get('days', 30))
-    
+    try:
+        days = _days_param(request)
+    except ValueError as e:
+        return Response({'status': 'error', 'message': str(e)}, status=400)
+
     # Set time range
     start_date = timezone.now() - timedelta(days=days)
     
-    # Get task events
-    task_events = AnalyticsEvent.objects.filter(
-        user=user,
-        entity_type='task',
-        timestamp__gte=start_date
-    )
-    
-    # Task status changes
-    status_changes = task_events.filter(event_type='task_moved').values('metadata').annotate(count=Count('id'))
-    
-    # Task completion rate by priority
-    completed_tasks = task_events.filter(event_type='task_completed')
-    completion_by_priority = {}
-    
-    for event in completed_tasks:
-        priority = event.metadata.get('priority', 'unknown')
-        if priority not in completion_by_priority:
-            completion_by_priority[priority] = 0
-        completion_by_priority[priority] += 1
-    
-    # Average time to complete tasks
-    created_tasks = task_events.filter(event_type='task_created')
-    completed_tasks = task_events.filter(event_type='task_completed')
+    # Task event counts from the rollups
+    status_changes = defaultdict(int)
+    totals = defaultdict(int)
+    for row in event_counts(user, start_date, ('event_type', 'to_status'), entity_type='task'):
+        totals[row['event_type']] += row['count']
+        if row['event_type'] == 'task_moved':
+            status_changes[row['to_status']] += row['count']
     
-    # This is a simplified calculation - in a real app you'd want to match created/completed events
-    avg_completion_time = 0
-    if completed_tasks.count() > 0:
-        # For now, just return the count - proper calculation would require matching events
-        avg_completion_time = completed_tasks.count()
+    metrics = task_time_metrics(visible_tasks(user).filter(completed_at__gte=start_date))
+    completion_by_priority = {item['priority']: item['count'] for item in metrics['lead_time']['by_priority']}
     
     return Response({'status': 'success', 'data': {
-        'status_changes': list(status_changes),
+        'status_changes': [
+            {'metadata': {'to_status': to_status} if to_status else {}, 'count': count}
+            for to_status, count in status_changes.items()
+        ],
         'completion_by_priority': completion_by_priority,
-        'avg_completion_time': avg_completion_time,
-        'total_tasks_created': created_tasks.count(),
-        'total_tasks_completed': completed_tasks.count()
+        'avg_completion_time': metrics['lead_time']['overall']['mean'],
+        'lead_time': metrics['lead_time'],
+        'cycle_time': metrics['cycle_time'],
+        'total_tasks_created': totals['task_created'],
+        'total_tasks_completed': totals['task_completed']
     }})
@@ -0,0 +1,28 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from core.activity import activity_tracker
+from core.analytics_buffer import analytics_buffer
+from core.broker import broker
+from core.ratelimit import login_rate_limiter
+from core.revocation import revocation_list
+
+
+@api_view(["GET"])
+@permission_classes([IsAdminUser])
+def get_metrics(request):
+    """Counters of this worker process's background components, for staff users.
+
+    Every process keeps its own counters; behind several workers each request
+    reports whichever worker served it.
+    """
+    return Response({
+        'status': 'success',
+        'data': {
+            'analytics_buffer': analytics_buffer.counters(),
+            'activity_tracker': activity_tracker.counters(),
+            'token_revocation': revocation_list.counters(),
+            'change_stream': broker.counters(),
+            'login_rate_limits': login_rate_limiter.counters(),
+        },
+    })
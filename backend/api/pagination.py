@@ -0,0 +1,172 @@
+import base64
+import json
+
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class StandardResultsSetPagination(PageNumberPagination):
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+
+
+class KeysetPagination(BasePagination):
+    """Cursor pagination over a stable (field, id) ordering.
+
+    Each page is fetched with a ``WHERE (field, id) < (value, id)`` range
+    condition instead of ``OFFSET``, and no ``COUNT`` is run, so page N costs
+    the same as page 1 when a matching composite index exists.
+    """
+    page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    ordering_fields = ('created_at',)
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(request)
+        self.field = self.ordering.lstrip('-')
+        descending = self.ordering.startswith('-')
+
+        position = self.decode_cursor(request, queryset.model)
+        self.has_cursor = position is not None
+        reverse = bool(position and position['reverse'])
+
+        # Walking backwards flips the sort order; rows are re-reversed below
+        fetch_descending = descending != reverse
+        prefix = '-' if fetch_descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if position is not None:
+            lookup = 'lt' if fetch_descending else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': position['value']})
+                | Q(**{self.field: position['value'], f'id__{lookup}': position['id']})
+            )
+
+        rows = list(queryset[:self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[:self.page_size]
+        if reverse:
+            rows.reverse()
+
+        self.has_next = has_more if not reverse else True
+        self.has_previous = has_more if reverse else self.has_cursor
+        self.rows = rows
+        return rows
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request):
+        ordering = request.query_params.get(self.ordering_query_param, '')
+        if ordering.lstrip('-') in self.ordering_fields:
+            return ordering
+        return self.default_ordering
+
+    def decode_cursor(self, request, model):
+        """Return the position encoded in the cursor param, or None for the first page"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            padded = encoded + '=' * (-len(encoded) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+            if data['o'] != self.ordering:
+                raise ValueError('cursor ordering mismatch')
+            value = model._meta.get_field(self.field).to_python(data['v'])
+            return {'value': value, 'id': int(data['id']), 'reverse': bool(data.get('r'))}
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, row, reverse=False):
+        value = _row_value(row, self.field)
+        data = {
+            'o': self.ordering,
+            'v': value.isoformat() if hasattr(value, 'isoformat') else value,
+            'id': _row_value(row, 'id'),
+        }
+        if reverse:
+            data['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(data, separators=(',', ':')).encode('ascii'))
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded.decode('ascii').rstrip('='))
+
+    def get_next_link(self):
+        if not self.has_next or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.rows:
+            return None
+        return self.encode_cursor(self.rows[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+
+class OptionalKeysetPagination(StandardResultsSetPagination):
+    """Page-number pagination that switches to ``keyset_class`` when a ``cursor`` param is sent.
+
+    Clients opt in by requesting ``?cursor=`` for the first page and then
+    following the ``next``/``previous`` links.
+    """
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class TaskKeysetPagination(KeysetPagination):
+    ordering_fields = ('created_at', 'due_date')
+    default_ordering = '-created_at'
+
+
+class TaskPagination(OptionalKeysetPagination):
+    keyset_class = TaskKeysetPagination
+
+
+class EventKeysetPagination(KeysetPagination):
+    ordering_fields = ('timestamp',)
+    default_ordering = '-timestamp'
+    max_page_size = 500
+
+
+class NotificationKeysetPagination(KeysetPagination):
+    ordering_fields = ('created_at',)
+    default_ordering = '-created_at'
+
+
+def _row_value(row, name):
+    if isinstance(row, dict):
+        return row[name]
+    return getattr(row, name)
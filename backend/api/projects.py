@@ -5,30 +5,34 @@ from rest_framework.permissions import IsAuthenticated
 from rest_framework.exceptions import PermissionDenied
 from django.db.models import Q
 from core.models import Project, ProjectMember, User, Task
-from .serializers import ProjectSerializer, ProjectMemberSerializer
+from core.access import visible_projects
+from core.counters import project_counter
+from .serializers import ProjectSerializer, ProjectListSerializer, ProjectMemberSerializer
+from .query_planner import plan_queryset
+from .conditional import ConditionalGetMixin
 import json
-from core.models import AnalyticsEvent
+from core import analytics_buffer
 
-class ProjectViewSet(viewsets.ModelViewSet):
+class ProjectViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Project.objects.all()
     serializer_class = ProjectSerializer
     permission_classes = [IsAuthenticated]
 
+    def get_serializer_class(self):
+        # ?view=slim: bounded rows with member ids and a capped preview instead of full members
+        if self.action == 'list' and self.request.query_params.get('view') == 'slim':
+            return ProjectListSerializer
+        return super().get_serializer_class()
+
     def get_queryset(self):
         """Filter projects by user membership and role
         - Scrum Masters can see all projects they created or are members of
         - Employees can only see projects they are assigned to as members
         """
-        user = self.request.user
-        
-        # For employees, only show projects they're assigned to
-        if hasattr(user, 'role') and user.role == 'employee':
-            return Project.objects.filter(members__user=user).distinct()
-        
-        # For scrum masters and other roles, show all relevant projects
-        return Project.objects.filter(
-            Q(created_by=user) | Q(members__user=user)
-        ).distinct()
+        qs = visible_projects(self.request.user)
+        if self.action in ('list', 'retrieve'):
+            qs = plan_queryset(qs, self.get_serializer())
+        return qs
 
     def perform_create(self, serializer):
         """Only Scrum Masters or superusers can create projects; set the creator and add as member."""
@@ -42,7 +46,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
         
         # Emit analytics event
         try:
-            AnalyticsEvent.objects.create(
+            analytics_buffer.emit(
                 user=user,
                 event_type='project_created',
                 entity_type='project',
@@ -66,8 +70,9 @@ class ProjectViewSet(viewsets.ModelViewSet):
         project = self.get_object()
         from .serializers import TaskSerializer
         if request.method.lower() == 'get':
-            tasks = project.tasks.all()
-            return Response(TaskSerializer(tasks, many=True).data)
+            context = self.get_serializer_context()
+            tasks = plan_queryset(Task.objects.filter(project=project), TaskSerializer(context=context))
+            return Response(TaskSerializer(tasks, many=True, context=context).data)
         # POST create
         if not hasattr(request.user, 'role') or request.user.role != 'scrum_master':
             return Response({'error': 'Only Scrum Masters can create tasks'}, status=status.HTTP_403_FORBIDDEN)
@@ -135,7 +140,7 @@ class ProjectViewSet(viewsets.ModelViewSet):
     def members_list(self, request, pk=None):
         """Get all members of the project"""
         project = self.get_object()
-        members = ProjectMember.objects.filter(project=project)
+        members = ProjectMember.objects.filter(project=project).select_related('user')
         return Response(ProjectMemberSerializer(members, many=True).data)
     
     @action(detail=True, methods=['get'])
@@ -165,11 +170,12 @@ class ProjectViewSet(viewsets.ModelViewSet):
         """Get project analytics"""
         project = self.get_object()
         
-        # Basic project statistics
-        total_tasks = project.tasks.count()
-        completed_tasks = project.tasks.filter(status='done').count()
-        in_progress_tasks = project.tasks.filter(status='in-progress').count()
-        todo_tasks = project.tasks.filter(status='todo').count()
+        # Basic project statistics from the denormalized counter row
+        counter = project_counter(project)
+        total_tasks = counter.total
+        completed_tasks = counter.done
+        in_progress_tasks = counter.in_progress
+        todo_tasks = counter.todo
         
         # Calculate progress percentage
         progress = (completed_tasks / total_tasks * 100) if total_tasks > 0 else 0
@@ -0,0 +1,121 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.db.models import Count, IntegerField, OuterRef, Prefetch, Subquery
+from django.db.models.functions import Coalesce
+from rest_framework import serializers
+
+
+def related_count(model, field):
+    """Correlated COUNT subquery over ``model`` rows whose ``field`` points at the outer row"""
+    counts = (
+        model._default_manager.filter(**{field: OuterRef('pk')})
+        .order_by()
+        .values(field)
+        .annotate(count=Count('pk'))
+        .values('count')
+    )
+    return Coalesce(Subquery(counts, output_field=IntegerField()), 0)
+
+
+def plan_queryset(queryset, serializer, required=()):
+    """Add the joins, prefetches and annotations needed to render ``serializer``.
+
+    Only fields that will actually be serialized are planned:
+    - nested serializers on a foreign key become ``select_related`` joins,
+      or a ``Prefetch`` with its own planned queryset when they need more
+      than joins themselves
+    - nested ``many=True`` serializers become a planned ``Prefetch``, and
+      related fields rendered as primary keys a prefetch of just the keys
+    - fields listed in the serializer's ``annotated_fields`` become
+      ``annotate()`` calls, so method fields read a value instead of querying
+    - fields listed in the serializer's ``prefetched_fields`` add that
+      ``Prefetch``, for method fields that read a prefetched ``to_attr``
+    - when the serializer renders a sparse fieldset (``sparse_fields``), the
+      query loads only the columns behind those fields, plus ``required``
+    """
+    select, prefetch, annotations, columns = _plan(serializer)
+    if annotations:
+        queryset = queryset.annotate(**annotations)
+    if select:
+        queryset = queryset.select_related(*select)
+    if prefetch:
+        queryset = queryset.prefetch_related(*prefetch)
+    if columns is not None:
+        queryset = queryset.only(*columns, *required)
+    return queryset
+
+
+def _plan(serializer):
+    """Return (select_related paths, prefetches, annotations, columns) for a serializer.
+
+    ``columns`` is None unless the serializer renders a sparse fieldset and
+    every rendered field maps onto known model columns.
+    """
+    if isinstance(serializer, serializers.ListSerializer):
+        serializer = serializer.child
+
+    select = []
+    prefetch = []
+    annotations = {}
+    model = serializer.Meta.model
+    columns = [model._meta.pk.name] if getattr(serializer, 'sparse_fields', None) is not None else None
+    declared = getattr(serializer, 'annotated_fields', {})
+    prefetched = getattr(serializer, 'prefetched_fields', {})
+
+    for name, field in serializer.fields.items():
+        if field.write_only:
+            continue
+        if name in declared:
+            annotations[name] = declared[name]
+            continue
+        if name in prefetched:
+            prefetch.append(prefetched[name])
+            continue
+        model_field = _model_field(model, field)
+        if model_field is None:
+            # Computed from the instance in ways the planner can't see
+            columns = None
+            continue
+
+        path = '__'.join(field.source_attrs)
+        if isinstance(field, serializers.ListSerializer):
+            if isinstance(field.child, serializers.ModelSerializer):
+                queryset = plan_queryset(
+                    field.child.Meta.model._default_manager.all(), field.child, required=_remote_columns(model_field)
+                )
+                prefetch.append(Prefetch(path, queryset=queryset))
+        elif isinstance(field, serializers.ManyRelatedField):
+            queryset = model_field.related_model._default_manager.only('pk', *_remote_columns(model_field))
+            prefetch.append(Prefetch(path, queryset=queryset))
+        elif isinstance(field, serializers.ModelSerializer):
+            child_select, child_prefetch, child_annotations, child_columns = _plan(field)
+            if child_prefetch or child_annotations:
+                prefetch.append(Prefetch(path, queryset=plan_queryset(field.Meta.model._default_manager.all(), field)))
+                if columns is not None:
+                    columns.append(path)
+            else:
+                select.append(path)
+                select.extend(f'{path}__{related}' for related in child_select)
+                if columns is not None:
+                    # A joined model with no listed columns is loaded in full
+                    columns.extend([f'{path}__{column}' for column in child_columns] if child_columns else [path])
+        elif columns is not None and model_field.concrete:
+            columns.append(model_field.name)
+
+    return select, prefetch, annotations, columns
+
+
+def _model_field(model, field):
+    """The model field behind a serializer field with a plain one-step source, if any"""
+    if field.source == '*' or len(field.source_attrs) != 1:
+        return None
+    try:
+        return model._meta.get_field(field.source_attrs[0])
+    except FieldDoesNotExist:
+        return None
+
+
+def _remote_columns(model_field):
+    """Columns a prefetched reverse relation needs to be matched back to its parent"""
+    if model_field.one_to_many:
+        return [model_field.field.name]
+    return []
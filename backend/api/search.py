@@ -0,0 +1,71 @@
+"""Task search backed by the SQLite FTS5 index, with a LIKE fallback."""
+import html
+import re
+
+from django.db import connections
+from django.db.models import Exists, OuterRef, Q
+
+from core.models import TaskComment
+
+FTS_TABLE = 'core_task_fts'
+
+# bm25 weights for the title, description and comments columns
+RANK_WEIGHTS = (10.0, 5.0, 1.0)
+
+# Control characters wrapped around matches by snippet(); swapped for <mark>
+# tags after the snippet text has been HTML-escaped
+MATCH_START = '\x02'
+MATCH_END = '\x03'
+
+_fts_tables = {}
+
+
+def fts_available(using='default'):
+    """Whether the task FTS table exists on this database connection"""
+    if using not in _fts_tables:
+        connection = connections[using]
+        _fts_tables[using] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_tables[using]
+
+
+def build_match_query(text):
+    """Turn free text into an FTS5 query where every word is a required prefix"""
+    terms = re.findall(r'\w+', text, re.UNICODE)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def search_tasks(queryset, text):
+    """Filter tasks matching ``text`` in their title, description or comments.
+
+    On SQLite the FTS5 index is joined in and each row is annotated with a
+    bm25 ``search_rank`` (lower is better) and a highlighted ``search_snippet``.
+    """
+    if not fts_available(queryset.db):
+        comments = TaskComment.objects.filter(task=OuterRef('pk'), content__icontains=text)
+        return queryset.filter(
+            Q(title__icontains=text) | Q(description__icontains=text) | Exists(comments)
+        )
+
+    match = build_match_query(text)
+    if not match:
+        return queryset.none()
+
+    weights = ', '.join(str(weight) for weight in RANK_WEIGHTS)
+    table = queryset.model._meta.db_table
+    return queryset.extra(
+        select={
+            'search_rank': f'bm25({FTS_TABLE}, {weights})',
+            'search_snippet': f"snippet({FTS_TABLE}, -1, '{MATCH_START}', '{MATCH_END}', '…', 12)",
+        },
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.rowid = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match],
+    )
+
+
+def render_snippet(snippet):
+    """HTML-escape an FTS snippet and wrap the matched terms in <mark> tags"""
+    return html.escape(snippet).replace(MATCH_START, '<mark>').replace(MATCH_END, '</mark>')
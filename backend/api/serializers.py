@@ -1,16 +1,225 @@
+import hashlib
+from collections import OrderedDict
+
 from rest_framework import serializers
+from rest_framework.fields import SkipField
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.relations import PKOnlyObject
 from django.contrib.auth.password_validation import validate_password
-from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db import models
+from django.utils.functional import cached_property
+from django.db.models import F, Prefetch, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from core.models import User, Project, Task, ProjectMember, TaskComment, TaskAttachment, Notification, AnalyticsEvent
 from core.validators import validate_password_strength
+from core.counters import project_counter
+from core.fragments import FRAGMENT_TIMEOUT, cache_is_shared, fragment_versions
+from .query_planner import related_count
+from .search import render_snippet
+
+
+def parse_field_paths(value):
+    """Parse ``a,b.c,b.d`` into ``{'a': {}, 'b': {'c': {}, 'd': {}}}``"""
+    tree = {}
+    for path in value.split(','):
+        node = tree
+        for name in path.strip().split('.'):
+            if name:
+                node = node.setdefault(name, {})
+    return tree
+
+
+class SparseFieldsMixin:
+    """``?fields=`` and ``?expand=`` support for read requests.
+
+    ``fields`` lists the fields to render, with dotted paths selecting fields
+    of nested objects (``assignee.username``). ``expand`` lists the nested
+    objects to render in full; when it is given, every other nested object is
+    rendered as its primary key (or a list of them). Without either parameter
+    the representation is unchanged. The selection is read from the request in
+    the serializer context and applies on GET/HEAD/OPTIONS only; pass
+    ``'sparse': False`` in the context to ignore it.
+    """
+    sparse_selection = None
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.sparse_selection or self._request_selection()
+        if selection is None:
+            return fields
+        only, expand = selection
+
+        if only is not None:
+            fields = {name: field for name, field in fields.items() if name in only}
+        for name, field in list(fields.items()):
+            nested = field.child if isinstance(field, serializers.ListSerializer) else field
+            if not isinstance(nested, serializers.ModelSerializer):
+                continue
+            subfields = (only or {}).get(name) or None
+            if expand is not None and name not in expand and subfields is None:
+                fields[name] = self._collapsed(name, field)
+            elif isinstance(nested, SparseFieldsMixin):
+                nested.sparse_selection = (subfields, None if expand is None else expand.get(name, {}))
+        return fields
+
+    @property
+    def sparse_fields(self):
+        """The requested field tree, or None when all fields are rendered"""
+        selection = self.sparse_selection or self._request_selection()
+        return selection[0] if selection else None
+
+    def _request_selection(self):
+        parent = self.parent
+        if isinstance(parent, serializers.ListSerializer):
+            parent = parent.parent
+        request = self.context.get('request')
+        if parent is not None or request is None or not self.context.get('sparse', True):
+            return None
+        if request.method not in SAFE_METHODS:
+            return None
+        params = getattr(request, 'query_params', request.GET)
+        fields, expand = params.get('fields'), params.get('expand')
+        if fields is None and expand is None:
+            return None
+        return (
+            None if fields is None else parse_field_paths(fields),
+            None if expand is None else parse_field_paths(expand),
+        )
+
+    @staticmethod
+    def _collapsed(name, field):
+        kwargs = {'read_only': True}
+        if isinstance(field, serializers.ListSerializer):
+            kwargs['many'] = True
+        if field.source and field.source != name:
+            kwargs['source'] = field.source
+        return serializers.PrimaryKeyRelatedField(**kwargs)
+
+
+class FragmentListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        items = list(data.all() if isinstance(data, models.Manager) else data)
+        self.child.prefetch_fragments(items)
+        return [self.child.to_representation(item) for item in items]
+
+
+class FragmentCacheMixin:
+    """Cache each instance's rendered column fields in Django's cache.
+
+    A fragment holds the fields rendered from the instance's own columns. It
+    is keyed by model, pk, version, ``updated_at`` when the model has one, and
+    the rendered field set. ``core.signals`` bumps the version on save and
+    delete. With a per-process cache only instances with ``updated_at`` are
+    cached, since other workers' bumps never arrive there. Nested
+    serializers, method and annotated fields depend on other rows and are
+    rendered on every call, nested ones from their own fragments.
+    Within one response each fragment is read from the cache at most once.
+    Set ``Meta.list_serializer_class = FragmentListSerializer`` to fetch a
+    list's fragments in two round trips.
+    """
+
+    @cached_property
+    def fragment_fields(self):
+        """Names of the readable fields rendered only from the instance's own columns"""
+        model = self.Meta.model
+        annotated = getattr(self, 'annotated_fields', {})
+        names = []
+        for field in self._readable_fields:
+            if field.field_name in annotated or field.source == '*' or len(field.source_attrs) != 1:
+                continue
+            if isinstance(field, (serializers.BaseSerializer, serializers.ManyRelatedField)):
+                continue
+            try:
+                model_field = model._meta.get_field(field.source_attrs[0])
+            except FieldDoesNotExist:
+                continue
+            if model_field.concrete and (not model_field.is_relation or isinstance(field, serializers.RelatedField)):
+                names.append(field.field_name)
+        return names
+
+    @cached_property
+    def fragment_signature(self):
+        # Absolute file URLs depend on the requested host
+        request = self.context.get('request')
+        base = request.build_absolute_uri('/') if request is not None else ''
+        key = ':'.join([type(self).__qualname__, base, *self.fragment_fields])
+        return hashlib.md5(key.encode('utf-8')).hexdigest()
+
+    def prefetch_fragments(self, instances):
+        """Load or render the fragments of ``instances`` with two cache round trips"""
+        if not self.fragment_fields:
+            return
+        memo = self.context.setdefault('_fragments', {})
+        signature = self.fragment_signature
+        pending = {instance.pk: instance for instance in instances
+                   if instance.pk is not None and (signature, instance.pk) not in memo}
+        if not pending:
+            return
+
+        # Without a shared cache, other processes' writes don't bump our versions;
+        # only instances with a loaded updated_at can be keyed safely then
+        shared = cache_is_shared()
+        for pk, instance in list(pending.items()):
+            if not shared and instance.__dict__.get('updated_at') is None:
+                memo[(signature, pk)] = self._render_fields(pending.pop(pk), self.fragment_fields)
+        if not pending:
+            return
+
+        label = self.Meta.model._meta.label_lower
+        versions = fragment_versions(label, pending)
+        keys = {}
+        for pk, instance in pending.items():
+            updated_at = instance.__dict__.get('updated_at')
+            stamp = updated_at.timestamp() if updated_at else ''
+            keys[pk] = f'fragment:{label}:{pk}:{versions[pk]}:{stamp}:{signature}'
+        cached = cache.get_many(keys.values())
+
+        rendered = {}
+        for pk, instance in pending.items():
+            fragment = cached.get(keys[pk])
+            if fragment is None:
+                fragment = rendered[keys[pk]] = self._render_fields(instance, self.fragment_fields)
+            memo[(signature, pk)] = fragment
+        if rendered:
+            cache.set_many(rendered, FRAGMENT_TIMEOUT)
 
-class UserSerializer(serializers.ModelSerializer):
+    def to_representation(self, instance):
+        if not self.fragment_fields or instance.pk is None:
+            return super().to_representation(instance)
+        self.prefetch_fragments([instance])
+        fragment = self.context['_fragments'][(self.fragment_signature, instance.pk)]
+        ret = OrderedDict()
+        for field in self._readable_fields:
+            if field.field_name in fragment:
+                ret[field.field_name] = fragment[field.field_name]
+            else:
+                ret.update(self._render_fields(instance, [field.field_name]))
+        return ret
+
+    def _render_fields(self, instance, names):
+        """The fields ``names`` of ``instance``, rendered as Serializer.to_representation() does"""
+        ret = {}
+        for name in names:
+            field = self.fields[name]
+            try:
+                attribute = field.get_attribute(instance)
+            except SkipField:
+                continue
+            check_for_none = attribute.pk if isinstance(attribute, PKOnlyObject) else attribute
+            ret[name] = None if check_for_none is None else field.to_representation(attribute)
+        return ret
+
+
+class UserSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
     password = serializers.CharField(write_only=True, min_length=8)
     confirm_password = serializers.CharField(write_only=True, required=True)
     
     class Meta:
         model = User
+        list_serializer_class = FragmentListSerializer
         fields = [
             'id', 'username', 'email', 'first_name', 'last_name', 'role', 
             'profile_picture', 'date_joined', 'last_active', 'bio', 
@@ -253,15 +462,16 @@ class PasswordResetConfirmSerializer(serializers.Serializer):
             raise serializers.ValidationError("Invalid password reset token.")
         return value
 
-class ProjectMemberSerializer(serializers.ModelSerializer):
+class ProjectMemberSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
     user = UserSerializer(read_only=True)
     
     class Meta:
         model = ProjectMember
+        list_serializer_class = FragmentListSerializer
         fields = ['id', 'user', 'role', 'joined_at']
         read_only_fields = ['id', 'joined_at']
 
-class ProjectSerializer(serializers.ModelSerializer):
+class ProjectSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
     members = ProjectMemberSerializer(many=True, read_only=True)
     created_by = UserSerializer(read_only=True)
     task_count = serializers.SerializerMethodField()
@@ -269,6 +479,7 @@ class ProjectSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = Project
+        list_serializer_class = FragmentListSerializer
         fields = [
             'id', 'name', 'description', 'start_date', 'end_date', 'status',
             'created_by', 'members', 'created_at', 'updated_at',
@@ -276,13 +487,85 @@ class ProjectSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at', 'updated_at', 'task_count', 'member_count']
 
+    # Computed in SQL by plan_queryset instead of one count query per project;
+    # task_count is read from the denormalized ProjectTaskCounter row
+    annotated_fields = {
+        'task_count': F('task_counter__total'),
+        'member_count': related_count(ProjectMember, 'project'),
+    }
+
     def get_task_count(self, obj):
-        return getattr(obj, 'task_count', None) or obj.tasks.count()
+        count = getattr(obj, 'task_count', None)
+        return project_counter(obj).total if count is None else count
 
     def get_member_count(self, obj):
-        return getattr(obj, 'member_count', None) or obj.members.count()
+        count = getattr(obj, 'member_count', None)
+        return obj.members.count() if count is None else count
+
+# Members embedded per project in the slim project list
+MEMBER_PREVIEW_SIZE = 5
+
+class MemberPreviewSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ['id', 'username', 'first_name', 'last_name', 'profile_picture']
+
+class ProjectListSerializer(serializers.ModelSerializer):
+    """Bounded-size project rows for list views.
+
+    Members are reduced to their ids and a capped preview; the full member
+    detail is served by the project's members_list action.
+    """
+    created_by_id = serializers.IntegerField(read_only=True)
+    task_count = serializers.SerializerMethodField()
+    member_count = serializers.SerializerMethodField()
+    member_ids = serializers.SerializerMethodField()
+    members_preview = serializers.SerializerMethodField()
 
-class TaskSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Project
+        fields = [
+            'id', 'name', 'description', 'start_date', 'end_date', 'status',
+            'created_by_id', 'created_at', 'updated_at',
+            'task_count', 'member_count', 'member_ids', 'members_preview'
+        ]
+        read_only_fields = fields
+
+    annotated_fields = ProjectSerializer.annotated_fields
+    prefetched_fields = {
+        'member_ids': Prefetch(
+            'members',
+            queryset=ProjectMember.objects.only('id', 'project_id', 'user_id').order_by('joined_at', 'id'),
+            to_attr='member_rows',
+        ),
+        # The first MEMBER_PREVIEW_SIZE members of each project, capped in SQL
+        'members_preview': Prefetch(
+            'members',
+            queryset=ProjectMember.objects.annotate(
+                position=Window(RowNumber(), partition_by=F('project_id'), order_by=[F('joined_at').asc(), F('id').asc()]),
+            ).filter(position__lte=MEMBER_PREVIEW_SIZE).select_related('user').only(
+                'id', 'project_id', 'user_id', *[f'user__{field}' for field in MemberPreviewSerializer.Meta.fields]
+            ).order_by('joined_at', 'id'),
+            to_attr='member_preview_rows',
+        ),
+    }
+
+    get_task_count = ProjectSerializer.get_task_count
+    get_member_count = ProjectSerializer.get_member_count
+
+    def get_member_ids(self, obj):
+        members = getattr(obj, 'member_rows', None)
+        if members is None:
+            return list(obj.members.order_by('joined_at', 'id').values_list('user_id', flat=True))
+        return [member.user_id for member in members]
+
+    def get_members_preview(self, obj):
+        members = getattr(obj, 'member_preview_rows', None)
+        if members is None:
+            members = obj.members.select_related('user').order_by('joined_at', 'id')[:MEMBER_PREVIEW_SIZE]
+        return MemberPreviewSerializer([member.user for member in members], many=True, context=self.context).data
+
+class TaskSerializer(SparseFieldsMixin, FragmentCacheMixin, serializers.ModelSerializer):
     assignee = UserSerializer(read_only=True)
     assignee_id = serializers.IntegerField(write_only=True, required=False, allow_null=True)
     created_by = UserSerializer(read_only=True)
@@ -291,15 +574,33 @@ class TaskSerializer(serializers.ModelSerializer):
     
     class Meta:
         model = Task
+        list_serializer_class = FragmentListSerializer
         fields = [
             'id', 'title', 'description', 'status', 'priority', 'due_date',
             'assignee', 'assignee_id', 'created_by', 'project', 'comment_count',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'created_at', 'updated_at']
+
+    annotated_fields = {
+        'comment_count': related_count(TaskComment, 'task'),
+    }
+    # to_representation() only adds these extra select columns; the compiled read path does the same
+    compiled_extras = {
+        'search_snippet': render_snippet,
+    }
     
     def get_comment_count(self, obj):
-        return obj.comments.count()
+        count = getattr(obj, 'comment_count', None)
+        return obj.comments.count() if count is None else count
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        # Present when the task came from a full-text search
+        snippet = getattr(instance, 'search_snippet', None)
+        if snippet is not None:
+            data['search_snippet'] = render_snippet(snippet)
+        return data
 
     def validate_title(self, value: str):
         if not value or len(value.strip()) < 3:
@@ -359,7 +660,7 @@ class NotificationSerializer(serializers.ModelSerializer):
         fields = ['id', 'title', 'message', 'type', 'is_read', 'created_at']
         read_only_fields = ['id', 'created_at']
 
-class AnalyticsEventSerializer(serializers.ModelSerializer):
+class AnalyticsEventSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = AnalyticsEvent
         fields = ['id', 'event_type', 'entity_type', 'entity_id', 'metadata', 'ip_address', 'user_agent', 'timestamp']
@@ -0,0 +1,74 @@
+import json
+import time
+
+from django.db import connection
+from django.http import StreamingHttpResponse
+from rest_framework.decorators import api_view, authentication_classes, permission_classes, renderer_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+from rest_framework.response import Response
+from core.access import visible_projects
+from core.broker import broker, stream_setting
+from .authentication import QueryTokenJWTAuthentication
+
+
+class EventStreamRenderer(BaseRenderer):
+    """Lets text/event-stream clients negotiate; only error payloads are rendered through it"""
+    media_type = 'text/event-stream'
+    format = 'event-stream'
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return f'event: error\ndata: {json.dumps(data)}\n\n'.encode('utf-8')
+
+
+@api_view(["GET"])
+@authentication_classes([QueryTokenJWTAuthentication])
+@permission_classes([IsAuthenticated])
+@renderer_classes([EventStreamRenderer, JSONRenderer])
+def change_stream(request):
+    """Server-sent events for task, project, membership and notification changes.
+
+    Events are filtered by the user's project membership. Reconnecting clients
+    send Last-Event-ID to replay what they missed; when that is no longer
+    possible a ``reset`` event tells them to resync through /api/sync/changes/.
+    Each open stream holds a worker thread, so a process refuses streams past
+    ``MAX_STREAMS_PER_PROCESS`` with 503 and the client retries later.
+    """
+    user = request.user
+    last_event_id = request.META.get('HTTP_LAST_EVENT_ID') or request.query_params.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    project_ids = visible_projects(user).values_list('id', flat=True)
+    subscription = broker.subscribe(user.id, project_ids, last_event_id)
+    if subscription is None:
+        response = Response({'error': 'Too many open change streams, retry later'}, status=503)
+        response['Retry-After'] = str(stream_setting('RETRY_MILLISECONDS') // 1000 or 1)
+        return response
+    # The stream itself never touches the database; don't hold a connection for its lifetime
+    connection.close()
+
+    response = StreamingHttpResponse(_event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
+
+
+def _event_stream(subscription):
+    heartbeat = stream_setting('HEARTBEAT_SECONDS')
+    deadline = time.monotonic() + stream_setting('MAX_CONNECTION_SECONDS')
+    try:
+        yield f"retry: {stream_setting('RETRY_MILLISECONDS')}\n\n"
+        while time.monotonic() < deadline:
+            events, overflowed = subscription.get(timeout=heartbeat)
+            if overflowed:
+                yield 'event: reset\ndata: {}\n\n'
+            for event in events:
+                yield f'id: {event.id}\nevent: {event.type}\ndata: {json.dumps(event.data)}\n\n'
+            if not events and not overflowed:
+                yield ': heartbeat\n\n'
+    finally:
+        broker.unsubscribe(subscription)
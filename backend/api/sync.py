@@ -0,0 +1,128 @@
+from rest_framework.decorators import api_view, permission_classes
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+from django.db.models import Q
+from core.access import visible_projects, visible_tasks
+from core.models import Project, ProjectMember, SyncChange, Task, TaskAccess
+from .query_planner import plan_queryset
+from .serializers import ProjectMemberSerializer, ProjectSerializer, TaskSerializer
+
+# Journal entries processed per request; clients keep polling while has_more is set
+MAX_CHANGES = 1000
+
+
+@api_view(["GET"])
+@permission_classes([IsAuthenticated])
+def get_changes(request):
+    """Return the tasks, projects and memberships changed since the ``since`` cursor.
+
+    Without ``since`` (or when the cursor is too old to replay) the response is a
+    full snapshot with ``reset`` set. Rows the user can no longer see, because
+    they were deleted or access was lost, are listed under ``deleted``.
+    """
+    user = request.user
+    since = request.query_params.get('since')
+    latest = SyncChange.objects.order_by('-id').values_list('id', flat=True).first() or 0
+    project_ids = set(visible_projects(user).values_list('id', flat=True))
+
+    if not since:
+        return Response(_snapshot(request, project_ids, latest))
+    try:
+        since = int(since)
+    except ValueError:
+        return Response({'error': 'Invalid cursor'}, status=400)
+
+    # The journal was pruned past the cursor, or the cursor is from another database
+    oldest = SyncChange.objects.order_by('id').values_list('id', flat=True).first()
+    if since > latest or (oldest is not None and since < oldest - 1):
+        return Response(_snapshot(request, project_ids, latest))
+
+    entries = list(
+        SyncChange.objects.filter(id__gt=since, id__lte=latest)
+        .filter(
+            Q(project_id__in=project_ids) | Q(user_id=user.id)
+            # Assignees and creators keep their tasks after leaving the project
+            | Q(entity_type='task', entity_id__in=TaskAccess.objects.filter(user=user).values('task_id'))
+        )
+        .order_by('id')
+        .values('id', 'entity_type', 'entity_id', 'action', 'project_id', 'user_id')[:MAX_CHANGES + 1]
+    )
+    has_more = len(entries) > MAX_CHANGES
+    entries = entries[:MAX_CHANGES]
+    cursor = entries[-1]['id'] if has_more else latest
+
+    task_ids, changed_projects, membership_ids = set(), set(), set()
+    membership_projects = set()
+    for entry in entries:
+        if entry['entity_type'] == 'task':
+            task_ids.add(entry['entity_id'])
+        elif entry['entity_type'] == 'project':
+            changed_projects.add(entry['entity_id'])
+        else:
+            membership_ids.add(entry['entity_id'])
+            if entry['user_id'] == user.id:
+                membership_projects.add(entry['project_id'])
+
+    # Joining or leaving a project changes the visibility of everything in it
+    if membership_projects:
+        changed_projects |= membership_projects
+        task_ids.update(Task.objects.filter(project_id__in=membership_projects).values_list('id', flat=True))
+        task_ids.update(SyncChange.objects.filter(
+            id__gt=since, id__lte=cursor, entity_type='task', project_id__in=membership_projects,
+        ).values_list('entity_id', flat=True))
+        membership_ids.update(
+            ProjectMember.objects.filter(project_id__in=membership_projects).values_list('id', flat=True)
+        )
+
+    data = _changes(request, project_ids, task_ids, changed_projects, membership_ids)
+    data.update({'cursor': str(cursor), 'has_more': has_more, 'reset': False})
+    return Response(data)
+
+
+def _snapshot(request, project_ids, latest):
+    """Everything the user can currently see"""
+    user = request.user
+    tasks = plan_queryset(visible_tasks(user), TaskSerializer())
+    projects = plan_queryset(Project.objects.filter(pk__in=project_ids), ProjectSerializer())
+    memberships = ProjectMember.objects.filter(project_id__in=project_ids).select_related('user')
+    context = {'request': request, 'sparse': False}
+    return {
+        'cursor': str(latest),
+        'has_more': False,
+        'reset': True,
+        'tasks': TaskSerializer(tasks, many=True, context=context).data,
+        'projects': ProjectSerializer(projects, many=True, context=context).data,
+        'memberships': _serialize_memberships(memberships, context),
+        'deleted': {'tasks': [], 'projects': [], 'memberships': []},
+    }
+
+
+def _changes(request, project_ids, task_ids, changed_projects, membership_ids):
+    """Current state of the changed rows, with tombstones for the ones no longer visible"""
+    user = request.user
+    context = {'request': request, 'sparse': False}
+
+    tasks = list(plan_queryset(visible_tasks(user).filter(pk__in=task_ids), TaskSerializer()))
+    projects = list(plan_queryset(
+        Project.objects.filter(pk__in=changed_projects & project_ids), ProjectSerializer()
+    ))
+    memberships = list(
+        ProjectMember.objects.filter(pk__in=membership_ids, project_id__in=project_ids).select_related('user')
+    )
+
+    return {
+        'tasks': TaskSerializer(tasks, many=True, context=context).data,
+        'projects': ProjectSerializer(projects, many=True, context=context).data,
+        'memberships': _serialize_memberships(memberships, context),
+        'deleted': {
+            'tasks': sorted(task_ids - {task.id for task in tasks}),
+            'projects': sorted(changed_projects - {project.id for project in projects}),
+            'memberships': sorted(membership_ids - {member.id for member in memberships}),
+        },
+    }
+
+
+def _serialize_memberships(memberships, context):
+    memberships = list(memberships)
+    data = ProjectMemberSerializer(memberships, many=True, context=context).data
+    return [{**item, 'project': member.project_id} for item, member in zip(data, memberships)]
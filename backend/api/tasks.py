@@ -2,31 +2,95 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.db import transaction
 from django.db.models import Q
-from core.models import Task, TaskComment, TaskAttachment, Project
+from django.utils import timezone
+from core.models import Task, TaskComment, TaskAttachment, Project, ProjectMember
+from core.access import sync_task_access, visible_tasks
+from core.changelog import record_task_changes
+from core.counters import adjust_project_counters
+from core.broker import publish_task
+from core.project_stats import bump_project_version
+from core.fragments import bump_fragment_versions
 from .serializers import TaskSerializer, TaskCommentSerializer, TaskAttachmentSerializer
+from .query_planner import plan_queryset
+from .pagination import TaskKeysetPagination, TaskPagination
+from .search import search_tasks
+from .conditional import ConditionalGetMixin
+from .compiled import CompiledListMixin
 import json
 from core.models import AnalyticsEvent
-from rest_framework.pagination import PageNumberPagination
+from core import analytics_buffer
 
+VALID_STATUSES = ['todo', 'in-progress', 'review', 'done']
+VALID_PRIORITIES = ['low', 'medium', 'high', 'urgent']
+BULK_FIELDS = ('status', 'priority', 'assignee_id', 'project_id')
+MAX_BULK_OPERATIONS = 500
 
-class StandardResultsSetPagination(PageNumberPagination):
-    page_size = 20
-    page_size_query_param = 'page_size'
-    max_page_size = 100
 
-class TaskViewSet(viewsets.ModelViewSet):
+def _as_int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _status_event_metadata(task, from_status, to_status):
+    """Metadata for task_moved / task_completed events, as the task metrics read it"""
+    return {
+        'from_status': from_status,
+        'to_status': to_status,
+        'priority': task.priority,
+        'project_id': task.project_id,
+    }
+
+
+def _bulk_events(user, task, changes):
+    """Analytics events matching the ones the single-task endpoints emit; call before applying ``changes``"""
+    events = []
+    if 'status' in changes:
+        events.append(AnalyticsEvent(
+            user=user,
+            event_type='task_moved' if changes['status'] != 'done' else 'task_completed',
+            entity_type='task',
+            entity_id=task.id,
+            metadata={
+                **_status_event_metadata(task, task.status, changes['status']),
+                'priority': changes.get('priority', task.priority),
+                'project_id': changes.get('project_id', task.project_id),
+            },
+        ))
+    if 'assignee_id' in changes:
+        events.append(AnalyticsEvent(
+            user=user,
+            event_type='task_assigned',
+            entity_type='task',
+            entity_id=task.id,
+            metadata={'assignee_id': changes['assignee_id'], 'project_id': changes.get('project_id', task.project_id)},
+        ))
+    updated = {field: changes[field] for field in ('priority', 'project_id') if field in changes}
+    if updated:
+        events.append(AnalyticsEvent(
+            user=user,
+            event_type='task_updated',
+            entity_type='task',
+            entity_id=task.id,
+            metadata=updated,
+        ))
+    return events
+
+
+class TaskViewSet(ConditionalGetMixin, CompiledListMixin, viewsets.ModelViewSet):
     queryset = Task.objects.all()
     serializer_class = TaskSerializer
     permission_classes = [IsAuthenticated]
-    pagination_class = StandardResultsSetPagination
+    pagination_class = TaskPagination
+    compiled_required = ('id', *TaskKeysetPagination.ordering_fields)
 
     def get_queryset(self):
         """Filter tasks by user access"""
         user = self.request.user
-        qs = Task.objects.filter(
-            Q(assignee=user) | Q(created_by=user) | Q(project__members__user=user)
-        ).distinct()
+        qs = visible_tasks(user)
 
         # Apply filters from query params
         params = self.request.query_params
@@ -51,11 +115,17 @@ class TaskViewSet(viewsets.ModelViewSet):
             except ValueError:
                 pass
         if search_param:
-            qs = qs.filter(Q(title__icontains=search_param) | Q(description__icontains=search_param))
+            qs = search_tasks(qs, search_param)
 
         ordering = params.get('ordering')
         if ordering in ['due_date', '-due_date', 'priority', '-priority', 'created_at', '-created_at']:
             qs = qs.order_by(ordering)
+        elif search_param and 'search_rank' in qs.query.extra:
+            qs = qs.order_by('search_rank', '-id')
+
+        if self.action in ('list', 'retrieve'):
+            # Keyset cursors are read from the ordering columns even when ?fields= leaves them out
+            qs = plan_queryset(qs, self.get_serializer(), required=TaskKeysetPagination.ordering_fields)
 
         return qs
 
@@ -76,7 +146,7 @@ class TaskViewSet(viewsets.ModelViewSet):
         task = serializer.save(created_by=self.request.user)
         # Emit analytics event
         try:
-            AnalyticsEvent.objects.create(
+            analytics_buffer.emit(
                 user=self.request.user,
                 event_type='task_created',
                 entity_type='task',
@@ -219,25 +289,25 @@ class TaskViewSet(viewsets.ModelViewSet):
                 'error': 'status is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        valid_statuses = ['todo', 'in-progress', 'review', 'done']
-        if new_status not in valid_statuses:
+        if new_status not in VALID_STATUSES:
             return Response({
-                'error': f'Invalid status. Must be one of: {", ".join(valid_statuses)}'
+                'error': f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
         # Scrum Master can change any, employee only their own
         if hasattr(request.user, 'role') and request.user.role == 'employee' and task.assignee_id != request.user.id:
             return Response({'error': 'Employees can only change status on their assigned tasks'}, status=status.HTTP_403_FORBIDDEN)
+        from_status = task.status
         task.status = new_status
         task.save()
         # Emit analytics event
         try:
-            AnalyticsEvent.objects.create(
+            analytics_buffer.emit(
                 user=request.user,
                 event_type='task_moved' if new_status != 'done' else 'task_completed',
                 entity_type='task',
                 entity_id=task.id,
-                metadata={'to_status': new_status}
+                metadata=_status_event_metadata(task, from_status, new_status)
             )
         except Exception:
             pass
@@ -254,10 +324,9 @@ class TaskViewSet(viewsets.ModelViewSet):
                 'error': 'priority is required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
-        valid_priorities = ['low', 'medium', 'high', 'urgent']
-        if new_priority not in valid_priorities:
+        if new_priority not in VALID_PRIORITIES:
             return Response({
-                'error': f'Invalid priority. Must be one of: {", ".join(valid_priorities)}'
+                'error': f'Invalid priority. Must be one of: {", ".join(VALID_PRIORITIES)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
         # Only Scrum Masters can change priority
@@ -267,16 +336,165 @@ class TaskViewSet(viewsets.ModelViewSet):
         task.save()
         return Response(TaskSerializer(task).data)
 
+    @action(detail=False, methods=['post'])
+    def bulk(self, request):
+        """Apply status, priority, assignee and project changes to many tasks at once.
+
+        Body: {"operations": [{"id": 1, "status": "done"}, ...], "atomic": false}.
+        Valid operations are written in one transaction; each operation gets a
+        result entry. With "atomic": true nothing is written if any operation fails.
+        """
+        payload = request.data
+        if isinstance(payload, list):
+            operations, atomic = payload, False
+        else:
+            operations, atomic = payload.get('operations'), bool(payload.get('atomic', False))
+
+        if not isinstance(operations, list) or not operations:
+            return Response({'error': 'operations must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(operations) > MAX_BULK_OPERATIONS:
+            return Response({
+                'error': f'At most {MAX_BULK_OPERATIONS} operations are allowed per request'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user
+        task_ids, project_ids, user_ids = set(), set(), {user.id}
+        for op in operations:
+            if isinstance(op, dict):
+                task_ids.add(_as_int(op.get('id')))
+                project_ids.add(_as_int(op.get('project_id')))
+                user_ids.add(_as_int(op.get('assignee_id')))
+
+        # One query for the visible tasks and one for every membership the operations depend on
+        tasks = visible_tasks(user).filter(pk__in=task_ids - {None}).in_bulk()
+        project_ids.update(task.project_id for task in tasks.values())
+        user_ids.update(task.assignee_id for task in tasks.values())
+        memberships = set(ProjectMember.objects.filter(
+            project_id__in=project_ids - {None},
+            user_id__in=user_ids - {None},
+        ).values_list('project_id', 'user_id'))
+
+        results = []
+        changed = {}
+        changed_fields = set()
+        access_changes = set()
+        previous_projects = {}
+        previous_states = {}
+        events = []
+        for index, op in enumerate(operations):
+            task_id = _as_int(op.get('id')) if isinstance(op, dict) else None
+            try:
+                task, changes = self._plan_bulk_operation(op, tasks, memberships)
+            except ValueError as e:
+                results.append({'index': index, 'id': task_id, 'status': 'error', 'error': str(e)})
+                continue
+
+            if 'project_id' in changes:
+                previous_projects.setdefault(task.id, task.project_id)
+            previous_states.setdefault(task.id, (task.project_id, task.status))
+            events.extend(_bulk_events(user, task, changes))
+            for field, value in changes.items():
+                setattr(task, field, value)
+            changed[task.id] = task
+            changed_fields.update(changes)
+            if 'assignee_id' in changes or 'project_id' in changes:
+                access_changes.add(task.id)
+            results.append({'index': index, 'id': task.id, 'status': 'ok'})
+
+        failed = sum(1 for result in results if result['status'] == 'error')
+        if atomic and failed:
+            for result in results:
+                if result['status'] == 'ok':
+                    result['status'] = 'skipped'
+            return Response({'updated': 0, 'failed': failed, 'results': results}, status=status.HTTP_400_BAD_REQUEST)
+
+        if changed:
+            now = timezone.now()
+            for task in changed.values():
+                task.update_completed_at()
+                task.updated_at = now
+            with transaction.atomic():
+                Task.objects.bulk_update(changed.values(), sorted(changed_fields | {'completed_at', 'updated_at'}))
+                if access_changes:
+                    sync_task_access(access_changes)
+                record_task_changes(changed.values(), previous_projects)
+                adjust_project_counters([
+                    (*previous_states[task.id], task.project_id, task.status) for task in changed.values()
+                ])
+                for event in events:
+                    event.promote_metadata()
+                AnalyticsEvent.objects.bulk_create(events)
+                # bulk_update skips post_save, so publish and invalidate here
+                bump_project_version(*{task.project_id for task in changed.values()}, *previous_projects.values())
+                bump_fragment_versions(Task._meta.label_lower, *changed)
+                for task in changed.values():
+                    old_project_id = previous_projects.get(task.pk)
+                    if old_project_id and old_project_id != task.project_id:
+                        publish_task(task, 'task.deleted', project_id=old_project_id)
+                    publish_task(task, 'task.updated')
+
+        return Response({'updated': len(changed), 'failed': failed, 'results': results})
+
+    def _plan_bulk_operation(self, op, tasks, memberships):
+        """Validate one bulk operation and return the task with its field changes"""
+        user = self.request.user
+        is_scrum_master = getattr(user, 'role', None) == 'scrum_master'
+
+        if not isinstance(op, dict):
+            raise ValueError('Operation must be an object')
+        task = tasks.get(_as_int(op.get('id')))
+        if task is None:
+            raise ValueError('Task not found')
+
+        fields = set(op) & set(BULK_FIELDS)
+        if not fields:
+            raise ValueError(f'Nothing to change. Allowed fields: {", ".join(BULK_FIELDS)}')
+        if not is_scrum_master:
+            if fields != {'status'}:
+                raise ValueError('Only Scrum Masters can change priority, assignee or project')
+            if task.assignee_id != user.id:
+                raise ValueError('Employees can only change status on their assigned tasks')
+
+        changes = {}
+        if 'status' in fields:
+            if op['status'] not in VALID_STATUSES:
+                raise ValueError(f'Invalid status. Must be one of: {", ".join(VALID_STATUSES)}')
+            changes['status'] = op['status']
+        if 'priority' in fields:
+            if op['priority'] not in VALID_PRIORITIES:
+                raise ValueError(f'Invalid priority. Must be one of: {", ".join(VALID_PRIORITIES)}')
+            changes['priority'] = op['priority']
+
+        project_id = task.project_id
+        if 'project_id' in fields:
+            project_id = _as_int(op['project_id'])
+            if (project_id, user.id) not in memberships:
+                raise ValueError('Project not found')
+            changes['project_id'] = project_id
+
+        assignee_id = task.assignee_id
+        if 'assignee_id' in fields:
+            assignee_id = None if op['assignee_id'] is None else _as_int(op['assignee_id'])
+            if op['assignee_id'] is not None and assignee_id is None:
+                raise ValueError('assignee_id must be an integer or null')
+            changes['assignee_id'] = assignee_id
+        if assignee_id is not None and (project_id, assignee_id) not in memberships:
+            raise ValueError('Assignee is not a member of the project. Only project members can be assigned tasks.')
+
+        return task, changes
+
     @action(detail=False, methods=['get'])
     def my_tasks(self, request):
         """Get tasks assigned to the current user"""
         user = request.user
         tasks = Task.objects.filter(assignee=user).order_by('-created_at')
-        return Response(TaskSerializer(tasks, many=True).data)
+        tasks = plan_queryset(tasks, self.get_serializer())
+        return Response(self.list_data(tasks))
 
     @action(detail=False, methods=['get'])
     def created_by_me(self, request):
         """Get tasks created by the current user"""
         user = request.user
         tasks = Task.objects.filter(created_by=user).order_by('-created_at')
-        return Response(TaskSerializer(tasks, many=True).data)
+        tasks = plan_queryset(tasks, self.get_serializer())
+        return Response(self.list_data(tasks))
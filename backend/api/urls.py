@@ -1,6 +1,6 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from . import users, projects, tasks, events
+from . import users, projects, tasks, events, sync, stream, metrics
 
 # Create router and register viewsets
 router = DefaultRouter()
@@ -12,6 +12,7 @@ urlpatterns = [
     path('', include(router.urls)),
     # Events endpoints
     path('events/', events.create_event, name='create_event'),
+    path('events/batch/', events.create_event_batch, name='create_event_batch'),
     path('events/list/', events.get_events, name='get_events'),
     path('events/dashboard/', events.get_dashboard_analytics, name='get_dashboard_analytics'),
     path('events/task-analytics/', events.get_task_analytics, name='get_task_analytics'),
@@ -20,8 +21,14 @@ urlpatterns = [
     path('analytics/task/completion/', events.get_task_analytics, name='analytics_task_completion'),
     path('analytics/user/', events.get_dashboard_analytics, name='analytics_user'),
     path('analytics/user/productivity/', events.get_dashboard_analytics, name='analytics_user_productivity'),
-    path('analytics/project/<int:project_id>/', events.get_dashboard_analytics, name='analytics_project'),
+    path('analytics/project/<int:project_id>/', events.get_project_analytics, name='analytics_project'),
     path('analytics/log/', events.create_event, name='analytics_log'),
+    # Delta sync for polling clients
+    path('sync/changes/', sync.get_changes, name='sync_changes'),
+    # Server-sent change stream
+    path('stream/', stream.change_stream, name='change_stream'),
+    # Per-process counters for staff
+    path('metrics/', metrics.get_metrics, name='metrics'),
     # Token endpoints for authentication
     path('token/', users.UserViewSet.as_view({'post': 'login'}), name='token_obtain_pair'),
     path('token/refresh/', users.UserViewSet.as_view({'post': 'refresh'}), name='token_refresh'),
@@ -29,4 +36,5 @@ urlpatterns = [
     path('users/login/', users.UserViewSet.as_view({'post': 'login'}), name='user_login'),
     path('users/register/', users.UserViewSet.as_view({'post': 'register'}), name='user_register'),
     path('users/refresh/', users.UserViewSet.as_view({'post': 'refresh'}), name='user_refresh'),
+    path('users/logout/', users.UserViewSet.as_view({'post': 'logout'}), name='user_logout'),
 ]
\ No newline at end of file
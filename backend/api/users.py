@@ -2,9 +2,8 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
-from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.utils import timezone
 from django.core.mail import send_mail
 from django.conf import settings
@@ -14,7 +13,14 @@ from .serializers import (
     PasswordResetSerializer, PasswordResetConfirmSerializer, NotificationSerializer,
     RegisterSerializer
 )
+from .pagination import NotificationKeysetPagination
+from .query_planner import plan_queryset
+from .conditional import conditional_response, make_etag, set_validators
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
 from rest_framework_simplejwt.tokens import RefreshToken
+from core.ratelimit import client_address, login_rate_limiter
+from core.revocation import is_token_revoked, revoke_token
 import json
 from django.contrib.auth.hashers import check_password
 import logging
@@ -30,12 +36,18 @@ class UserViewSet(viewsets.ModelViewSet):
         """
         Instantiates and returns the list of permissions that this view requires.
         """
-        if self.action in ['login', 'refresh', 'register']:
+        if self.action in ['login', 'refresh', 'logout', 'register']:
             permission_classes = [AllowAny]
         else:
             permission_classes = [IsAuthenticated]
         return [permission() for permission in permission_classes]
 
+    def get_queryset(self):
+        qs = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            qs = plan_queryset(qs, self.get_serializer())
+        return qs
+
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def register(self, request):
         """Register a new user"""
@@ -62,8 +74,17 @@ class UserViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['get'], permission_classes=[IsAuthenticated])
     def me(self, request):
         """Get current user profile"""
-        serializer = UserProfileSerializer(request.user)
-        return Response(serializer.data)
+        # Validate against the already-loaded user's profile columns, before serializing
+        user = request.user
+        profile = json.dumps(
+            [getattr(user, field) for field in UserProfileSerializer.Meta.fields],
+            default=str, sort_keys=True,
+        )
+        etag = make_etag(request, profile)
+        response = conditional_response(request, etag)
+        if response is None:
+            response = Response(UserProfileSerializer(user).data)
+        return set_validators(response, etag)
         
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def login(self, request):
@@ -77,6 +98,14 @@ class UserViewSet(viewsets.ModelViewSet):
                 'error': 'Username and password are required'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+        # Rejected before the user lookup and before any password is hashed
+        retry_after = login_rate_limiter.attempt(client_address(request), username)
+        if retry_after:
+            logger.warning(f"Rate limited login attempt for: {username} from IP: {ip_address}")
+            return Response({
+                'error': 'Too many login attempts. Please try again later.'
+            }, status=status.HTTP_429_TOO_MANY_REQUESTS, headers={'Retry-After': str(retry_after)})
+
         try:
             # Try to find user by username or email
             user = CustomUser.objects.filter(
@@ -84,6 +113,7 @@ class UserViewSet(viewsets.ModelViewSet):
             ).first()
             
             if not user:
+                login_rate_limiter.failed(username)
                 logger.warning(f"Login attempt with non-existent username/email: {username} from IP: {ip_address}")
                 return Response({
                     'error': 'Invalid credentials'
@@ -103,20 +133,25 @@ class UserViewSet(viewsets.ModelViewSet):
                     'error': 'Account is deactivated. Please contact support.'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
-            # Authenticate user
-            authenticated_user = authenticate(username=user.username, password=password)
-            if not authenticated_user:
-                # Increment failed login attempts
-                user.increment_failed_login()
+            # Verify against the row already loaded; authenticate() would fetch it again
+            if not user.check_password(password):
+                user.record_failed_login()
+                login_rate_limiter.failed(username)
                 logger.warning(f"Failed login attempt for user: {username} from IP: {ip_address}")
                 return Response({
                     'error': 'Invalid credentials'
                 }, status=status.HTTP_401_UNAUTHORIZED)
             
-            # Reset failed login attempts on successful login
-            user.reset_failed_login_attempts()
-            user.update_last_active()
+            # One UPDATE resets failed attempts and stamps last_login/last_active,
+            # unless a concurrent failed attempt locked the account meanwhile
+            if not user.record_login():
+                logger.warning(f"Login attempt on locked account: {username} from IP: {ip_address}")
+                return Response({
+                    'error': 'Account is temporarily locked due to multiple failed login attempts. Please try again later.'
+                }, status=status.HTTP_423_LOCKED)
             
+            login_rate_limiter.succeeded(username)
+
             # Generate JWT tokens
             refresh = RefreshToken.for_user(user)
             
@@ -157,14 +192,52 @@ class UserViewSet(viewsets.ModelViewSet):
 
         try:
             refresh = RefreshToken(refresh_token)
+        except TokenError:
             return Response({
-                'access': str(refresh.access_token)
-            })
-        except Exception as e:
+                'error': 'Invalid refresh token'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        # The revocation filter answers for tokens that were never revoked without a query
+        if is_token_revoked(refresh):
+            logger.warning(f"Reuse of revoked refresh token for user id: {refresh.get(jwt_settings.USER_ID_CLAIM)}")
+            return Response({
+                'error': 'Refresh token has been revoked'
+            }, status=status.HTTP_401_UNAUTHORIZED)
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            # Losing the insert means a concurrent request already rotated this token
+            if jwt_settings.BLACKLIST_AFTER_ROTATION and not revoke_token(refresh):
+                return Response({
+                    'error': 'Refresh token has been revoked'
+                }, status=status.HTTP_401_UNAUTHORIZED)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data['refresh'] = str(refresh)
+        return Response(data)
+
+    @action(detail=False, methods=['post'], permission_classes=[AllowAny])
+    def logout(self, request):
+        """Revoke the refresh token so it can't mint new access tokens"""
+        refresh_token = request.data.get('refresh')
+
+        if not refresh_token:
+            return Response({
+                'error': 'Refresh token is required'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            refresh = RefreshToken(refresh_token)
+        except TokenError:
             return Response({
                 'error': 'Invalid refresh token'
             }, status=status.HTTP_401_UNAUTHORIZED)
 
+        # Logging out twice is not an error
+        revoke_token(refresh)
+        return Response({'message': 'Logout successful'})
+
     @action(detail=False, methods=['post'], permission_classes=[AllowAny])
     def register(self, request):
         """Enhanced user registration with comprehensive validation"""
@@ -450,13 +523,29 @@ class UserViewSet(viewsets.ModelViewSet):
             Q(last_name__icontains=query)
         )[:10]
 
-        return Response(UserSerializer(users, many=True).data)
+        return Response(UserSerializer(users, many=True, context={'request': request}).data)
 
     @action(detail=False, methods=['get'])
     def notifications(self, request):
         """Get user notifications"""
-        notifications = Notification.objects.filter(user=request.user).order_by('-created_at')
-        return Response(NotificationSerializer(notifications, many=True).data)
+        notifications = Notification.objects.filter(user=request.user)
+        # is_read flips don't move created_at, so the validator also counts unread rows
+        state = notifications.aggregate(
+            count=Count('id'), latest=Max('id'), unread=Count('id', filter=Q(is_read=False))
+        )
+        etag = make_etag(request, state['count'], state['latest'], state['unread'])
+        response = conditional_response(request, etag)
+        if response is not None:
+            return set_validators(response, etag)
+
+        if NotificationKeysetPagination.cursor_query_param in request.query_params:
+            paginator = NotificationKeysetPagination()
+            page = paginator.paginate_queryset(notifications, request, view=self)
+            response = paginator.get_paginated_response(NotificationSerializer(page, many=True).data)
+        else:
+            notifications = notifications.order_by('-created_at')
+            response = Response(NotificationSerializer(notifications, many=True).data)
+        return set_validators(response, etag)
 
     @action(detail=False, methods=['post'])
     def mark_notification_read(self, request):
@@ -0,0 +1,96 @@
+"""Maintenance of the materialized TaskAccess visibility table."""
+from collections import defaultdict
+
+from django.db.models import Q
+
+from .models import Project, ProjectMember, Task, TaskAccess
+
+# Task columns that decide who can see a task
+ACCESS_FIELDS = ('project_id', 'assignee_id', 'created_by_id')
+
+
+def visible_tasks(user):
+    """Tasks the user can see, as a single semi-join against TaskAccess"""
+    return Task.objects.filter(pk__in=TaskAccess.objects.filter(user=user).values('task_id'))
+
+
+def visible_projects(user):
+    """Projects the user can see.
+
+    - Scrum Masters can see all projects they created or are members of
+    - Employees can only see projects they are assigned to as members
+    """
+    # Membership is a semi-join, so no DISTINCT is needed over the joined rows
+    member_of = ProjectMember.objects.filter(user=user).values('project_id')
+    if getattr(user, 'role', None) == 'employee':
+        return Project.objects.filter(pk__in=member_of)
+    return Project.objects.filter(Q(created_by=user) | Q(pk__in=member_of))
+
+
+def access_changed(task):
+    """Whether a saved task's project, assignee or creator differs from what was loaded"""
+    loaded = getattr(task, '_loaded_values', None)
+    if loaded is None:
+        return True
+    return any(loaded.get(field) != getattr(task, field) for field in ACCESS_FIELDS)
+
+
+def sync_task_access(task_ids, dry_run=False):
+    """Bring TaskAccess rows for ``task_ids`` in line with the tasks and their projects.
+
+    Returns a ``(missing, extra)`` tuple with the number of rows that were
+    (or, with ``dry_run``, would be) added and removed.
+    """
+    task_ids = list(task_ids)
+    if not task_ids:
+        return 0, 0
+
+    tasks = list(Task.objects.filter(pk__in=task_ids).values_list('id', *ACCESS_FIELDS))
+    members = defaultdict(set)
+    member_rows = ProjectMember.objects.filter(
+        project_id__in={project_id for _, project_id, _, _ in tasks}
+    ).values_list('project_id', 'user_id')
+    for project_id, user_id in member_rows:
+        members[project_id].add(user_id)
+
+    expected = set()
+    for task_id, project_id, assignee_id, created_by_id in tasks:
+        audience = members[project_id] | {created_by_id}
+        if assignee_id:
+            audience.add(assignee_id)
+        expected.update((user_id, task_id) for user_id in audience)
+
+    actual = {}
+    for pk, user_id, task_id in TaskAccess.objects.filter(task_id__in=task_ids).values_list('id', 'user_id', 'task_id'):
+        actual[(user_id, task_id)] = pk
+
+    missing = expected - actual.keys()
+    extra = [pk for key, pk in actual.items() if key not in expected]
+    if not dry_run:
+        if extra:
+            TaskAccess.objects.filter(pk__in=extra).delete()
+        if missing:
+            TaskAccess.objects.bulk_create(
+                [TaskAccess(user_id=user_id, task_id=task_id) for user_id, task_id in missing],
+                ignore_conflicts=True,
+            )
+    return len(missing), len(extra)
+
+
+def grant_project_access(project_id, user_id):
+    """Give a new project member access to every task in the project"""
+    task_ids = Task.objects.filter(project_id=project_id).values_list('id', flat=True)
+    TaskAccess.objects.bulk_create(
+        [TaskAccess(user_id=user_id, task_id=task_id) for task_id in task_ids],
+        ignore_conflicts=True,
+    )
+
+
+def revoke_project_access(project_id, user_id):
+    """Drop a removed member's access to project tasks they neither created nor are assigned"""
+    TaskAccess.objects.filter(
+        user_id=user_id,
+        task__project_id=project_id,
+    ).exclude(
+        Q(task__assignee_id=user_id) | Q(task__created_by_id=user_id)
+    ).delete()
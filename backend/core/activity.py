@@ -0,0 +1,109 @@
+"""Coalesced last-seen tracking for authenticated requests.
+
+``touch(user)`` records that a user was just active. Timestamps are kept in
+process memory, at most one per user every ``COALESCE_SECONDS``. A background
+thread writes everything pending every ``FLUSH_INTERVAL_SECONDS`` as one
+batched UPDATE, so presence costs no write on the request path.
+``User.last_active`` lags real activity by at most the sum of the two
+settings. Pending timestamps are flushed at interpreter exit.
+"""
+import logging
+import threading
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from .background import BackgroundFlusher
+from .fragments import bump_fragment_versions
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'COALESCE_SECONDS': 60,
+    'FLUSH_INTERVAL_SECONDS': 30,
+    # Users per UPDATE; each adds four query parameters
+    'BATCH_SIZE': 200,
+}
+
+
+def tracker_setting(name):
+    return getattr(settings, 'ACTIVITY_TRACKER', {}).get(name, DEFAULTS[name])
+
+
+class ActivityTracker:
+    def __init__(self):
+        self._pending = {}
+        self._recorded = {}
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._flusher = BackgroundFlusher(
+            'activity-tracker', self._condition, self.flush,
+            interval=lambda: tracker_setting('FLUSH_INTERVAL_SECONDS'),
+        )
+        self.stats = {'touched': 0, 'coalesced': 0, 'flushed': 0, 'failed': 0, 'flushes': 0}
+
+    def touch(self, user, now=None):
+        """Record activity for ``user``; returns False if it fell inside the coalescing window"""
+        now = now or timezone.now()
+        window = timedelta(seconds=tracker_setting('COALESCE_SECONDS'))
+        with self._condition:
+            last = self._recorded.get(user.pk)
+            if last is None:
+                # The loaded row may already be fresh, e.g. just after a restart
+                last = user.__dict__.get('last_active')
+            if last is not None and now - last < window:
+                self.stats['coalesced'] += 1
+                return False
+            self._recorded[user.pk] = now
+            self._pending[user.pk] = now
+            self.stats['touched'] += 1
+        self._flusher.ensure_started()
+        return True
+
+    def flush(self):
+        """Write every pending timestamp; returns the number of users written"""
+        written = 0
+        with self._flush_lock:
+            with self._condition:
+                pending, self._pending = self._pending, {}
+                # Users outside the window would be recorded anyway, so the map stays bounded
+                cutoff = timezone.now() - timedelta(seconds=tracker_setting('COALESCE_SECONDS'))
+                self._recorded = {pk: seen for pk, seen in self._recorded.items() if seen >= cutoff}
+
+            items = sorted(pending.items())
+            batch_size = tracker_setting('BATCH_SIZE')
+            for start in range(0, len(items), batch_size):
+                batch = dict(items[start:start + batch_size])
+                try:
+                    User.objects.filter(pk__in=batch).update(last_active=Case(
+                        # Never move last_active backwards, e.g. past a login stamped meanwhile
+                        *[When(pk=pk, last_active__lt=seen, then=Value(seen)) for pk, seen in batch.items()],
+                        default=F('last_active'),
+                    ))
+                    bump_fragment_versions(User._meta.label_lower, *batch)
+                except Exception:
+                    logger.exception('Failed to write last_active for %d users', len(batch))
+                    self.stats['failed'] += len(batch)
+                else:
+                    written += len(batch)
+                    self.stats['flushed'] += len(batch)
+                    self.stats['flushes'] += 1
+        return written
+
+    def pending(self):
+        return len(self._pending)
+
+    def counters(self):
+        return {**self.stats, 'pending': self.pending()}
+
+    def shutdown(self):
+        """Stop the flusher thread and write whatever is still pending"""
+        self._flusher.shutdown()
+
+
+activity_tracker = ActivityTracker()
+touch = activity_tracker.touch
@@ -0,0 +1,113 @@
+"""Write-behind buffer for AnalyticsEvent rows.
+
+Request handlers call ``emit()`` instead of ``AnalyticsEvent.objects.create()``.
+Events are queued in process memory and a background thread writes them with
+``bulk_create`` every ``FLUSH_INTERVAL_MS`` or as soon as ``BATCH_SIZE`` events
+are waiting, so a mutation no longer pays for an extra INSERT. Pending events
+are flushed at interpreter exit; a hard crash loses at most one interval.
+"""
+import logging
+import threading
+from collections import deque
+
+from django.conf import settings
+from django.utils import timezone
+
+from .background import BackgroundFlusher
+from .models import AnalyticsEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'ENABLED': True,
+    'MAX_QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL_MS': 1000,
+    # What to do when the queue is full: 'drop' the new event, or 'block' the
+    # caller for up to BLOCK_TIMEOUT_MS waiting for the flusher, then drop
+    'OVERFLOW': 'drop',
+    'BLOCK_TIMEOUT_MS': 100,
+}
+
+
+def buffer_setting(name):
+    return getattr(settings, 'ANALYTICS_BUFFER', {}).get(name, DEFAULTS[name])
+
+
+class AnalyticsBuffer:
+    def __init__(self):
+        self._events = deque()
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._flusher = BackgroundFlusher(
+            'analytics-buffer', self._condition, self.flush,
+            interval=lambda: buffer_setting('FLUSH_INTERVAL_MS') / 1000,
+            ready=lambda: len(self._events) >= buffer_setting('BATCH_SIZE'),
+        )
+        self.stats = {'enqueued': 0, 'flushed': 0, 'dropped': 0, 'failed': 0, 'flushes': 0}
+
+    def emit(self, **fields):
+        """Queue one event; returns it, or None if it was dropped because the queue is full.
+
+        With ``ENABLED`` off the event is written immediately, as before, so
+        the returned event has its ``id``; a queued one gets it when flushed.
+        """
+        fields.setdefault('timestamp', timezone.now())
+        event = AnalyticsEvent(**fields)
+        event.promote_metadata()
+        if not buffer_setting('ENABLED'):
+            event.save()
+            return event
+
+        self._flusher.ensure_started()
+        max_size = buffer_setting('MAX_QUEUE_SIZE')
+        with self._condition:
+            if len(self._events) >= max_size and buffer_setting('OVERFLOW') == 'block':
+                self._condition.notify_all()
+                self._condition.wait_for(
+                    lambda: len(self._events) < max_size,
+                    timeout=buffer_setting('BLOCK_TIMEOUT_MS') / 1000,
+                )
+            if len(self._events) >= max_size:
+                self.stats['dropped'] += 1
+                return None
+            self._events.append(event)
+            self.stats['enqueued'] += 1
+            if len(self._events) >= buffer_setting('BATCH_SIZE'):
+                self._condition.notify_all()
+        return event
+
+    def flush(self):
+        """Write everything queued so far; returns the number of events written"""
+        written = 0
+        with self._flush_lock:
+            while True:
+                with self._condition:
+                    batch = [self._events.popleft() for _ in range(min(len(self._events), buffer_setting('BATCH_SIZE')))]
+                    # Wake callers blocked on a full queue
+                    self._condition.notify_all()
+                if not batch:
+                    return written
+                try:
+                    AnalyticsEvent.objects.bulk_create(batch)
+                except Exception:
+                    logger.exception('Failed to write %d analytics events', len(batch))
+                    self.stats['failed'] += len(batch)
+                else:
+                    written += len(batch)
+                    self.stats['flushed'] += len(batch)
+                    self.stats['flushes'] += 1
+
+    def pending(self):
+        return len(self._events)
+
+    def counters(self):
+        return {**self.stats, 'pending': self.pending()}
+
+    def shutdown(self):
+        """Stop the flusher thread and write whatever is still queued"""
+        self._flusher.shutdown()
+
+
+analytics_buffer = AnalyticsBuffer()
+emit = analytics_buffer.emit
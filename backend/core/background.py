@@ -0,0 +1,64 @@
+"""Daemon-thread lifecycle shared by the in-process write-behind components.
+
+The analytics buffer and the activity tracker queue work in memory and let a
+``BackgroundFlusher`` write it out: periodically, when the owner signals that
+enough is waiting, and once more at interpreter exit.
+"""
+import atexit
+import os
+import threading
+
+from django.db import connection
+
+
+class BackgroundFlusher:
+    """Calls ``flush()`` on a daemon thread every ``interval()`` seconds.
+
+    ``condition`` is the owner's condition: notifying it wakes the thread
+    early, which only flushes then if ``ready()`` is true (or on shutdown).
+    """
+
+    def __init__(self, name, condition, flush, interval, ready=None):
+        self.name = name
+        self.condition = condition
+        self._flush = flush
+        self._interval = interval
+        self._ready = ready or (lambda: False)
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._exit_hook = False
+
+    def ensure_started(self):
+        # Started lazily, and again in a forked worker since threads don't survive fork
+        if self._pid == os.getpid() and self._thread.is_alive():
+            return
+        with self.condition:
+            if self._pid == os.getpid() and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+            # Only a process that queued something has anything to flush at exit
+            if not self._exit_hook:
+                atexit.register(self.shutdown)
+                self._exit_hook = True
+
+    def _run(self):
+        try:
+            while not self._stopping:
+                with self.condition:
+                    self.condition.wait_for(lambda: self._stopping or self._ready(), timeout=self._interval())
+                self._flush()
+        finally:
+            connection.close()
+
+    def shutdown(self):
+        """Stop the thread and flush whatever is still queued"""
+        with self.condition:
+            self._stopping = True
+            self.condition.notify_all()
+        if self._thread is not None and self._thread.is_alive():
+            self._thread.join(timeout=5)
+        self._flush()
@@ -0,0 +1,252 @@
+"""Publish/subscribe broker feeding the server-sent change stream.
+
+Signals publish task, project, membership and notification changes as
+``StreamEvent`` rows, written in the transaction of the change itself, so
+clients never see rolled-back changes. In every worker process with open
+streams a poller thread reads new rows every ``POLL_INTERVAL_SECONDS`` and
+hands them to that process's subscriptions. A stream therefore sees writes
+made by any worker, and a reconnecting client can resume on any worker. Each
+subscription only receives events for projects its user belongs to, or
+events addressed to the user directly. The poller prunes rows older than
+``HISTORY_SECONDS``.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import StreamEvent
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_CONNECTION_SECONDS': 300,
+    'RETRY_MILLISECONDS': 3000,
+    'BUFFER_SIZE': 256,
+    # Every open stream holds a worker thread; streams past this are refused
+    'MAX_STREAMS_PER_PROCESS': 50,
+    'POLL_INTERVAL_SECONDS': 1,
+    # How far back Last-Event-ID can be replayed
+    'HISTORY_SECONDS': 3600,
+    # How long a skipped id is waited for: the transaction holding it may still commit
+    'GAP_TIMEOUT_SECONDS': 30,
+    # With the poller off nothing is delivered until poll() is called
+    'POLLER': True,
+}
+
+# Skipped ids remembered per poll, so a sequence jump can't flood the gap set
+MAX_GAPS = 1000
+PRUNE_INTERVAL_SECONDS = 60
+
+Event = namedtuple('Event', ['id', 'type', 'data', 'project_id', 'user_ids'])
+
+
+def stream_setting(name):
+    return getattr(settings, 'CHANGE_STREAM', {}).get(name, DEFAULTS[name])
+
+
+def _event(row):
+    return Event(row.id, row.event_type, row.data, row.project_id, frozenset(row.user_ids))
+
+
+def _latest_id():
+    return StreamEvent.objects.order_by('-id').values_list('id', flat=True).first() or 0
+
+
+class Subscription:
+    """One stream connection's filter and bounded event buffer"""
+
+    def __init__(self, user_id, project_ids, buffer_size):
+        self.user_id = user_id
+        self.project_ids = set(project_ids)
+        self.buffer_size = buffer_size
+        self.overflowed = False
+        self._events = deque()
+        self._condition = threading.Condition()
+
+    def push(self, event):
+        """Queue ``event`` if the subscription wants it"""
+        with self._condition:
+            if self.user_id not in event.user_ids and event.project_id not in self.project_ids:
+                return
+            # Track the user's own membership changes so project filtering stays current
+            if event.type.startswith('membership.') and event.data.get('user_id') == self.user_id:
+                if event.type == 'membership.deleted':
+                    self.project_ids.discard(event.project_id)
+                else:
+                    self.project_ids.add(event.project_id)
+
+            if len(self._events) >= self.buffer_size:
+                # A slow client lost events: drop the backlog and tell it to resync
+                self._events.clear()
+                self.overflowed = True
+            else:
+                self._events.append(event)
+            self._condition.notify()
+
+    def get(self, timeout):
+        """Wait up to ``timeout`` seconds; return ``(events, overflowed)``"""
+        with self._condition:
+            if not self._events and not self.overflowed:
+                self._condition.wait(timeout)
+            events = list(self._events)
+            self._events.clear()
+            overflowed, self.overflowed = self.overflowed, False
+        return events, overflowed
+
+
+class ChangeBroker:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        # Highest event id delivered, and skipped ids still waited for
+        self._cursor = None
+        self._gaps = {}
+        self._pruned_at = 0.0
+        self._running = False
+        self._pid = None
+        self.stats = {'polls': 0, 'delivered': 0, 'late': 0, 'gaps_expired': 0, 'pruned': 0, 'refused': 0}
+
+    def publish(self, event_type, data, project_id=None, user_ids=()):
+        return StreamEvent.objects.create(
+            event_type=event_type, data=data, project_id=project_id, user_ids=sorted(set(user_ids)),
+        )
+
+    def subscribe(self, user_id, project_ids, last_event_id=None):
+        """Register a subscription, replaying events after ``last_event_id`` when possible.
+
+        If the requested events have been pruned (or the id is unknown) the
+        subscription starts flagged as overflowed so the client resyncs.
+        Returns None when this process already serves ``MAX_STREAMS_PER_PROCESS``.
+        """
+        subscription = Subscription(user_id, project_ids, stream_setting('BUFFER_SIZE'))
+        with self._lock:
+            if len(self._subscribers) >= stream_setting('MAX_STREAMS_PER_PROCESS'):
+                self.stats['refused'] += 1
+                return None
+            if self._cursor is None:
+                self._cursor = _latest_id()
+            if last_event_id is not None:
+                self._replay(subscription, last_event_id)
+            self._subscribers.add(subscription)
+        self._ensure_thread()
+        return subscription
+
+    def _replay(self, subscription, last_event_id):
+        # Called with the lock held, so poll() can't deliver past the cursor meanwhile
+        if last_event_id == self._cursor:
+            return
+        oldest = StreamEvent.objects.order_by('id').values_list('id', flat=True).first()
+        if last_event_id > self._cursor or oldest is None or last_event_id < oldest - 1:
+            subscription.overflowed = True
+            return
+        for row in StreamEvent.objects.filter(id__gt=last_event_id, id__lte=self._cursor).order_by('id'):
+            subscription.push(_event(row))
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    def poll(self):
+        """Deliver the events committed since the last poll; returns how many were read"""
+        with self._lock:
+            if self._cursor is None:
+                self._cursor = _latest_id()
+            cursor, gaps = self._cursor, list(self._gaps)
+        rows = list(StreamEvent.objects.filter(Q(id__gt=cursor) | Q(id__in=gaps)).order_by('id'))
+
+        now = time.monotonic()
+        with self._lock:
+            self.stats['polls'] += 1
+            for row in rows:
+                if self._gaps.pop(row.id, None) is not None:
+                    self.stats['late'] += 1
+                elif row.id > self._cursor:
+                    # Ids skipped over may belong to transactions that haven't committed yet
+                    for missing in range(max(self._cursor + 1, row.id - MAX_GAPS), row.id):
+                        self._gaps.setdefault(missing, now)
+                    self._cursor = row.id
+                else:
+                    continue
+                event = _event(row)
+                for subscription in self._subscribers:
+                    subscription.push(event)
+                self.stats['delivered'] += 1
+
+            # Past the timeout a skipped id was rolled back, not committed late
+            timeout = stream_setting('GAP_TIMEOUT_SECONDS')
+            expired = [missing for missing, seen in self._gaps.items() if now - seen > timeout]
+            for missing in expired:
+                del self._gaps[missing]
+            self.stats['gaps_expired'] += len(expired)
+
+        if now - self._pruned_at > PRUNE_INTERVAL_SECONDS:
+            self._pruned_at = now
+            cutoff = timezone.now() - timedelta(seconds=stream_setting('HISTORY_SECONDS'))
+            self.stats['pruned'] += StreamEvent.objects.filter(created_at__lt=cutoff).delete()[0]
+        return len(rows)
+
+    def counters(self):
+        return {**self.stats, 'subscribers': self.subscriber_count, 'waiting_gaps': len(self._gaps)}
+
+    def _ensure_thread(self):
+        if not stream_setting('POLLER'):
+            return
+        # Started with the first stream, and again in a forked worker since threads don't survive fork
+        with self._lock:
+            if self._running and self._pid == os.getpid():
+                return
+            self._running = True
+            self._pid = os.getpid()
+        threading.Thread(target=self._run, name='change-stream-poller', daemon=True).start()
+
+    def _run(self):
+        try:
+            while True:
+                with self._lock:
+                    if not self._subscribers:
+                        # The next subscribe() starts a new poller from the then latest event
+                        self._running = False
+                        self._cursor = None
+                        self._gaps.clear()
+                        return
+                try:
+                    self.poll()
+                except Exception:
+                    logger.exception('Change stream poll failed')
+                time.sleep(stream_setting('POLL_INTERVAL_SECONDS'))
+        finally:
+            connection.close()
+
+
+broker = ChangeBroker()
+
+
+def publish(event_type, data, project_id=None, user_ids=()):
+    """Publish an event that becomes visible when the surrounding transaction commits"""
+    return broker.publish(event_type, data, project_id=project_id, user_ids=user_ids)
+
+
+def publish_task(task, event_type, project_id=None):
+    data = {
+        'id': task.pk,
+        'project_id': task.project_id,
+        'title': task.title,
+        'status': task.status,
+        'priority': task.priority,
+        'assignee_id': task.assignee_id,
+    }
+    user_ids = {user_id for user_id in (task.assignee_id, task.created_by_id) if user_id}
+    publish(event_type, data, project_id=project_id or task.project_id, user_ids=user_ids)
@@ -0,0 +1,63 @@
+"""Writers for the SyncChange journal read by the delta sync endpoint."""
+from django.db.models import Q
+
+from .models import Project, ProjectMember, SyncChange, Task
+
+# User columns in the representation tasks, projects and memberships embed
+# (api.serializers.UserSerializer). last_active is left out: presence is also
+# written by the activity tracker's queryset UPDATE, which never journals.
+EMBEDDED_USER_FIELDS = frozenset({
+    'username', 'email', 'first_name', 'last_name', 'role', 'profile_picture',
+    'date_joined', 'bio', 'job_title', 'department', 'phone',
+})
+
+
+def record_change(entity_type, entity_id, action='upsert', project_id=None, user_id=None):
+    SyncChange.objects.create(
+        entity_type=entity_type,
+        entity_id=entity_id,
+        action=action,
+        project_id=project_id,
+        user_id=user_id,
+    )
+
+
+def record_task_changes(tasks, previous_projects=None):
+    """Journal updates for tasks written in bulk, bypassing post_save.
+
+    ``previous_projects`` maps task ids to the project they were moved away
+    from, so members of the old project learn that the task left it.
+    """
+    previous_projects = previous_projects or {}
+    entries = []
+    for task in tasks:
+        entries.append(SyncChange(entity_type='task', entity_id=task.id, action='upsert', project_id=task.project_id))
+        old_project_id = previous_projects.get(task.id)
+        if old_project_id and old_project_id != task.project_id:
+            entries.append(SyncChange(entity_type='task', entity_id=task.id, action='upsert', project_id=old_project_id))
+    SyncChange.objects.bulk_create(entries)
+
+
+def record_comment_change(task_id):
+    """Journal the task a comment belongs to: its comment_count is part of the task"""
+    project_id = Task.objects.filter(pk=task_id).values_list('project_id', flat=True).first()
+    record_change('task', task_id, project_id=project_id)
+
+
+def record_user_change(user_id):
+    """Journal every task, project and membership that embeds the user's representation"""
+    entries = [
+        SyncChange(entity_type='membership', entity_id=pk, action='upsert', project_id=project_id)
+        for pk, project_id in ProjectMember.objects.filter(user_id=user_id).values_list('id', 'project_id')
+    ]
+    entries += [
+        SyncChange(entity_type='project', entity_id=pk, action='upsert', project_id=pk)
+        for pk in Project.objects.filter(created_by_id=user_id).values_list('id', flat=True)
+    ]
+    entries += [
+        SyncChange(entity_type='task', entity_id=pk, action='upsert', project_id=project_id)
+        for pk, project_id in Task.objects.filter(
+            Q(assignee_id=user_id) | Q(created_by_id=user_id)
+        ).values_list('id', 'project_id')
+    ]
+    SyncChange.objects.bulk_create(entries)
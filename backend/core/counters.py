@@ -0,0 +1,102 @@
+"""Maintenance of the denormalized ProjectTaskCounter rows.
+
+Task writes turn into per-project deltas applied with F() expressions, so
+concurrent writers never overwrite each other's counts.
+"""
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from .models import Project, ProjectTaskCounter, Task
+
+# Task status -> counter column
+STATUS_FIELDS = {
+    'todo': 'todo',
+    'in-progress': 'in_progress',
+    'review': 'review',
+    'done': 'done',
+}
+COUNTER_FIELDS = ('total', *STATUS_FIELDS.values())
+
+
+def adjust_project_counters(moves):
+    """Apply task changes given as ``(old_project_id, old_status, new_project_id, new_status)``.
+
+    Use ``None`` for the old side of a created task and the new side of a
+    deleted one. Projects without a counter row are skipped; the row is
+    counted from scratch when it is first read.
+    """
+    deltas = defaultdict(lambda: defaultdict(int))
+    for old_project_id, old_status, new_project_id, new_status in moves:
+        if old_project_id:
+            deltas[old_project_id]['total'] -= 1
+            if old_status in STATUS_FIELDS:
+                deltas[old_project_id][STATUS_FIELDS[old_status]] -= 1
+        if new_project_id:
+            deltas[new_project_id]['total'] += 1
+            if new_status in STATUS_FIELDS:
+                deltas[new_project_id][STATUS_FIELDS[new_status]] += 1
+
+    for project_id, changes in deltas.items():
+        changes = {field: delta for field, delta in changes.items() if delta}
+        if not changes:
+            continue
+        # Never insert here: while a project is deleted, its counter row goes
+        # first and the cascaded task deletes land here after it
+        ProjectTaskCounter.objects.filter(project_id=project_id).update(
+            **{field: F(field) + delta for field, delta in changes.items()}
+        )
+
+
+def project_counter(project):
+    """The project's counter row, built on first use"""
+    try:
+        return project.task_counter
+    except ProjectTaskCounter.DoesNotExist:
+        rebuild_project_counters([project.pk])
+        return ProjectTaskCounter.objects.get(project_id=project.pk)
+
+
+def count_project_tasks(project_ids):
+    """Counts straight from the Task table, keyed by project id"""
+    rows = Task.objects.filter(project_id__in=project_ids).values('project_id').annotate(
+        total=Count('id'),
+        **{field: Count('id', filter=Q(status=status)) for status, field in STATUS_FIELDS.items()},
+    ).order_by()
+    counts = {project_id: dict.fromkeys(COUNTER_FIELDS, 0) for project_id in project_ids}
+    for row in rows:
+        counts[row['project_id']] = {field: row[field] for field in COUNTER_FIELDS}
+    return counts
+
+
+def rebuild_project_counters(project_ids=None, dry_run=False):
+    """Recount ``project_ids`` (default: all projects) and fix counters that drifted.
+
+    Returns the ids of projects whose counter was missing or wrong.
+    """
+    if project_ids is None:
+        project_ids = list(Project.objects.values_list('id', flat=True))
+    project_ids = list(project_ids)
+    with transaction.atomic():
+        # Lock the rows so a concurrent F() update isn't overwritten by the recount
+        existing = {
+            counter.project_id: counter
+            for counter in ProjectTaskCounter.objects.select_for_update().filter(project_id__in=project_ids)
+        }
+        expected = count_project_tasks(project_ids)
+
+        drifted, missing = [], []
+        for project_id, counts in expected.items():
+            counter = existing.get(project_id)
+            if counter is None:
+                missing.append(ProjectTaskCounter(project_id=project_id, **counts))
+            elif any(getattr(counter, field) != value for field, value in counts.items()):
+                for field, value in counts.items():
+                    setattr(counter, field, value)
+                drifted.append(counter)
+
+        if not dry_run:
+            ProjectTaskCounter.objects.bulk_create(missing, ignore_conflicts=True)
+            ProjectTaskCounter.objects.bulk_update(drifted, COUNTER_FIELDS)
+    return [counter.project_id for counter in missing + drifted]
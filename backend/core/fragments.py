@@ -0,0 +1,74 @@
+"""Versions for the rendered-representation fragment cache.
+
+Every cached object has a version in the cache, replaced with a fresh value
+whenever the object is saved or deleted. Fragments rendered from older data
+become unreachable and age out of the cache's LRU.
+
+Versions only reach other processes through a shared cache backend. With a
+per-process cache a write bumps the version in the writing process alone, so
+callers must not rely on versions there; see ``cache_is_shared()``.
+"""
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+
+FRAGMENT_TIMEOUT = 3600
+
+# Backends whose entries never leave the process that wrote them
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+def cache_is_shared():
+    """Whether the default cache is shared by every worker process"""
+    return settings.CACHES['default']['BACKEND'] not in PROCESS_LOCAL_CACHES
+
+
+def new_version():
+    """A fresh version stamp.
+
+    Never a reused counter, so an evicted version can't revive stale entries.
+    """
+    return time.time_ns()
+
+
+def _version_key(label, pk):
+    return f'fragment-version:{label}:{pk}'
+
+
+def fragment_versions(label, pks):
+    """Current version of each of ``pks`` for the model ``label``, in one round trip when all exist"""
+    keys = {pk: _version_key(label, pk) for pk in pks}
+    versions = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        now = new_version()
+        for key in missing:
+            cache.add(key, now, None)
+        versions.update(cache.get_many(missing))
+    return {pk: versions.get(key) for pk, key in keys.items()}
+
+
+def bump_fragment_versions(label, *pks):
+    """Invalidate the cached fragments of ``pks`` now and again when the transaction commits.
+
+    The second bump drops fragments other requests rendered from the
+    not-yet-committed rows in between.
+    """
+    pks = {pk for pk in pks if pk is not None}
+    if not pks:
+        return
+
+    def bump():
+        cache.set_many({_version_key(label, pk): new_version() for pk in pks}, None)
+
+    bump()
+    transaction.on_commit(bump)
+
+
+def bump_instance_fragments(instance):
+    bump_fragment_versions(instance._meta.label_lower, instance.pk)
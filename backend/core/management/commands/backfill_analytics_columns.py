@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from core.models import AnalyticsEvent
+
+
+class Command(BaseCommand):
+    help = 'Copy promoted metadata keys (project_id, statuses, priority) into their AnalyticsEvent columns'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        chunk_size = options['chunk_size']
+        fields = AnalyticsEvent.PROMOTED_FIELDS
+        last_id = 0
+        checked = updated = 0
+        while True:
+            # Walk the table in id order so each chunk is an index range scan
+            chunk = list(
+                AnalyticsEvent.objects.filter(id__gt=last_id)
+                .order_by('id')
+                .only('id', 'entity_type', 'entity_id', 'metadata', *fields)[:chunk_size]
+            )
+            if not chunk:
+                break
+            last_id = chunk[-1].id
+            checked += len(chunk)
+
+            changed = []
+            for event in chunk:
+                before = [getattr(event, field) for field in fields]
+                event.promote_metadata()
+                if [getattr(event, field) for field in fields] != before:
+                    changed.append(event)
+            if changed:
+                AnalyticsEvent.objects.bulk_update(changed, fields)
+                updated += len(changed)
+
+        self.stdout.write(self.style.SUCCESS(f'{checked} analytics events checked, {updated} updated'))
@@ -0,0 +1,103 @@
+import logging
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test import override_settings
+from rest_framework.test import APIRequestFactory
+
+from core.models import User
+from core.ratelimit import login_rate_limiter, ratelimit_setting
+
+
+class _Rollback(Exception):
+    pass
+
+
+def _address(index):
+    return f'10.{index >> 16 & 255}.{index >> 8 & 255}.{index & 255}'
+
+
+class Command(BaseCommand):
+    help = 'Measure login throughput and the queries each login runs, on throwaway users that are rolled back'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=200, help='Successful and failed logins to run, each')
+        parser.add_argument('--users', type=int, default=50)
+        parser.add_argument(
+            '--fast-hasher',
+            action='store_true',
+            help='Hash with MD5 so the database work is not hidden behind the password hasher',
+        )
+
+    def handle(self, *args, **options):
+        from api.users import UserViewSet
+
+        self.view = UserViewSet.as_view({'post': 'login'})
+        self.factory = APIRequestFactory()
+        with ExitStack() as stack:
+            if options['fast_hasher']:
+                stack.enter_context(override_settings(PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher']))
+            # The login view logs every attempt
+            logging.disable(logging.WARNING)
+            stack.callback(logging.disable, logging.NOTSET)
+            try:
+                with transaction.atomic():
+                    self._run(options['logins'], options['users'])
+                    raise _Rollback
+            except _Rollback:
+                pass
+
+    def _run(self, logins, user_count):
+        password = 'Benchmark-Passw0rd'
+        users = [
+            User.objects.create_user(f'benchmark-login-{index}', f'benchmark-login-{index}@example.com', password)
+            for index in range(user_count)
+        ]
+        usernames = [user.username for user in users]
+
+        # A distinct address per attempt keeps the per-IP rate limit out of the way
+        self._report('successful', 200, [
+            (usernames[index % user_count], password, _address(index)) for index in range(logins)
+        ])
+        # Stay below the lockout threshold so every attempt does the full failed-login work
+        attempts = min(logins, user_count * (User.MAX_FAILED_LOGIN_ATTEMPTS - 1))
+        self._report('failed', 401, [
+            (usernames[index % user_count], 'wrong-password', _address(logins + index)) for index in range(attempts)
+        ])
+
+        # A burst from one address: attempts over the per-IP limit are rejected before hashing
+        address = _address(2 * logins + attempts)
+        for index in range(ratelimit_setting('IP_LIMIT')):
+            login_rate_limiter.attempt(address, usernames[index % user_count])
+        self._report('rate-limited', 429, [
+            (usernames[index % user_count], password, address) for index in range(logins)
+        ])
+
+    def _report(self, label, expected_status, credentials):
+        statements = Counter()
+
+        def count(execute, sql, params, many, context):
+            statements[sql.lstrip().split(' ', 1)[0].upper()] += 1
+            return execute(sql, params, many, context)
+
+        started = time.perf_counter()
+        with connection.execute_wrapper(count):
+            for username, password, address in credentials:
+                request = self.factory.post(
+                    '/api/users/login/', {'username': username, 'password': password}, format='json', REMOTE_ADDR=address,
+                )
+                response = self.view(request)
+                if response.status_code != expected_status:
+                    self.stderr.write(f'Unexpected {response.status_code} for {username}: {response.data}')
+                    return
+        elapsed = time.perf_counter() - started
+
+        runs = len(credentials)
+        per_login = ', '.join(f'{kind} {total / runs:.2f}' for kind, total in sorted(statements.items()))
+        self.stdout.write(self.style.SUCCESS(
+            f'{label}: {runs} logins in {elapsed:.2f}s, {runs / elapsed:.1f}/s, '
+            f'{elapsed / runs * 1000:.2f} ms each; statements per login: {per_login}'
+        ))
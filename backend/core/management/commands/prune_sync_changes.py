@@ -0,0 +1,20 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.models import SyncChange
+
+
+class Command(BaseCommand):
+    help = 'Delete sync journal entries older than the retention window'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='Retention window in days (default: 30)')
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=options['days'])
+        deleted, _ = SyncChange.objects.filter(timestamp__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(
+            f'Deleted {deleted} sync journal entries; clients with older cursors will receive a full snapshot'
+        ))
@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.access import sync_task_access
+from core.models import Task
+
+
+class Command(BaseCommand):
+    help = 'Rebuild or verify the materialized TaskAccess visibility table'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verify',
+            action='store_true',
+            help='Only report drift; exit with an error if any rows are missing or stale',
+        )
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        verify = options['verify']
+        chunk_size = options['chunk_size']
+        missing_total = extra_total = 0
+
+        task_ids = list(Task.objects.order_by('id').values_list('id', flat=True))
+        for start in range(0, len(task_ids), chunk_size):
+            missing, extra = sync_task_access(task_ids[start:start + chunk_size], dry_run=verify)
+            missing_total += missing
+            extra_total += extra
+
+        summary = f'{len(task_ids)} tasks checked, {missing_total} missing rows, {extra_total} stale rows'
+        if verify:
+            if missing_total or extra_total:
+                raise CommandError(f'TaskAccess drift detected: {summary}')
+            self.stdout.write(self.style.SUCCESS(f'TaskAccess is consistent: {summary}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'TaskAccess rebuilt: {summary}'))
@@ -0,0 +1,38 @@
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import DailyAnalyticsRollup, HourlyAnalyticsRollup, RollupWatermark
+from core.rollups import ROLLUP_LAG, WATERMARK, roll_up_events
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute the hourly and daily analytics rollups up to the last complete hour. '
+        'Run it with --loop as a service, or from cron every few minutes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lag-hours', type=int, default=int(ROLLUP_LAG / timedelta(hours=1)),
+            help='Hours before the watermark to recompute for late events',
+        )
+        parser.add_argument('--rebuild', action='store_true', help='Discard the rollups and rebuild them from all events')
+        parser.add_argument('--loop', action='store_true', help='Keep running, rolling up every --interval seconds')
+        parser.add_argument('--interval', type=int, default=60)
+
+    def handle(self, *args, **options):
+        if options['rebuild']:
+            with transaction.atomic():
+                HourlyAnalyticsRollup.objects.all().delete()
+                DailyAnalyticsRollup.objects.all().delete()
+                RollupWatermark.objects.filter(name=WATERMARK).delete()
+
+        while True:
+            processed = roll_up_events(lag=timedelta(hours=options['lag_hours']))
+            self.stdout.write(self.style.SUCCESS(f'Rolled up {processed} analytics events'))
+            if not options['loop']:
+                return
+            time.sleep(options['interval'])
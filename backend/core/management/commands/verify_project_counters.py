@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.counters import rebuild_project_counters
+
+
+class Command(BaseCommand):
+    help = 'Check ProjectTaskCounter rows against the Task table and repair drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report drift; exit with an error if any counter is missing or wrong',
+        )
+
+    def handle(self, *args, **options):
+        drifted = rebuild_project_counters(dry_run=options['dry_run'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS('Project task counters are consistent'))
+        elif options['dry_run']:
+            raise CommandError(f'Counter drift in {len(drifted)} projects: {sorted(drifted)}')
+        else:
+            self.stdout.write(self.style.SUCCESS(f'Repaired counters for {len(drifted)} projects: {sorted(drifted)}'))
@@ -0,0 +1,18 @@
+from .activity import activity_tracker, tracker_setting
+
+
+class ActivityMiddleware:
+    """Record each authenticated request in the coalescing activity tracker.
+
+    Runs after the view, so users authenticated by DRF (JWT) are seen too.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        user = getattr(request, 'user', None)
+        if user is not None and user.is_authenticated and tracker_setting('ENABLED'):
+            activity_tracker.touch(user)
+        return response
@@ -0,0 +1,29 @@
+# Generated by Django 4.2 on 2026-10-17 04:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_add_existing_creators_as_members'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['user', 'timestamp', 'id'], name='core_analyt_user_id_f6810d_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['user', 'created_at', 'id'], name='core_notifi_user_id_954cd4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['created_at', 'id'], name='core_task_created_fb3515_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='task',
+            index=models.Index(fields=['due_date', 'id'], name='core_task_due_dat_f60266_idx'),
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 4.2 on 2026-10-17 04:02
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_task_access(apps, schema_editor):
+    """Materialize visibility rows for existing tasks"""
+    Task = apps.get_model('core', 'Task')
+    ProjectMember = apps.get_model('core', 'ProjectMember')
+    TaskAccess = apps.get_model('core', 'TaskAccess')
+
+    members = {}
+    for project_id, user_id in ProjectMember.objects.values_list('project_id', 'user_id'):
+        members.setdefault(project_id, set()).add(user_id)
+
+    rows = []
+    for task_id, project_id, assignee_id, created_by_id in Task.objects.values_list(
+        'id', 'project_id', 'assignee_id', 'created_by_id'
+    ):
+        audience = members.get(project_id, set()) | {created_by_id}
+        if assignee_id:
+            audience.add(assignee_id)
+        rows.extend(TaskAccess(user_id=user_id, task_id=task_id) for user_id in audience)
+    TaskAccess.objects.bulk_create(rows, batch_size=1000, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_keyset_pagination_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TaskAccess',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('task', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='access', to='core.task')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='task_access', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'unique_together': {('user', 'task')},
+            },
+        ),
+        migrations.RunPython(populate_task_access, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,111 @@
+from django.db import migrations
+
+# Full-text index over task titles, descriptions and their comments. SQLite
+# only: other backends fall back to LIKE search in api.search.
+CREATE_STATEMENTS = [
+    """
+    CREATE VIRTUAL TABLE core_task_fts USING fts5(
+        title, description, comments,
+        tokenize = 'unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    INSERT INTO core_task_fts(rowid, title, description, comments)
+    SELECT t.id, t.title, t.description,
+           coalesce((SELECT group_concat(c.content, ' ') FROM core_taskcomment c WHERE c.task_id = t.id), '')
+    FROM core_task t
+    """,
+    """
+    CREATE TRIGGER core_task_fts_insert AFTER INSERT ON core_task BEGIN
+        INSERT INTO core_task_fts(rowid, title, description, comments)
+        VALUES (new.id, new.title, new.description, '');
+    END
+    """,
+    """
+    CREATE TRIGGER core_task_fts_update AFTER UPDATE OF title, description ON core_task
+    WHEN old.title IS NOT new.title OR old.description IS NOT new.description BEGIN
+        UPDATE core_task_fts SET title = new.title, description = new.description WHERE rowid = new.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_task_fts_delete AFTER DELETE ON core_task BEGIN
+        DELETE FROM core_task_fts WHERE rowid = old.id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_taskcomment_fts_insert AFTER INSERT ON core_taskcomment BEGIN
+        UPDATE core_task_fts
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM core_taskcomment WHERE task_id = new.task_id), '')
+        WHERE rowid = new.task_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_taskcomment_fts_update AFTER UPDATE OF content, task_id ON core_taskcomment
+    WHEN old.content IS NOT new.content OR old.task_id IS NOT new.task_id BEGIN
+        UPDATE core_task_fts
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM core_taskcomment WHERE task_id = old.task_id), '')
+        WHERE rowid = old.task_id;
+        UPDATE core_task_fts
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM core_taskcomment WHERE task_id = new.task_id), '')
+        WHERE rowid = new.task_id;
+    END
+    """,
+    """
+    CREATE TRIGGER core_taskcomment_fts_delete AFTER DELETE ON core_taskcomment BEGIN
+        UPDATE core_task_fts
+        SET comments = coalesce((SELECT group_concat(content, ' ') FROM core_taskcomment WHERE task_id = old.task_id), '')
+        WHERE rowid = old.task_id;
+    END
+    """,
+]
+
+DROP_STATEMENTS = [
+    'DROP TRIGGER IF EXISTS core_taskcomment_fts_delete',
+    'DROP TRIGGER IF EXISTS core_taskcomment_fts_update',
+    'DROP TRIGGER IF EXISTS core_taskcomment_fts_insert',
+    'DROP TRIGGER IF EXISTS core_task_fts_delete',
+    'DROP TRIGGER IF EXISTS core_task_fts_update',
+    'DROP TRIGGER IF EXISTS core_task_fts_insert',
+    'DROP TABLE IF EXISTS core_task_fts',
+]
+
+
+def fts5_supported(connection):
+    """Check that SQLite was compiled with the FTS5 extension"""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if cursor.fetchone()[0]:
+            return True
+        try:
+            cursor.execute('CREATE VIRTUAL TABLE temp.core_fts5_probe USING fts5(x)')
+            cursor.execute('DROP TABLE temp.core_fts5_probe')
+        except Exception:
+            return False
+    return True
+
+
+def create_task_fts(apps, schema_editor):
+    if not fts5_supported(schema_editor.connection):
+        return
+    for statement in CREATE_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+def drop_task_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    for statement in DROP_STATEMENTS:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_taskaccess'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_task_fts, drop_task_fts),
+    ]
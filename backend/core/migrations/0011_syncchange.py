@@ -0,0 +1,33 @@
+# Generated by Django 4.2 on 2026-10-17 04:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_task_fts'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SyncChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('entity_type', models.CharField(choices=[('task', 'Task'), ('project', 'Project'), ('membership', 'Membership')], max_length=20)),
+                ('entity_id', models.IntegerField()),
+                ('action', models.CharField(choices=[('upsert', 'Created or Updated'), ('delete', 'Deleted')], max_length=10)),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('user_id', models.IntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['project_id', 'id'], name='core_syncch_project_a015f3_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='syncchange',
+            index=models.Index(fields=['user_id', 'id'], name='core_syncch_user_id_921deb_idx'),
+        ),
+    ]
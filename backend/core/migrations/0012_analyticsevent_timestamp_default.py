@@ -0,0 +1,19 @@
+# Generated by Django 4.2 on 2026-10-17 04:09
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_syncchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='analyticsevent',
+            name='timestamp',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+    ]
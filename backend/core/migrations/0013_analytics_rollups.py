@@ -0,0 +1,66 @@
+# Generated by Django 4.2 on 2026-10-17 04:12
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_analyticsevent_timestamp_default'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=50, unique=True)),
+                ('last_event_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HourlyAnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('event_type', models.CharField(max_length=20)),
+                ('entity_type', models.CharField(max_length=20)),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('to_status', models.CharField(blank=True, max_length=20)),
+                ('priority', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.CreateModel(
+            name='DailyAnalyticsRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.DateTimeField()),
+                ('event_type', models.CharField(max_length=20)),
+                ('entity_type', models.CharField(max_length=20)),
+                ('project_id', models.IntegerField(blank=True, null=True)),
+                ('to_status', models.CharField(blank=True, max_length=20)),
+                ('priority', models.CharField(blank=True, max_length=20)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'abstract': False,
+            },
+        ),
+        migrations.AddIndex(
+            model_name='hourlyanalyticsrollup',
+            index=models.Index(fields=['user', 'bucket'], name='core_hourly_user_id_fca5f4_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='dailyanalyticsrollup',
+            index=models.Index(fields=['user', 'bucket'], name='core_dailya_user_id_2da5fd_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-17 04:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_analytics_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='analyticsevent',
+            name='from_status',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='analyticsevent',
+            name='priority',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddField(
+            model_name='analyticsevent',
+            name='project_id',
+            field=models.IntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='analyticsevent',
+            name='to_status',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['project_id', 'timestamp'], name='core_analyt_project_8c1494_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['from_status', 'timestamp'], name='core_analyt_from_st_6663e0_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['to_status', 'timestamp'], name='core_analyt_to_stat_c89be7_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='analyticsevent',
+            index=models.Index(fields=['priority', 'timestamp'], name='core_analyt_priorit_34c9ca_idx'),
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 04:18
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_project_counters(apps, schema_editor):
+    """Count tasks for existing projects"""
+    Project = apps.get_model('core', 'Project')
+    Task = apps.get_model('core', 'Task')
+    ProjectTaskCounter = apps.get_model('core', 'ProjectTaskCounter')
+
+    counters = {project_id: ProjectTaskCounter(project_id=project_id) for project_id in Project.objects.values_list('id', flat=True)}
+    fields = {'todo': 'todo', 'in-progress': 'in_progress', 'review': 'review', 'done': 'done'}
+    for project_id, status, count in Task.objects.values_list('project_id', 'status').annotate(count=models.Count('id')).order_by():
+        counter = counters[project_id]
+        counter.total += count
+        if status in fields:
+            setattr(counter, fields[status], getattr(counter, fields[status]) + count)
+    ProjectTaskCounter.objects.bulk_create(counters.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_analyticsevent_promoted_columns'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProjectTaskCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total', models.IntegerField(default=0)),
+                ('todo', models.IntegerField(default=0)),
+                ('in_progress', models.IntegerField(default=0)),
+                ('review', models.IntegerField(default=0)),
+                ('done', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('project', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='task_counter', to='core.project')),
+            ],
+        ),
+        migrations.RunPython(populate_project_counters, migrations.RunPython.noop),
+    ]
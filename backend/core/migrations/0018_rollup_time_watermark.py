@@ -0,0 +1,30 @@
+# Generated by Django 4.2 on 2026-10-17 05:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_streamevent'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='rollupwatermark',
+            name='last_event_id',
+        ),
+        migrations.AddField(
+            model_name='rollupwatermark',
+            name='rolled_up_until',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='dailyanalyticsrollup',
+            index=models.Index(fields=['bucket'], name='core_dailya_bucket_7160af_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='hourlyanalyticsrollup',
+            index=models.Index(fields=['bucket'], name='core_hourly_bucket_eabc57_idx'),
+        ),
+    ]
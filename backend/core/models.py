@@ -1,16 +1,21 @@
 from django.db import models
+from django.db.models import Case, F, Q, Value, When
 from django.contrib.auth.models import AbstractUser
 from django.utils import timezone
 from django.core.validators import RegexValidator, MinLengthValidator
 from django.contrib.auth.validators import UnicodeUsernameValidator
 import uuid
 
+from .fragments import bump_instance_fragments
+
 class User(AbstractUser):
     """Extended user model with additional fields and security features"""
     ROLE_CHOICES = [
         ('scrum_master', 'Scrum Master'),
         ('employee', 'Employee'),
     ]
+    MAX_FAILED_LOGIN_ATTEMPTS = 5
+    LOCKOUT_MINUTES = 30
     
     # Core user fields
     username_validator = UnicodeUsernameValidator()
@@ -105,37 +110,68 @@ class User(AbstractUser):
         """Lock account for specified duration"""
         self.account_locked = True
         self.locked_until = timezone.now() + timezone.timedelta(minutes=duration_minutes)
-        self.save()
+        self.save(update_fields=['account_locked', 'locked_until'])
     
     def unlock_account(self):
         """Unlock account and reset failed attempts"""
         self.account_locked = False
         self.locked_until = None
         self.failed_login_attempts = 0
-        self.save()
+        self.save(update_fields=['account_locked', 'locked_until', 'failed_login_attempts'])
     
     def increment_failed_login(self):
         """Increment failed login attempts and lock if threshold reached"""
         self.failed_login_attempts += 1
         if self.failed_login_attempts >= 5:  # Lock after 5 failed attempts
             self.lock_account()
-        self.save()
+        self.save(update_fields=['failed_login_attempts'])
     
     def reset_failed_login_attempts(self):
         """Reset failed login attempts on successful login"""
         self.failed_login_attempts = 0
-        self.save()
+        self.save(update_fields=['failed_login_attempts'])
     
     def update_last_active(self):
         """Update last active timestamp"""
         self.last_active = timezone.now()
         self.save(update_fields=['last_active'])
+
+    def record_login(self):
+        """Reset failed attempts and stamp last_login/last_active in one UPDATE.
+
+        The UPDATE only applies while the account is unlocked, so a lock taken
+        by a concurrent failed attempt wins; returns False in that case.
+        """
+        now = timezone.now()
+        updated = User.objects.filter(pk=self.pk, account_locked=False).exclude(locked_until__gt=now).update(
+            failed_login_attempts=0,
+            last_login=now,
+            last_active=now,
+        )
+        if updated:
+            self.failed_login_attempts = 0
+            self.last_login = self.last_active = now
+            # Queryset updates skip post_save, which invalidates cached representations
+            bump_instance_fragments(self)
+        return bool(updated)
+
+    def record_failed_login(self):
+        """Count a failed attempt atomically, locking the account once the limit is reached"""
+        # Conditions read the pre-update row, so the attempt that reaches the limit takes the lock
+        reaches_limit = Q(failed_login_attempts__gte=self.MAX_FAILED_LOGIN_ATTEMPTS - 1)
+        locked_until = timezone.now() + timezone.timedelta(minutes=self.LOCKOUT_MINUTES)
+        User.objects.filter(pk=self.pk).update(
+            failed_login_attempts=F('failed_login_attempts') + 1,
+            account_locked=Case(When(reaches_limit, then=Value(True)), default=F('account_locked')),
+            locked_until=Case(When(reaches_limit, then=Value(locked_until)), default=F('locked_until')),
+        )
+        bump_instance_fragments(self)
     
     def set_password_reset_token(self):
         """Generate new password reset token"""
         self.password_reset_token = uuid.uuid4()
         self.password_reset_expires = timezone.now() + timezone.timedelta(hours=1)
-        self.save()
+        self.save(update_fields=['password_reset_token', 'password_reset_expires'])
     
     def is_password_reset_token_valid(self):
         """Check if password reset token is valid and not expired"""
@@ -154,6 +190,14 @@ class User(AbstractUser):
         self.clean()
         super().save(*args, **kwargs)
 
+    def refresh_from_db(self, using=None, fields=None):
+        # A partially loaded user (e.g. request.user from the auth cache) loads
+        # all its deferred columns on first access instead of one query per field
+        deferred = self.get_deferred_fields()
+        if fields is not None and deferred and set(fields) <= deferred:
+            fields = deferred
+        super().refresh_from_db(using=using, fields=fields)
+
 class Project(models.Model):
     """Project model"""
     STATUS_CHOICES = [
@@ -180,12 +224,8 @@ class Project(models.Model):
     @property
     def progress(self):
         """Calculate project progress based on completed tasks"""
-        tasks = self.tasks.all()
-        if not tasks:
-            return 0
-        
-        completed_tasks = tasks.filter(status='done').count()
-        return int((completed_tasks / tasks.count()) * 100)
+        from .counters import project_counter
+        return project_counter(self).progress
     
     def add_creator_as_member(self):
         """Automatically add the project creator as an admin member"""
@@ -255,9 +295,30 @@ class Task(models.Model):
     updated_at = models.DateTimeField(auto_now=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     
+    class Meta:
+        indexes = [
+            # Keyset pagination orderings: (created_at, id) and (due_date, id)
+            models.Index(fields=['created_at', 'id']),
+            models.Index(fields=['due_date', 'id']),
+        ]
+    
     def __str__(self):
         return self.title
     
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """Remember loaded values so signal handlers can tell what changed on save"""
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+    
+    def refresh_from_db(self, using=None, fields=None):
+        super().refresh_from_db(using=using, fields=fields)
+        refreshed = [self._meta.get_field(name) for name in fields] if fields else self._meta.concrete_fields
+        loaded = getattr(self, '_loaded_values', {})
+        loaded.update({field.attname: getattr(self, field.attname) for field in refreshed if field.concrete})
+        self._loaded_values = loaded
+    
     def clean(self):
         """Validate task assignment - assignee must be a project member"""
         super().clean()
@@ -268,19 +329,122 @@ class Task(models.Model):
                     'assignee': f'User {self.assignee.username} is not a member of project {self.project.name}. Only project members can be assigned tasks.'
                 })
     
-    def save(self, *args, **kwargs):
-        # Validate assignment before saving
-        self.clean()
-        
+    def update_completed_at(self):
+        """Keep completed_at consistent with the current status"""
         # Set completed_at when status changes to 'done'
         if self.status == 'done' and not self.completed_at:
             self.completed_at = timezone.now()
         # Clear completed_at when status changes from 'done'
         elif self.status != 'done' and self.completed_at:
             self.completed_at = None
-        
+    
+    def save(self, *args, **kwargs):
+        # Validate assignment before saving
+        self.clean()
+        self.update_completed_at()
         super().save(*args, **kwargs)
 
+class TaskAccess(models.Model):
+    """Materialized task visibility: one row per user who can see a task.
+
+    A user can see a task when they are its assignee, its creator or a member
+    of its project. Rows are maintained by core.access from signals so that
+    visibility checks are a single indexed semi-join without DISTINCT.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='task_access')
+    task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='access')
+    
+    class Meta:
+        unique_together = ('user', 'task')
+    
+    def __str__(self):
+        return f"{self.user_id} -> {self.task_id}"
+
+class SyncChange(models.Model):
+    """Append-only change journal behind the delta sync endpoint.
+
+    The auto-incrementing id is the change sequence: clients pass the last id
+    they have seen as their cursor. Ids are stored as plain integers rather
+    than foreign keys so that entries outlive the rows they describe.
+    """
+    ENTITY_CHOICES = [
+        ('task', 'Task'),
+        ('project', 'Project'),
+        ('membership', 'Membership'),
+    ]
+    
+    ACTION_CHOICES = [
+        ('upsert', 'Created or Updated'),
+        ('delete', 'Deleted'),
+    ]
+    
+    entity_type = models.CharField(max_length=20, choices=ENTITY_CHOICES)
+    entity_id = models.IntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    project_id = models.IntegerField(null=True, blank=True)
+    user_id = models.IntegerField(null=True, blank=True)  # member added or removed by membership changes
+    timestamp = models.DateTimeField(auto_now_add=True)
+    
+    class Meta:
+        indexes = [
+            models.Index(fields=['project_id', 'id']),
+            models.Index(fields=['user_id', 'id']),
+        ]
+    
+    def __str__(self):
+        return f"#{self.id} {self.action} {self.entity_type} {self.entity_id}"
+
+class RevokedToken(models.Model):
+    """JWT ids that must no longer be accepted, checked through core.revocation.
+
+    Rows are only needed until the token would have expired on its own;
+    prune_revoked_tokens deletes them after that.
+    """
+    jti = models.CharField(max_length=255, unique=True)
+    user_id = models.IntegerField(null=True, blank=True)
+    expires_at = models.DateTimeField(db_index=True)
+    revoked_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.jti} (user {self.user_id})"
+
+class StreamEvent(models.Model):
+    """Outbox behind the server-sent change stream, see core.broker.
+
+    Rows are written in the transaction of the change they describe, so they
+    become visible exactly when it commits, to every worker process. Ids are
+    the event ids clients resume from with Last-Event-ID.
+    """
+    event_type = models.CharField(max_length=50)
+    data = models.JSONField(default=dict)
+    project_id = models.IntegerField(null=True, blank=True)
+    user_ids = models.JSONField(default=list)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self):
+        return f"#{self.id} {self.event_type}"
+
+class ProjectTaskCounter(models.Model):
+    """Denormalized task counts per project, kept current by core.counters.
+
+    Overdue counts are not stored: they change with the calendar, not with
+    writes, so they come from the project analytics aggregate instead.
+    """
+    project = models.OneToOneField(Project, on_delete=models.CASCADE, related_name='task_counter')
+    total = models.IntegerField(default=0)
+    todo = models.IntegerField(default=0)
+    in_progress = models.IntegerField(default=0)
+    review = models.IntegerField(default=0)
+    done = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.project_id}: {self.done}/{self.total} done"
+    
+    @property
+    def progress(self):
+        return int(self.done / self.total * 100) if self.total else 0
+
 class TaskComment(models.Model):
     """Task comment model"""
     task = models.ForeignKey(Task, on_delete=models.CASCADE, related_name='comments')
@@ -369,6 +533,11 @@ class Notification(models.Model):
     is_read = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'created_at', 'id']),
+        ]
+    
     def __str__(self):
         return f"{self.title} for {self.user.username}"
 
@@ -393,9 +562,17 @@ class AnalyticsEvent(models.Model):
     entity_type = models.CharField(max_length=20)  # 'task', 'project', 'comment', etc.
     entity_id = models.IntegerField()
     metadata = models.JSONField(default=dict, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Set when the event happens, not when a buffered batch is written
+    timestamp = models.DateTimeField(default=timezone.now, editable=False)
     ip_address = models.GenericIPAddressField(null=True, blank=True)
     user_agent = models.TextField(blank=True)
+    # Frequently queried metadata keys, copied out of the JSON by promote_metadata()
+    project_id = models.IntegerField(null=True, blank=True)
+    from_status = models.CharField(max_length=20, blank=True)
+    to_status = models.CharField(max_length=20, blank=True)
+    priority = models.CharField(max_length=20, blank=True)
+    
+    PROMOTED_FIELDS = ('project_id', 'from_status', 'to_status', 'priority')
     
     class Meta:
         ordering = ['-timestamp']
@@ -403,7 +580,72 @@ class AnalyticsEvent(models.Model):
             models.Index(fields=['user', 'event_type']),
             models.Index(fields=['timestamp']),
             models.Index(fields=['entity_type', 'entity_id']),
+            models.Index(fields=['user', 'timestamp', 'id']),
+            models.Index(fields=['project_id', 'timestamp']),
+            models.Index(fields=['from_status', 'timestamp']),
+            models.Index(fields=['to_status', 'timestamp']),
+            models.Index(fields=['priority', 'timestamp']),
+        ]
+    
+    def __str__(self):
+        return f"{self.user.username} - {self.event_type} at {self.timestamp}"
+    
+    def promote_metadata(self):
+        """Copy the promoted metadata keys into their columns.
+
+        Called by save(); code that writes with bulk_create must call it itself.
+        """
+        metadata = self.metadata if isinstance(self.metadata, dict) else {}
+        project_id = self.entity_id if self.entity_type == 'project' else metadata.get('project_id')
+        try:
+            self.project_id = int(project_id) if project_id is not None else None
+        except (TypeError, ValueError):
+            self.project_id = None
+        for field in ('from_status', 'to_status', 'priority'):
+            value = metadata.get(field)
+            setattr(self, field, str(value)[:20] if value is not None else '')
+    
+    def save(self, *args, **kwargs):
+        self.promote_metadata()
+        super().save(*args, **kwargs)
+
+
+class AnalyticsRollup(models.Model):
+    """Event counts pre-aggregated per user, bucket and dimensions.
+
+    ``project_id``, ``to_status`` and ``priority`` are the event's promoted
+    metadata columns. Maintained by core.rollups, which recomputes recent
+    buckets from the raw events on every run.
+    """
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='+')
+    bucket = models.DateTimeField()
+    event_type = models.CharField(max_length=20)
+    entity_type = models.CharField(max_length=20)
+    project_id = models.IntegerField(null=True, blank=True)
+    to_status = models.CharField(max_length=20, blank=True)
+    priority = models.CharField(max_length=20, blank=True)
+    count = models.PositiveIntegerField(default=0)
+    
+    class Meta:
+        abstract = True
+        indexes = [
+            models.Index(fields=['user', 'bucket']),
+            models.Index(fields=['bucket']),
         ]
+
+class HourlyAnalyticsRollup(AnalyticsRollup):
+    class Meta(AnalyticsRollup.Meta):
+        pass
+
+class DailyAnalyticsRollup(AnalyticsRollup):
+    class Meta(AnalyticsRollup.Meta):
+        pass
+
+class RollupWatermark(models.Model):
+    """End of the time range the rollup tables cover (hour aligned, exclusive)"""
+    name = models.CharField(max_length=50, unique=True)
+    rolled_up_until = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
-        return f"{self.user.username} - {self.event_type} at {self.timestamp}"
\ No newline at end of file
+        return f"{self.name} @ {self.rolled_up_until}"
@@ -0,0 +1,130 @@
+"""Per-project analytics: computation and a version-keyed cache.
+
+Every task or membership write bumps the project's version once the
+transaction commits, which makes previously cached results unreachable.
+Bumps only reach other workers through a shared cache; with a per-process
+cache results are kept for ``LOCAL_CACHE_TIMEOUT`` seconds instead.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .fragments import cache_is_shared, new_version
+from .models import AnalyticsEvent, ProjectMember, Task
+
+CACHE_TIMEOUT = 300
+# Other workers' version bumps never arrive in a per-process cache
+LOCAL_CACHE_TIMEOUT = 5
+STATUSES = [status for status, _ in Task.STATUS_CHOICES]
+
+
+def _version_key(project_id):
+    return f'project-analytics-version:{project_id}'
+
+
+def project_version(project_id):
+    version = cache.get(_version_key(project_id))
+    if version is None:
+        version = new_version()
+        cache.add(_version_key(project_id), version, None)
+        version = cache.get(_version_key(project_id), version)
+    return version
+
+
+def bump_project_version(*project_ids):
+    """Invalidate cached analytics for ``project_ids`` when the current transaction commits"""
+    project_ids = {project_id for project_id in project_ids if project_id}
+    if project_ids:
+        transaction.on_commit(lambda: cache.set_many({_version_key(pk): new_version() for pk in project_ids}, None))
+
+
+def project_analytics(project, buckets, bucket_size):
+    """Cached analytics for ``project`` over the given bucket starts (newest first)"""
+    key = f'project-analytics:{project.pk}:{project_version(project.pk)}:{buckets[-1].isoformat()}:{len(buckets)}:{bucket_size}'
+    data = cache.get(key)
+    if data is None:
+        data = compute_project_analytics(project, buckets, bucket_size)
+        cache.set(key, data, CACHE_TIMEOUT if cache_is_shared() else LOCAL_CACHE_TIMEOUT)
+    return data
+
+
+def compute_project_analytics(project, buckets, bucket_size):
+    today = timezone.localdate()
+    # One conditional aggregation over the project's tasks, grouped by assignee
+    open_tasks = ~Q(status='done')
+    workload = Task.objects.filter(project=project).values('assignee_id').annotate(
+        total=Count('id'),
+        open=Count('id', filter=open_tasks),
+        overdue=Count('id', filter=open_tasks & Q(due_date__lt=today)),
+        due_this_week=Count('id', filter=open_tasks & Q(due_date__gte=today, due_date__lt=today + timedelta(days=7))),
+        **{f'status_{status}': Count('id', filter=Q(status=status)) for status in STATUSES},
+    ).order_by()
+
+    status_breakdown = dict.fromkeys(STATUSES, 0)
+    totals = defaultdict(int)
+    by_assignee = {}
+    for row in workload:
+        for status in STATUSES:
+            status_breakdown[status] += row[f'status_{status}']
+        for field in ('total', 'open', 'overdue', 'due_this_week'):
+            totals[field] += row[field]
+        by_assignee[row['assignee_id']] = row
+
+    members = []
+    for member in ProjectMember.objects.filter(project=project).select_related('user').order_by('user__username'):
+        row = by_assignee.pop(member.user_id, {})
+        members.append({
+            'user_id': member.user_id,
+            'username': member.user.username,
+            'role': member.role,
+            'total': row.get('total', 0),
+            'open': row.get('open', 0),
+            'overdue': row.get('overdue', 0),
+            **{status: row.get(f'status_{status}', 0) for status in STATUSES},
+        })
+    unassigned = by_assignee.pop(None, {})
+
+    # One bucketed query over the project's task events, via the (entity_type, entity_id) index
+    events = AnalyticsEvent.objects.filter(
+        entity_type='task',
+        entity_id__in=Task.objects.filter(project=project).values('id'),
+        timestamp__gte=buckets[-1],
+    ).annotate(bucket=Trunc('timestamp', bucket_size)).values('bucket').annotate(
+        created=Count('id', filter=Q(event_type='task_created')),
+        completed=Count('id', filter=Q(event_type='task_completed')),
+        reopened=Count('id', filter=Q(event_type='task_moved', from_status='done')),
+    ).order_by()
+    flow = {bucket: {'created': 0, 'completed': 0, 'reopened': 0} for bucket in buckets}
+    for row in events:
+        if row['bucket'] in flow:
+            flow[row['bucket']] = {field: row[field] for field in ('created', 'completed', 'reopened')}
+
+    # Burndown walks back from today's open count through each bucket's flow
+    throughput, burndown = [], []
+    remaining = totals['open']
+    for bucket in buckets:
+        counts = flow[bucket]
+        label = bucket.strftime('%Y-%m-%dT%H:00' if bucket_size == 'hour' else '%Y-%m-%d')
+        throughput.append({'date': label, **counts})
+        burndown.append({'date': label, 'remaining': remaining})
+        remaining = max(remaining - counts['created'] + counts['completed'] - counts['reopened'], 0)
+
+    return {
+        'project_id': project.pk,
+        'project_name': project.name,
+        'total_tasks': totals['total'],
+        'open_tasks': totals['open'],
+        'overdue_tasks': totals['overdue'],
+        'due_this_week': totals['due_this_week'],
+        'status_breakdown': status_breakdown,
+        'progress_percentage': round(status_breakdown['done'] / totals['total'] * 100, 2) if totals['total'] else 0,
+        'workload': members,
+        'unassigned': {'total': unassigned.get('total', 0), 'open': unassigned.get('open', 0)},
+        'throughput': throughput,
+        'burndown': burndown,
+    }
@@ -0,0 +1,137 @@
+"""Sliding-window login rate limits, kept in the cache.
+
+Each limit counts events per key in fixed windows and estimates the
+sliding-window total from the current and previous window, weighting the
+previous one by how much of it still overlaps. That takes two counters per
+key and no per-event timestamps. The login view checks the limits before it
+looks the user up or hashes a password, so rejected attempts cost two cache
+reads. With a per-process cache such as LocMem the limits apply per worker;
+a shared cache backend makes them global.
+"""
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULTS = {
+    'ENABLED': True,
+    # Every attempt from one IP address
+    'IP_LIMIT': 30,
+    'IP_WINDOW_SECONDS': 60,
+    # Failed attempts against one username or email, from any address
+    'IDENTIFIER_LIMIT': 10,
+    'IDENTIFIER_WINDOW_SECONDS': 900,
+    # Reverse proxies in front of the app that append to X-Forwarded-For
+    'TRUSTED_PROXIES': 0,
+}
+
+
+def ratelimit_setting(name):
+    return getattr(settings, 'LOGIN_RATE_LIMITS', {}).get(name, DEFAULTS[name])
+
+
+class SlidingWindow:
+    def __init__(self, scope, limit, window):
+        self.scope = scope
+        self.limit = limit
+        self.window = window
+
+    def _keys(self, key, now):
+        index = int(now // self.window)
+        # Hashed so arbitrary identifiers make valid cache keys
+        digest = hashlib.md5(str(key).encode()).hexdigest()
+        return f'ratelimit:{self.scope}:{digest}:{index}', f'ratelimit:{self.scope}:{digest}:{index - 1}'
+
+    def retry_after(self, key, now=None):
+        """Seconds until ``key`` is below the limit again, or 0 if it is below it now"""
+        now = now or time.time()
+        current_key, previous_key = self._keys(key, now)
+        counts = cache.get_many([current_key, previous_key])
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        elapsed = now % self.window
+        if previous * (1 - elapsed / self.window) + current < self.limit:
+            return 0
+        if current < self.limit:
+            # Wait for the previous window's weight to shrink enough
+            wait = self.window * (1 - (self.limit - current) / previous) - elapsed
+        else:
+            # The current window becomes the previous one and has to shrink the same way
+            wait = self.window - elapsed + self.window * (1 - self.limit / current)
+        return max(1, math.ceil(wait))
+
+    def hit(self, key, now=None):
+        current_key, _ = self._keys(key, now or time.time())
+        # Counters outlive their window by one so they can serve as the previous one
+        if not cache.add(current_key, 1, 2 * self.window):
+            try:
+                cache.incr(current_key)
+            except ValueError:
+                # Expired between add() and incr()
+                cache.add(current_key, 1, 2 * self.window)
+
+    def reset(self, key, now=None):
+        cache.delete_many(self._keys(key, now or time.time()))
+
+
+class LoginRateLimiter:
+    def __init__(self):
+        self.stats = {'checked': 0, 'blocked_ip': 0, 'blocked_identifier': 0}
+
+    def _limits(self):
+        return (
+            SlidingWindow('login-ip', ratelimit_setting('IP_LIMIT'), ratelimit_setting('IP_WINDOW_SECONDS')),
+            SlidingWindow(
+                'login-identifier', ratelimit_setting('IDENTIFIER_LIMIT'), ratelimit_setting('IDENTIFIER_WINDOW_SECONDS'),
+            ),
+        )
+
+    def attempt(self, ip_address, identifier):
+        """Count a login attempt; returns the seconds to wait if it must be rejected, else 0"""
+        if not ratelimit_setting('ENABLED'):
+            return 0
+        self.stats['checked'] += 1
+        by_ip, by_identifier = self._limits()
+        wait = by_ip.retry_after(ip_address)
+        if wait:
+            self.stats['blocked_ip'] += 1
+            return wait
+        wait = by_identifier.retry_after(_normalize(identifier))
+        if wait:
+            self.stats['blocked_identifier'] += 1
+            return wait
+        by_ip.hit(ip_address)
+        return 0
+
+    def failed(self, identifier):
+        if ratelimit_setting('ENABLED'):
+            self._limits()[1].hit(_normalize(identifier))
+
+    def succeeded(self, identifier):
+        if ratelimit_setting('ENABLED'):
+            self._limits()[1].reset(_normalize(identifier))
+
+    def counters(self):
+        return dict(self.stats)
+
+
+def client_address(request):
+    """The address to rate limit ``request`` by.
+
+    Entries of X-Forwarded-For left of those the trusted proxies appended are
+    set by the client, so they are never used: rotating them would evade the
+    limit.
+    """
+    proxies = ratelimit_setting('TRUSTED_PROXIES')
+    forwarded = [part.strip() for part in request.META.get('HTTP_X_FORWARDED_FOR', '').split(',') if part.strip()]
+    if proxies and len(forwarded) >= proxies:
+        return forwarded[-proxies]
+    return request.META.get('REMOTE_ADDR')
+
+
+def _normalize(identifier):
+    return str(identifier).strip().lower()
+
+
+login_rate_limiter = LoginRateLimiter()
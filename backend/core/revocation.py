@@ -0,0 +1,157 @@
+"""Revoked JWT ids, checked through an in-process Bloom filter.
+
+Revoked tokens are ``RevokedToken`` rows, kept until the token would have
+expired anyway. Each process builds a Bloom filter of the unexpired jtis on
+first use. A jti the filter doesn't contain was never revoked, so the common
+case runs no query; a hit is confirmed against the table. Revocations made
+by other processes are loaded incrementally when the shared revocation
+version in the cache changes, and at least every ``SYNC_INTERVAL_SECONDS``
+for caches that aren't shared between processes.
+"""
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import datetime_from_epoch
+
+from .fragments import new_version
+from .models import RevokedToken
+
+DEFAULTS = {
+    # Revocations the filter holds before it is rebuilt larger
+    'FILTER_CAPACITY': 100000,
+    'FALSE_POSITIVE_RATE': 0.001,
+    'SYNC_INTERVAL_SECONDS': 30,
+}
+
+VERSION_KEY = 'token-revocation-version'
+
+
+def revocation_setting(name):
+    return getattr(settings, 'TOKEN_REVOCATION', {}).get(name, DEFAULTS[name])
+
+
+class BloomFilter:
+    """Set membership in a fixed bit array: false positives, never false negatives"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = capacity
+        self.size = max(64, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [(first + index * second) % self.size for index in range(self.hashes)]
+
+    def add(self, value):
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationList:
+    def __init__(self):
+        self._filter = None
+        self._last_id = 0
+        self._version = None
+        self._synced_at = 0.0
+        self._lock = threading.Lock()
+        self.stats = {'checks': 0, 'maybe_revoked': 0, 'false_positives': 0, 'revoked': 0, 'syncs': 0, 'rebuilds': 0}
+
+    def is_revoked(self, jti):
+        self._sync()
+        self.stats['checks'] += 1
+        if jti not in self._filter:
+            return False
+        self.stats['maybe_revoked'] += 1
+        if RevokedToken.objects.filter(jti=jti).exists():
+            return True
+        self.stats['false_positives'] += 1
+        return False
+
+    def revoke(self, jti, expires_at, user_id=None):
+        """Revoke ``jti``; returns False if it was already revoked.
+
+        The unique jti makes this the authoritative check when two requests
+        race to use the same token: only one of them inserts the row.
+        """
+        try:
+            with transaction.atomic():
+                RevokedToken.objects.create(jti=jti, expires_at=expires_at, user_id=user_id)
+        except IntegrityError:
+            return False
+        self.stats['revoked'] += 1
+        with self._lock:
+            if self._filter is not None:
+                # A rolled back revocation only leaves a false positive behind
+                self._filter.add(jti)
+        transaction.on_commit(lambda: cache.set(VERSION_KEY, new_version(), None))
+        return True
+
+    def counters(self):
+        loaded = self._filter.count if self._filter is not None else 0
+        return {**self.stats, 'loaded': loaded}
+
+    def _sync(self):
+        version = cache.get(VERSION_KEY)
+        fresh = time.monotonic() - self._synced_at < revocation_setting('SYNC_INTERVAL_SECONDS')
+        if self._filter is not None and version == self._version and fresh:
+            return
+        with self._lock:
+            if self._filter is None or self._filter.count >= self._filter.capacity:
+                self._rebuild()
+            else:
+                self._load_new()
+            # Read before loading, so revocations committed meanwhile trigger another sync
+            self._version = version
+            self._synced_at = time.monotonic()
+
+    def _rebuild(self):
+        # Rows after last_id are left to the next incremental load
+        last_id = RevokedToken.objects.aggregate(last=Max('id'))['last'] or 0
+        rows = RevokedToken.objects.filter(id__lte=last_id, expires_at__gt=timezone.now())
+        jtis = list(rows.values_list('jti', flat=True))
+        capacity = max(revocation_setting('FILTER_CAPACITY'), 2 * len(jtis))
+        bloom = BloomFilter(capacity, revocation_setting('FALSE_POSITIVE_RATE'))
+        for jti in jtis:
+            bloom.add(jti)
+        self._filter = bloom
+        self._last_id = last_id
+        self.stats['rebuilds'] += 1
+
+    def _load_new(self):
+        for row_id, jti in RevokedToken.objects.filter(id__gt=self._last_id).values_list('id', 'jti'):
+            self._filter.add(jti)
+            self._last_id = max(self._last_id, row_id)
+        self.stats['syncs'] += 1
+
+
+revocation_list = RevocationList()
+
+
+def is_token_revoked(token):
+    return revocation_list.is_revoked(token[api_settings.JTI_CLAIM])
+
+
+def revoke_token(token):
+    """Revoke a simplejwt token until it expires; returns False if it was already revoked"""
+    return revocation_list.revoke(
+        token[api_settings.JTI_CLAIM],
+        datetime_from_epoch(token['exp']),
+        token.get(api_settings.USER_ID_CLAIM),
+    )
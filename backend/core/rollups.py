@@ -0,0 +1,164 @@
+"""Hourly and daily rollups of AnalyticsEvent, by event time.
+
+``roll_up_events()`` recomputes the hourly rollups from the raw events for
+every hour from ``lag`` before the watermark up to the last complete hour,
+then rebuilds the daily rollups of the days it touched from the hourly ones.
+Buckets are replaced, not incremented, so re-running is safe. Events can
+land in an already rolled up hour: the write-behind buffer flushes late and
+batch ingest keeps client timestamps. Re-aggregating the last ``lag`` hours
+picks those up; anything later than that is only counted after
+``rollup_analytics --rebuild``.
+
+Run ``manage.py rollup_analytics --loop`` as a service, or ``rollup_analytics``
+from cron every few minutes. ``event_counts()`` answers "how many events since
+``start``" from the rollups, reading raw rows only for the partial hour at the
+start and for events after the watermark, so it is exact however rarely the
+rollup runs.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, Min, Sum
+from django.db.models.functions import Trunc
+from django.utils import timezone
+
+from .models import AnalyticsEvent, DailyAnalyticsRollup, HourlyAnalyticsRollup, RollupWatermark
+
+WATERMARK = 'analytics_events'
+DIMENSIONS = ('event_type', 'entity_type', 'project_id', 'to_status', 'priority')
+# Hours before the watermark recomputed on every run, for events written late
+ROLLUP_LAG = timedelta(hours=6)
+
+
+def get_watermark():
+    return RollupWatermark.objects.filter(name=WATERMARK).values_list('rolled_up_until', flat=True).first()
+
+
+def roll_up_events(lag=ROLLUP_LAG, now=None):
+    """Recompute the rollups up to the last complete hour; returns the number of events aggregated.
+
+    Works a day at a time, advancing the watermark after each, so a first run
+    over a large table can be interrupted and resumed.
+    """
+    upper = _floor(now or timezone.now(), 'hour')
+    processed = 0
+    resumed = False
+    while True:
+        with transaction.atomic():
+            watermark, _ = RollupWatermark.objects.select_for_update().get_or_create(name=WATERMARK)
+            if watermark.rolled_up_until is None:
+                first = AnalyticsEvent.objects.aggregate(first=Min('timestamp'))['first']
+                lower = _floor(first, 'hour') if first else upper
+            elif resumed:
+                lower = watermark.rolled_up_until
+            else:
+                # Hours rolled up recently may have received events since
+                lower = watermark.rolled_up_until - lag
+            lower = min(lower, upper)
+            if lower == upper:
+                watermark.rolled_up_until = upper
+                watermark.save()
+                return processed
+
+            end = min(_floor(lower, 'day') + timedelta(days=1), upper)
+            processed += _roll_up_hours(lower, end)
+            # May move back within the lag for a moment; reads go to raw events past it
+            watermark.rolled_up_until = end
+            watermark.save()
+        resumed = True
+
+
+def _roll_up_hours(start, end):
+    """Replace the hourly rollups in [start, end) and the daily rollup of start's day"""
+    rows = (
+        AnalyticsEvent.objects.filter(timestamp__gte=start, timestamp__lt=end)
+        .annotate(bucket=Trunc('timestamp', 'hour'))
+        .values('user_id', 'bucket', *DIMENSIONS)
+        .annotate(count=Count('id'))
+        .order_by()
+    )
+    hourly = [HourlyAnalyticsRollup(**row) for row in rows]
+    HourlyAnalyticsRollup.objects.filter(bucket__gte=start, bucket__lt=end).delete()
+    HourlyAnalyticsRollup.objects.bulk_create(hourly)
+
+    day = _floor(start, 'day')
+    rows = (
+        HourlyAnalyticsRollup.objects.filter(bucket__gte=day, bucket__lt=day + timedelta(days=1))
+        .values('user_id', *DIMENSIONS)
+        .annotate(count=Sum('count'))
+        .order_by()
+    )
+    daily = [DailyAnalyticsRollup(bucket=day, **row) for row in rows]
+    DailyAnalyticsRollup.objects.filter(bucket=day).delete()
+    DailyAnalyticsRollup.objects.bulk_create(daily)
+    return sum(rollup.count for rollup in hourly)
+
+
+def event_counts(user, start, group_by, granularity=None, **filters):
+    """Event counts for ``user`` since ``start``, grouped by the ``group_by`` dimensions.
+
+    With ``granularity`` ('hour', 'day' or 'week') each row also carries a
+    ``bucket``; ``start`` must then be aligned to that granularity. Returns a
+    list of dicts with the requested keys and ``count``. ``filters`` are
+    equality filters on dimensions.
+    """
+    watermark = get_watermark()
+    keys = list(group_by) + (['bucket'] if granularity else [])
+    totals = defaultdict(int)
+
+    def add(rows):
+        for row in rows:
+            totals[tuple(row[key] for key in keys)] += row['count']
+
+    def raw(queryset):
+        queryset = queryset.filter(user=user, **filters)
+        if granularity:
+            queryset = queryset.annotate(bucket=Trunc('timestamp', granularity))
+        return queryset.values(*keys).annotate(count=Count('id')).order_by()
+
+    def rolled(model, **bounds):
+        queryset = model.objects.filter(user=user, **bounds, **filters)
+        if granularity:
+            queryset = queryset.annotate(period=Trunc('bucket', granularity))
+            fields = [*group_by, 'period']
+        else:
+            fields = list(group_by)
+        rows = queryset.values(*fields).annotate(count=Sum('count')).order_by()
+        return [{**row, 'bucket': row.get('period')} for row in rows]
+
+    if watermark is None or watermark <= start:
+        add(raw(AnalyticsEvent.objects.filter(timestamp__gte=start)))
+        return [{**dict(zip(keys, key)), 'count': count} for key, count in totals.items()]
+
+    head_end = _ceil(start, 'hour')
+    # Only days wholly before the watermark have a complete daily rollup
+    day_start = min(_ceil(head_end, 'day'), watermark)
+    day_end = max(_floor(watermark, 'day'), day_start)
+    if granularity == 'hour':
+        add(rolled(HourlyAnalyticsRollup, bucket__gte=start, bucket__lt=watermark))
+    else:
+        if start < head_end:
+            add(raw(AnalyticsEvent.objects.filter(timestamp__gte=start, timestamp__lt=head_end)))
+        if head_end < day_start:
+            add(rolled(HourlyAnalyticsRollup, bucket__gte=head_end, bucket__lt=day_start))
+        if day_start < day_end:
+            add(rolled(DailyAnalyticsRollup, bucket__gte=day_start, bucket__lt=day_end))
+        if day_end < watermark:
+            add(rolled(HourlyAnalyticsRollup, bucket__gte=day_end, bucket__lt=watermark))
+    # Events not rolled up yet
+    add(raw(AnalyticsEvent.objects.filter(timestamp__gte=watermark)))
+
+    return [{**dict(zip(keys, key)), 'count': count} for key, count in totals.items()]
+
+
+def _floor(moment, unit):
+    floor = moment.replace(minute=0, second=0, microsecond=0)
+    return floor.replace(hour=0) if unit == 'day' else floor
+
+
+def _ceil(moment, unit):
+    floor = _floor(moment, unit)
+    if floor == moment:
+        return moment
+    return floor + (timedelta(days=1) if unit == 'day' else timedelta(hours=1))
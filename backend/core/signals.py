@@ -0,0 +1,135 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .access import access_changed, grant_project_access, revoke_project_access, sync_task_access
+from .broker import publish, publish_task
+from .changelog import EMBEDDED_USER_FIELDS, record_change, record_comment_change, record_user_change
+from .counters import adjust_project_counters, rebuild_project_counters
+from .fragments import bump_instance_fragments
+from .project_stats import bump_project_version
+from .models import Notification, Project, ProjectMember, ProjectTaskCounter, Task, TaskComment, User
+
+
+@receiver(post_save, sender=Task)
+def task_saved(sender, instance, created, **kwargs):
+    """Keep TaskAccess in sync when a task is created or its audience changes"""
+    if created or access_changed(instance):
+        sync_task_access([instance.pk])
+
+    loaded = getattr(instance, '_loaded_values', None)
+    if created:
+        adjust_project_counters([(None, None, instance.project_id, instance.status)])
+    elif loaded is None or not {'project_id', 'status'} <= loaded.keys():
+        rebuild_project_counters({instance.project_id, (loaded or {}).get('project_id')} - {None})
+    elif (loaded['project_id'], loaded['status']) != (instance.project_id, instance.status):
+        adjust_project_counters([(loaded['project_id'], loaded['status'], instance.project_id, instance.status)])
+
+    record_change('task', instance.pk, project_id=instance.project_id)
+    # A replaced assignee outside the project loses the task without a journal entry it can read
+    old_assignee_id = (loaded or {}).get('assignee_id')
+    if not created and old_assignee_id and old_assignee_id != instance.assignee_id:
+        record_change('task', instance.pk, project_id=instance.project_id, user_id=old_assignee_id)
+    old_project_id = getattr(instance, '_loaded_values', {}).get('project_id')
+    if not created and old_project_id and old_project_id != instance.project_id:
+        record_change('task', instance.pk, project_id=old_project_id)
+        publish_task(instance, 'task.deleted', project_id=old_project_id)
+    publish_task(instance, 'task.created' if created else 'task.updated')
+    bump_project_version(instance.project_id, old_project_id)
+    bump_instance_fragments(instance)
+
+    instance._loaded_values = {field.attname: getattr(instance, field.attname) for field in sender._meta.concrete_fields}
+
+
+@receiver(post_delete, sender=Task)
+def task_deleted(sender, instance, **kwargs):
+    loaded = getattr(instance, '_loaded_values', None) or {}
+    adjust_project_counters([(loaded.get('project_id', instance.project_id), loaded.get('status', instance.status), None, None)])
+    record_change('task', instance.pk, action='delete', project_id=instance.project_id)
+    # Their TaskAccess rows are gone with the task, so address the tombstone to them directly
+    for user_id in {instance.assignee_id, instance.created_by_id} - {None}:
+        record_change('task', instance.pk, action='delete', project_id=instance.project_id, user_id=user_id)
+    publish_task(instance, 'task.deleted')
+    bump_project_version(instance.project_id)
+    bump_instance_fragments(instance)
+
+
+@receiver(post_save, sender=Project)
+def project_saved(sender, instance, created, **kwargs):
+    if created:
+        ProjectTaskCounter.objects.get_or_create(project=instance)
+    record_change('project', instance.pk, project_id=instance.pk)
+    bump_project_version(instance.pk)
+    bump_instance_fragments(instance)
+    publish(
+        'project.created' if created else 'project.updated',
+        {'id': instance.pk, 'name': instance.name, 'status': instance.status},
+        project_id=instance.pk,
+    )
+
+
+@receiver(post_delete, sender=Project)
+def project_deleted(sender, instance, **kwargs):
+    record_change('project', instance.pk, action='delete', project_id=instance.pk)
+    bump_instance_fragments(instance)
+    publish('project.deleted', {'id': instance.pk}, project_id=instance.pk)
+
+
+@receiver(post_save, sender=ProjectMember)
+def project_member_saved(sender, instance, created, **kwargs):
+    if created:
+        grant_project_access(instance.project_id, instance.user_id)
+    record_change('membership', instance.pk, project_id=instance.project_id, user_id=instance.user_id)
+    bump_project_version(instance.project_id)
+    bump_instance_fragments(instance)
+    publish(
+        'membership.created' if created else 'membership.updated',
+        {'id': instance.pk, 'project_id': instance.project_id, 'user_id': instance.user_id, 'role': instance.role},
+        project_id=instance.project_id,
+        user_ids=[instance.user_id],
+    )
+
+
+@receiver(post_delete, sender=ProjectMember)
+def project_member_deleted(sender, instance, **kwargs):
+    revoke_project_access(instance.project_id, instance.user_id)
+    record_change('membership', instance.pk, action='delete', project_id=instance.project_id, user_id=instance.user_id)
+    bump_project_version(instance.project_id)
+    bump_instance_fragments(instance)
+    publish(
+        'membership.deleted',
+        {'id': instance.pk, 'project_id': instance.project_id, 'user_id': instance.user_id},
+        project_id=instance.project_id,
+        user_ids=[instance.user_id],
+    )
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def user_changed(sender, instance, **kwargs):
+    """Drop the user's cached representations, which every task and project embeds"""
+    bump_instance_fragments(instance)
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Nothing embeds a new user yet; deletes cascade to rows that journal themselves
+    if created:
+        return
+    # Presence and login bookkeeping saves don't change the embedded representation
+    if update_fields is None or update_fields & EMBEDDED_USER_FIELDS:
+        record_user_change(instance.pk)
+
+
+@receiver(post_save, sender=TaskComment)
+@receiver(post_delete, sender=TaskComment)
+def comment_changed(sender, instance, **kwargs):
+    record_comment_change(instance.task_id)
+
+
+@receiver(post_save, sender=Notification)
+def notification_saved(sender, instance, created, **kwargs):
+    publish(
+        'notification.created' if created else 'notification.updated',
+        {'id': instance.pk, 'type': instance.type, 'title': instance.title, 'is_read': instance.is_read},
+        user_ids=[instance.user_id],
+    )
@@ -0,0 +1,99 @@
+"""Lead time and cycle time percentiles for completed tasks.
+
+Lead time runs from ``Task.created_at`` to ``Task.completed_at``. Cycle time
+runs from the first time the task was moved to in-progress, taken from the
+task_moved analytics events, to ``completed_at``. Durations are computed in
+SQL and fetched as columns; grouping and percentiles are done with NumPy.
+"""
+import numpy as np
+from django.db.models import DurationField, ExpressionWrapper, F, Min, OuterRef, Subquery
+
+from .models import AnalyticsEvent
+
+PERCENTILES = (50, 90, 99)
+GROUPS = {
+    'priority': 'priority',
+    'assignee': 'assignee_id',
+    'project': 'project_id',
+}
+
+
+def first_started_at():
+    """Timestamp of the task's first move to in-progress"""
+    return Subquery(
+        AnalyticsEvent.objects.filter(
+            entity_type='task',
+            entity_id=OuterRef('pk'),
+            event_type='task_moved',
+            to_status='in-progress',
+            # Ignore events from a deleted task that had the same id
+            timestamp__gte=OuterRef('created_at'),
+            timestamp__lte=OuterRef('completed_at'),
+        ).values('entity_id').annotate(first=Min('timestamp')).values('first')[:1]
+    )
+
+
+def task_time_metrics(tasks):
+    """Lead and cycle time statistics, in hours, for the completed tasks in ``tasks``.
+
+    Returns ``{'lead_time': ..., 'cycle_time': ...}``; each holds ``overall``
+    stats and ``by_priority`` / ``by_assignee`` / ``by_project`` lists.
+    """
+    rows = tasks.filter(completed_at__isnull=False).annotate(
+        lead=ExpressionWrapper(F('completed_at') - F('created_at'), output_field=DurationField()),
+        cycle=ExpressionWrapper(F('completed_at') - first_started_at(), output_field=DurationField()),
+    ).values_list('priority', 'assignee_id', 'project_id', 'lead', 'cycle').order_by()
+
+    columns = list(zip(*rows)) or [(), (), (), (), ()]
+    priority, assignee, project, lead, cycle = columns
+    keys = {
+        'priority': np.array(priority, dtype=object),
+        'assignee': np.array(assignee, dtype=object),
+        'project': np.array(project, dtype=object),
+    }
+    lead_hours = _hours(lead)
+    cycle_hours = _hours(cycle)
+
+    return {
+        'lead_time': _summarize(lead_hours, keys),
+        'cycle_time': _summarize(cycle_hours, keys),
+    }
+
+
+def _hours(durations):
+    """timedelta column to float hours; unknown durations become NaN"""
+    return np.array(durations, dtype='timedelta64[us]') / np.timedelta64(1, 'h')
+
+
+def _summarize(hours, keys):
+    known = ~np.isnan(hours)
+    summary = {'overall': _stats(hours[known])}
+    for name, values in keys.items():
+        summary[f'by_{name}'] = _grouped_stats(name, values[known], hours[known])
+    return summary
+
+
+def _grouped_stats(name, keys, hours):
+    if not len(hours):
+        return []
+    # Sort by group once, then compute each group's stats on its contiguous slice
+    labels, inverse = np.unique(keys.astype(str), return_inverse=True)
+    order = np.argsort(inverse, kind='stable')
+    bounds = np.searchsorted(inverse[order], np.arange(len(labels) + 1))
+    results = []
+    for index in range(len(labels)):
+        members = order[bounds[index]:bounds[index + 1]]
+        key = keys[members[0]]
+        results.append({name: key, **_stats(hours[members])})
+    return sorted(results, key=lambda item: item['count'], reverse=True)
+
+
+def _stats(hours):
+    if not len(hours):
+        return {'count': 0, 'mean': None, **{f'p{p}': None for p in PERCENTILES}}
+    percentiles = np.percentile(hours, PERCENTILES)
+    return {
+        'count': int(len(hours)),
+        'mean': round(float(hours.mean()), 2),
+        **{f'p{p}': round(float(value), 2) for p, value in zip(PERCENTILES, percentiles)},
+    }
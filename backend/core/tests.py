@@ -1,3 +1,1474 @@
-from django.test import TestCase
+import json
+from io import StringIO
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django import test
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from api.compiled import compile_serializer
+from api.query_planner import plan_queryset
+from api.search import fts_available, search_tasks
+from api.serializers import MEMBER_PREVIEW_SIZE, AnalyticsEventSerializer, ProjectListSerializer, TaskSerializer
+from api.tasks import TaskViewSet
+from .activity import ActivityTracker
+from .analytics_buffer import analytics_buffer
+from .background import BackgroundFlusher
+from .broker import ChangeBroker, publish
+from .access import sync_task_access, visible_tasks
+from .counters import rebuild_project_counters
+from .fragments import fragment_versions
+from .project_stats import CACHE_TIMEOUT, LOCAL_CACHE_TIMEOUT
+from .rollups import event_counts, get_watermark, roll_up_events
+from .task_metrics import task_time_metrics
+from .models import (
+    AnalyticsEvent, HourlyAnalyticsRollup, Project, ProjectMember, ProjectTaskCounter, StreamEvent, SyncChange, Task,
+    TaskComment, User,
+)
+from .revocation import BloomFilter
+
+
+class TestCase(test.TestCase):
+    """Starts every test with an empty cache.
+
+    Cached rows, fragments and versions would otherwise outlive the rolled
+    back data of earlier tests, whose primary keys later tests reuse.
+    """
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+
+
+class CompiledSerializerParityTests(TestCase):
+    """The compiled read path must render exactly what the regular serializers render"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user(
+            'manager', 'manager@example.com', 'Passw0rd!', role='scrum_master',
+            profile_picture='profile_pictures/manager.png', bio='Runs the board',
+        )
+        cls.members = [
+            User.objects.create_user(f'member{i}', f'member{i}@example.com', 'Passw0rd!', first_name=f'Member {i}')
+            for i in range(3)
+        ]
+        cls.projects = []
+        for index in range(2):
+            project = Project.objects.create(
+                name=f'Project {index}', description='Parity', created_by=cls.manager,
+                start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            )
+            ProjectMember.objects.create(project=project, user=cls.manager, role='admin')
+            for user in cls.members:
+                ProjectMember.objects.create(project=project, user=user)
+            cls.projects.append(project)
+
+        statuses = ['todo', 'in-progress', 'review', 'done']
+        priorities = ['low', 'medium', 'high', 'urgent']
+        for index in range(12):
+            task = Task.objects.create(
+                title=f'Parity task {index}',
+                description='' if index % 5 == 0 else f'Description for task {index}',
+                status=statuses[index % 4],
+                priority=priorities[index % 4],
+                due_date=date.today() + timedelta(days=index % 5),
+                project=cls.projects[index % 2],
+                created_by=cls.manager,
+                assignee=None if index % 4 == 0 else cls.members[index % 3],
+            )
+            for _ in range(index % 3):
+                TaskComment.objects.create(task=task, user=cls.manager, content='Looks good')
+
+        for index in range(6):
+            AnalyticsEvent.objects.create(
+                user=cls.manager,
+                event_type='task_moved',
+                entity_type='task',
+                entity_id=index,
+                metadata={'from_status': 'todo', 'to_status': 'review', 'nested': {'index': index}},
+                ip_address=None if index % 2 else '10.0.0.1',
+                user_agent='tests',
+            )
+
+    def request(self, query=''):
+        request = Request(APIRequestFactory().get(f'/api/tasks/?{query}'))
+        request.user = self.manager
+        return request
+
+    def assertParity(self, serializer_class, queryset, query=''):
+        context = {'request': self.request(query)}
+        serializer = serializer_class(context=context)
+        compiled = compile_serializer(serializer)
+        self.assertIsNotNone(compiled)
+
+        queryset = plan_queryset(queryset, serializer)
+        expected = serializer_class(queryset, many=True, context=context).data
+        actual = compiled.render(compiled.rows(queryset))
+        self.assertTrue(expected)
+        self.assertEqual(JSONRenderer().render(actual), JSONRenderer().render(expected))
+
+    def test_task_serializer(self):
+        self.assertParity(TaskSerializer, Task.objects.order_by('id'))
+
+    def test_task_serializer_sparse_fieldsets(self):
+        for query in (
+            'fields=id,title,status,priority,assignee.id,assignee.username,assignee.profile_picture',
+            'fields=id,due_date,project.name,project.members.user.username',
+            'expand=',
+            'expand=assignee,project',
+            'fields=id,comment_count&expand=',
+        ):
+            with self.subTest(query=query):
+                self.assertParity(TaskSerializer, Task.objects.order_by('id'), query)
+
+    def test_task_search_snippets(self):
+        tasks = search_tasks(Task.objects.order_by('id'), 'parity')
+        self.assertParity(TaskSerializer, tasks)
+        self.assertParity(TaskSerializer, tasks, 'fields=id,title')
+
+    def test_analytics_event_serializer(self):
+        self.assertParity(AnalyticsEventSerializer, AnalyticsEvent.objects.all())
+        self.assertParity(AnalyticsEventSerializer, AnalyticsEvent.objects.all(), 'fields=id,metadata,ip_address')
+
+    def test_unsupported_serializer_falls_back(self):
+        self.assertIsNone(compile_serializer(ProjectListSerializer()))
+
+    def test_task_list_endpoint(self):
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        for url in (
+            '/api/tasks/?page_size=100&ordering=created_at',
+            '/api/tasks/?cursor=&ordering=-due_date&page_size=5&fields=id,title',
+            '/api/tasks/created_by_me/?fields=id,title,assignee.username',
+            '/api/tasks/?search=parity&expand=assignee',
+        ):
+            with self.subTest(url=url):
+                compiled = client.get(url)
+                TaskViewSet.compiled_list = False
+                try:
+                    regular = client.get(url)
+                finally:
+                    TaskViewSet.compiled_list = True
+                self.assertEqual(compiled.status_code, 200)
+                self.assertGreater(len(compiled.content), 100)
+                self.assertEqual(compiled.content, regular.content)
+
+
+class FragmentCacheTests(TestCase):
+    """Cached fragments must never outlive the rows they were rendered from"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('lead', 'lead@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Cached', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        cls.task = Task.objects.create(
+            title='Cached task', project=cls.project, created_by=cls.manager,
+            assignee=cls.manager, due_date=date.today(),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def test_nested_user_is_invalidated_on_save(self):
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task.pk}/').json()['assignee']['first_name'], '')
+        self.manager.first_name = 'Renamed'
+        self.manager.save()
+        data = self.client.get(f'/api/tasks/{self.task.pk}/').json()
+        self.assertEqual(data['assignee']['first_name'], 'Renamed')
+        self.assertEqual(data['project']['members'][0]['user']['first_name'], 'Renamed')
+
+    def test_bulk_update_invalidates_tasks(self):
+        self.client.get('/api/tasks/?page_size=100')
+        response = self.client.post('/api/tasks/bulk/', {'operations': [{'id': self.task.pk, 'priority': 'urgent'}]}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.client.get(f'/api/tasks/{self.task.pk}/').json()['priority'], 'urgent')
+
+    def test_writes_without_a_local_version_bump_are_seen(self):
+        # A queryset update bumps nothing, like a write made by another worker with a per-process cache
+        self.client.get(f'/api/tasks/{self.task.pk}/')
+        User.objects.filter(pk=self.manager.pk).update(first_name='Elsewhere')
+        Task.objects.filter(pk=self.task.pk).update(title='Retitled', updated_at=timezone.now())
+        data = self.client.get(f'/api/tasks/{self.task.pk}/').json()
+        self.assertEqual(data['title'], 'Retitled')
+        self.assertEqual(data['assignee']['first_name'], 'Elsewhere')
+
+
+class LoginTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('login', 'login@example.com', 'Passw0rd!')
+
+    def login(self, password):
+        return APIClient().post('/api/users/login/', {'username': 'login@example.com', 'password': password}, format='json')
+
+    def test_successful_login_resets_failed_attempts(self):
+        self.assertEqual(self.login('wrong').status_code, 401)
+        self.assertEqual(self.login('Passw0rd!').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.failed_login_attempts, 0)
+        self.assertIsNotNone(self.user.last_login)
+
+    def test_failed_attempts_lock_the_account(self):
+        for _ in range(User.MAX_FAILED_LOGIN_ATTEMPTS):
+            self.assertEqual(self.login('wrong').status_code, 401)
+        self.user.refresh_from_db()
+        self.assertEqual(self.user.failed_login_attempts, User.MAX_FAILED_LOGIN_ATTEMPTS)
+        self.assertTrue(self.user.is_account_locked())
+        self.assertEqual(self.login('Passw0rd!').status_code, 423)
+
+
+class CachedAuthenticationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('cached', 'cached@example.com', 'Passw0rd!')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {RefreshToken.for_user(self.user).access_token}')
+
+    def test_warm_cache_resolves_user_without_query(self):
+        self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.client.get('/api/tasks/').status_code, 200)
+        self.assertFalse([query for query in queries if 'FROM "core_user"' in query['sql']])
+
+    def test_lock_invalidates_cached_user(self):
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 200)
+        self.user.lock_account()
+        self.assertEqual(self.client.get('/api/users/profile/').status_code, 401)
+
+
+class TokenRevocationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('revoked', 'revoked@example.com', 'Passw0rd!')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+
+    def refresh(self, token):
+        return self.client.post('/api/token/refresh/', {'refresh': str(token)}, format='json')
+
+    def test_rotated_refresh_token_cannot_be_reused(self):
+        token = RefreshToken.for_user(self.user)
+        response = self.refresh(token)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.refresh(response.data['refresh']).status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_logout_revokes_refresh_token(self):
+        token = RefreshToken.for_user(self.user)
+        self.assertEqual(self.client.post('/api/users/logout/', {'refresh': str(token)}, format='json').status_code, 200)
+        self.assertEqual(self.refresh(token).status_code, 401)
+
+    def test_bloom_filter_has_no_false_negatives(self):
+        bloom = BloomFilter(1000, 0.01)
+        values = [f'jti-{index}' for index in range(1000)]
+        for value in values:
+            bloom.add(value)
+        self.assertTrue(all(value in bloom for value in values))
+        self.assertLess(sum(f'other-{index}' in bloom for index in range(10000)), 300)
+
+
+@override_settings(LOGIN_RATE_LIMITS={'IP_LIMIT': 3, 'IDENTIFIER_LIMIT': 2})
+class LoginRateLimitTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('limited', 'limited@example.com', 'Passw0rd!')
+
+    def setUp(self):
+        super().setUp()
+        # Mid-window, so the counts can't roll into the next window during a test
+        clock = mock.patch('core.ratelimit.time.time', return_value=1_800_000_030.0)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def login(self, password, address='10.0.0.1'):
+        return APIClient().post(
+            '/api/users/login/', {'username': 'limited', 'password': password}, format='json', REMOTE_ADDR=address,
+        )
+
+    def test_ip_limit_rejects_before_any_query(self):
+        for address in ('10.0.0.2', '10.0.0.3'):
+            self.assertEqual(self.login('Passw0rd!', address).status_code, 200)
+        for _ in range(3):
+            self.assertEqual(self.login('Passw0rd!').status_code, 200)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.login('Passw0rd!')
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+        self.assertEqual(len(queries), 0)
+        self.assertEqual(self.login('Passw0rd!', '10.0.0.4').status_code, 200)
+
+    def test_identifier_limit_counts_failures_from_any_address(self):
+        self.assertEqual(self.login('wrong', '10.0.0.2').status_code, 401)
+        self.assertEqual(self.login('wrong', '10.0.0.3').status_code, 401)
+        self.assertEqual(self.login('Passw0rd!', '10.0.0.4').status_code, 429)
+
+    def test_blocked_attempts_are_reported_in_metrics(self):
+        staff = User.objects.create_user('limits-staff', 'limits-staff@example.com', 'Passw0rd!', is_staff=True)
+        client = APIClient()
+        client.force_authenticate(staff)
+        before = client.get('/api/metrics/').data['data']['login_rate_limits']
+        for _ in range(2):
+            self.login('wrong')
+        self.assertEqual(self.login('Passw0rd!').status_code, 429)
+        after = client.get('/api/metrics/').data['data']['login_rate_limits']
+        self.assertEqual(after['blocked_identifier'], before['blocked_identifier'] + 1)
+
+
+class ProjectCounterTests(TestCase):
+    """ProjectTaskCounter rows must match a recount of the Task table after every kind of write"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('counter', 'counter@example.com', 'Passw0rd!', role='scrum_master')
+        cls.projects = [
+            Project.objects.create(
+                name=f'Counted {index}', description='', created_by=cls.manager,
+                start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            )
+            for index in range(2)
+        ]
+        for project in cls.projects:
+            ProjectMember.objects.create(project=project, user=cls.manager, role='admin')
+
+    def create_task(self, project, status='todo'):
+        return Task.objects.create(
+            title='Counted task', project=project, status=status, created_by=self.manager, due_date=date.today(),
+        )
+
+    def assertCounters(self, **expected):
+        self.assertEqual(rebuild_project_counters(dry_run=True), [])
+        counter = ProjectTaskCounter.objects.get(project=self.projects[0])
+        self.assertEqual({field: getattr(counter, field) for field in expected}, expected)
+
+    def test_create_move_and_delete(self):
+        tasks = [self.create_task(self.projects[0], status) for status in ('todo', 'todo', 'review', 'done')]
+        self.assertCounters(total=4, todo=2, review=1, done=1)
+
+        tasks[0].status = 'done'
+        tasks[0].save()
+        tasks[1].project = self.projects[1]
+        tasks[1].save()
+        self.assertCounters(total=3, todo=0, review=1, done=2)
+
+        client = APIClient()
+        client.force_authenticate(self.manager)
+        response = client.post('/api/tasks/bulk/', {'operations': [
+            {'id': tasks[2].pk, 'status': 'in-progress'},
+            {'id': tasks[3].pk, 'project_id': self.projects[1].pk},
+        ]}, format='json')
+        self.assertEqual(response.data['updated'], 2)
+        self.assertCounters(total=2, in_progress=1, review=0, done=1)
+
+        tasks[0].delete()
+        self.assertCounters(total=1, in_progress=1, done=0)
+
+    def test_deleting_a_project_with_tasks(self):
+        for status in ('todo', 'done'):
+            self.create_task(self.projects[0], status)
+        self.create_task(self.projects[1])
+        self.projects[0].delete()
+        self.assertFalse(ProjectTaskCounter.objects.filter(project_id=self.projects[0].pk).exists())
+        self.assertEqual(rebuild_project_counters(dry_run=True), [])
+
+    def test_deleting_the_owner_of_projects_with_tasks(self):
+        self.create_task(self.projects[0])
+        self.manager.delete()
+        self.assertFalse(ProjectTaskCounter.objects.exists())
+
+    def test_missing_counter_is_rebuilt_on_read(self):
+        self.create_task(self.projects[0], 'done')
+        ProjectTaskCounter.objects.all().delete()
+        self.create_task(self.projects[0])
+        self.assertEqual(Project.objects.get(pk=self.projects[0].pk).progress, 50)
+
+
+class ConditionalGetTests(TestCase):
+    """A 304 must only be sent while every serialized dependency of the response is unchanged"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('etag', 'etag@example.com', 'Passw0rd!', role='scrum_master')
+        cls.member = User.objects.create_user('etag-member', 'etag-member@example.com', 'Passw0rd!')
+        cls.project = Project.objects.create(
+            name='Validated', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        ProjectMember.objects.create(project=cls.project, user=cls.member)
+        cls.task = Task.objects.create(
+            title='Validated task', project=cls.project, created_by=cls.manager,
+            assignee=cls.member, due_date=date.today(),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def assertInvalidated(self, url, change):
+        first = self.client.get(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag']).status_code, 304)
+        change()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], first['ETag'])
+        return response
+
+    def test_task_write_invalidates_list_and_detail(self):
+        def rename():
+            self.task.title = 'Renamed'
+            self.task.save()
+        self.assertInvalidated('/api/tasks/', rename)
+        self.assertInvalidated(f'/api/tasks/{self.task.pk}/', rename)
+
+    def test_comment_invalidates_task_list(self):
+        def comment():
+            self.client.post(f'/api/tasks/{self.task.pk}/add_comment/', {'content': 'New'}, format='json')
+        response = self.assertInvalidated('/api/tasks/', comment)
+        self.assertEqual(response.json()['results'][0]['comment_count'], 1)
+        self.assertInvalidated('/api/tasks/', lambda: TaskComment.objects.all().delete())
+
+    def test_assignee_profile_edit_invalidates_lists(self):
+        def edit_profile():
+            client = APIClient()
+            client.force_authenticate(self.member)
+            client.put('/api/users/update_profile/', {'first_name': 'Edited'}, format='json')
+        response = self.assertInvalidated('/api/tasks/', edit_profile)
+        self.assertEqual(response.json()['results'][0]['assignee']['first_name'], 'Edited')
+
+        def rename_manager():
+            self.manager.last_name = 'Lead'
+            self.manager.save()
+        self.assertInvalidated('/api/projects/', rename_manager)
+
+
+    def test_creator_outside_the_project_sees_task_writes(self):
+        own = Task.objects.create(title='Own', project=self.project, created_by=self.member, due_date=date.today())
+        self.task.assignee = None
+        self.task.save()
+        ProjectMember.objects.filter(project=self.project, user=self.member).delete()
+        self.client.force_authenticate(self.member)
+
+        def rename():
+            own.title = 'Renamed own'
+            own.save()
+        response = self.assertInvalidated('/api/tasks/', rename)
+        self.assertEqual([task['title'] for task in response.json()['results']], ['Renamed own'])
+
+class ChangeBrokerTests(TestCase):
+    """Stream events come from the shared StreamEvent table, so they reach streams in any worker"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('stream', 'stream@example.com', 'Passw0rd!')
+        cls.outsider = User.objects.create_user('stream-out', 'stream-out@example.com', 'Passw0rd!')
+        cls.project = Project.objects.create(
+            name='Streamed', description='', created_by=cls.owner,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.owner, role='admin')
+
+    def setUp(self):
+        super().setUp()
+        # A broker per test stands in for another worker process reading the same table
+        self.broker = ChangeBroker()
+
+    def subscribe(self, user, last_event_id=None):
+        subscription = self.broker.subscribe(user.id, [self.project.id] if user == self.owner else [], last_event_id)
+        self.addCleanup(self.broker.unsubscribe, subscription)
+        return subscription
+
+    def create_task(self, title):
+        return Task.objects.create(title=title, project=self.project, created_by=self.owner, due_date=date.today())
+
+    def test_events_are_delivered_by_poll_and_filtered_by_membership(self):
+        member, outsider = self.subscribe(self.owner), self.subscribe(self.outsider)
+        task = self.create_task('Published')
+        self.assertEqual(member.get(timeout=0), ([], False))
+
+        self.broker.poll()
+        events, overflowed = member.get(timeout=0)
+        self.assertFalse(overflowed)
+        self.assertEqual([(event.type, event.data['id']) for event in events], [('task.created', task.id)])
+        self.assertEqual(outsider.get(timeout=0), ([], False))
+
+    def test_added_member_starts_receiving_project_events(self):
+        subscription = self.subscribe(self.outsider)
+        ProjectMember.objects.create(project=self.project, user=self.outsider)
+        self.create_task('After joining')
+        self.broker.poll()
+        events, _ = subscription.get(timeout=0)
+        self.assertEqual([event.type for event in events], ['membership.created', 'task.created'])
+
+    def test_reconnect_replays_events_after_last_event_id(self):
+        self.subscribe(self.owner)
+        self.create_task('Seen')
+        self.broker.poll()
+        last_event_id = StreamEvent.objects.latest('id').id
+        missed = self.create_task('Missed')
+        self.broker.poll()
+
+        # Resuming on a process that never served this client
+        events, overflowed = ChangeBroker().subscribe(self.owner.id, [self.project.id], last_event_id).get(timeout=0)
+        self.assertFalse(overflowed)
+        self.assertEqual([event.data['id'] for event in events], [missed.id])
+
+    def test_pruned_or_unknown_last_event_id_resets(self):
+        self.create_task('Old')
+        self.broker.poll()
+        latest = StreamEvent.objects.latest('id').id
+        StreamEvent.objects.all().delete()
+        self.assertTrue(self.subscribe(self.owner, last_event_id=latest - 1).get(timeout=0)[1])
+        self.assertTrue(self.subscribe(self.owner, last_event_id=latest + 100).get(timeout=0)[1])
+
+    def test_late_commits_behind_the_cursor_are_still_delivered(self):
+        subscription = self.subscribe(self.owner)
+        first = publish('task.updated', {'id': 1}, project_id=self.project.id)
+        # An id taken by a transaction that commits after the next one
+        StreamEvent.objects.create(id=first.id + 2, event_type='task.updated', data={'id': 3}, project_id=self.project.id)
+        self.broker.poll()
+        StreamEvent.objects.create(id=first.id + 1, event_type='task.updated', data={'id': 2}, project_id=self.project.id)
+        self.broker.poll()
+
+        events, _ = subscription.get(timeout=0)
+        self.assertEqual([event.data['id'] for event in events], [1, 3, 2])
+        self.assertEqual(self.broker.counters()['late'], 1)
+
+    @override_settings(CHANGE_STREAM={'MAX_STREAMS_PER_PROCESS': 0, 'POLLER': False})
+    def test_streams_past_the_process_limit_are_refused(self):
+        client = APIClient()
+        client.force_authenticate(self.owner)
+        response = client.get('/api/stream/', HTTP_ACCEPT='application/json')
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('Retry-After', response)
+
+
+class AnalyticsBufferTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('buffered', 'buffered@example.com', 'Passw0rd!')
+        cls.staff = User.objects.create_user('staff', 'staff@example.com', 'Passw0rd!', is_staff=True)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.event = {'event_type': 'task_updated', 'entity_type': 'task', 'entity_id': 7}
+
+    def test_synchronous_write_returns_the_created_event(self):
+        response = self.client.post('/api/events/', self.event, format='json')
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['id'], AnalyticsEvent.objects.get().id)
+        self.assertIsNotNone(response.data['data']['timestamp'])
+
+    @override_settings(ANALYTICS_BUFFER={'ENABLED': True, 'BATCH_SIZE': 1000, 'FLUSH_INTERVAL_MS': 600000})
+    def test_buffered_write_is_accepted_and_flushed_later(self):
+        response = self.client.post('/api/events/', self.event, format='json')
+        self.assertEqual(response.status_code, 202)
+        self.assertIsNone(response.data['data']['id'])
+        self.assertIsNotNone(response.data['data']['timestamp'])
+        self.assertFalse(AnalyticsEvent.objects.exists())
+
+        self.assertEqual(analytics_buffer.flush(), 1)
+        self.assertEqual(AnalyticsEvent.objects.get().entity_id, 7)
+
+    @override_settings(ANALYTICS_BUFFER={'ENABLED': True, 'MAX_QUEUE_SIZE': 0, 'FLUSH_INTERVAL_MS': 600000})
+    def test_full_queue_is_reported(self):
+        dropped = analytics_buffer.counters()['dropped']
+        self.assertEqual(self.client.post('/api/events/', self.event, format='json').status_code, 503)
+        self.assertEqual(analytics_buffer.counters()['dropped'], dropped + 1)
+
+    def test_metrics_are_staff_only(self):
+        self.assertEqual(self.client.get('/api/metrics/').status_code, 403)
+        self.client.force_authenticate(self.staff)
+        response = self.client.get('/api/metrics/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('pending', response.data['data']['analytics_buffer'])
+
+
+@override_settings(ACTIVITY_TRACKER={'ENABLED': True, 'COALESCE_SECONDS': 60})
+class ActivityTrackerTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.idle = timezone.now() - timedelta(hours=1)
+        cls.user = User.objects.create_user('active', 'active@example.com', last_active=cls.idle)
+        cls.other = User.objects.create_user('active-2', 'active-2@example.com', last_active=cls.idle)
+
+    def setUp(self):
+        super().setUp()
+        self.tracker = ActivityTracker()
+        # Flushed by hand: a flusher thread would write through its own connection
+        patcher = mock.patch.object(BackgroundFlusher, 'ensure_started')
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_touches_within_the_window_coalesce(self):
+        now = timezone.now()
+        self.assertTrue(self.tracker.touch(self.user, now))
+        self.assertFalse(self.tracker.touch(self.user, now + timedelta(seconds=10)))
+        self.assertFalse(self.tracker.touch(self.user, now + timedelta(seconds=59)))
+        self.assertEqual(self.tracker.pending(), 1)
+        self.assertEqual(self.tracker.counters()['coalesced'], 2)
+        self.assertTrue(self.tracker.touch(self.user, now + timedelta(seconds=60)))
+        self.assertEqual(self.tracker.pending(), 1)
+
+    def test_flush_is_one_update_that_never_moves_backwards(self):
+        seen = timezone.now()
+        self.tracker.touch(self.user, seen)
+        self.tracker.touch(self.other, seen)
+        # A login stamped after the touch must survive the flush
+        later = seen + timedelta(minutes=5)
+        User.objects.filter(pk=self.other.pk).update(last_active=later)
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(self.tracker.flush(), 2)
+        self.assertEqual(len(queries), 1)
+        self.assertTrue(queries[0]['sql'].startswith('UPDATE'))
+        self.assertEqual(User.objects.get(pk=self.user.pk).last_active, seen)
+        self.assertEqual(User.objects.get(pk=self.other.pk).last_active, later)
+        self.assertEqual(self.tracker.pending(), 0)
+
+    def test_flush_bumps_fragment_versions(self):
+        before = fragment_versions('core.user', [self.user.pk, self.other.pk])
+        self.tracker.touch(self.user)
+        self.tracker.flush()
+        after = fragment_versions('core.user', [self.user.pk, self.other.pk])
+        self.assertNotEqual(after[self.user.pk], before[self.user.pk])
+        self.assertEqual(after[self.other.pk], before[self.other.pk])
+
+    def test_middleware_touches_authenticated_requests_only(self):
+        client = APIClient()
+        with mock.patch('core.middleware.activity_tracker', self.tracker):
+            self.assertEqual(client.get('/api/projects/').status_code, 401)
+            self.assertEqual(self.tracker.pending(), 0)
+            client.force_authenticate(self.user)
+            self.assertEqual(client.get('/api/projects/').status_code, 200)
+        self.assertEqual(self.tracker.pending(), 1)
+        self.tracker.flush()
+        self.assertGreater(User.objects.get(pk=self.user.pk).last_active, self.idle)
+
+
+class AnalyticsParameterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('params', 'params@example.com', 'Passw0rd!')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def assertRejected(self, url, message):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['message'], message)
+
+    def test_dashboard_days_are_bounded(self):
+        self.assertRejected('/api/events/dashboard/?days=99999999', 'days must be between 0 and 3650')
+        self.assertRejected('/api/events/dashboard/?days=-1', 'days must be between 0 and 3650')
+        self.assertRejected('/api/events/dashboard/?days=abc', 'days must be an integer')
+        self.assertRejected('/api/events/dashboard/?periods=0', 'periods must be between 1 and 366')
+        self.assertEqual(self.client.get('/api/events/dashboard/?days=3650').status_code, 200)
+
+    def test_task_analytics_days_are_parsed_and_bounded(self):
+        self.assertRejected('/api/events/task-analytics/?days=abc', 'days must be an integer')
+        self.assertRejected('/api/events/task-analytics/?days=99999999', 'days must be between 0 and 3650')
+        self.assertEqual(self.client.get('/api/events/task-analytics/?days=7').status_code, 200)
+
+
+class RollupTests(TestCase):
+    """Rollups are recomputed by event time, so late events are counted"""
+
+    now = datetime(2026, 3, 10, 12, 30, tzinfo=dt_timezone.utc)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('rolled', 'rolled@example.com', 'Passw0rd!')
+
+    def log(self, hours_ago, event_type='task_created'):
+        return AnalyticsEvent.objects.create(
+            user=self.user, event_type=event_type, entity_type='task', entity_id=1,
+            timestamp=self.now - timedelta(hours=hours_ago),
+        )
+
+    def counts(self, start):
+        return {row['event_type']: row['count'] for row in event_counts(self.user, start, ('event_type',))}
+
+    def test_counts_match_raw_events_across_rollup_boundaries(self):
+        for hours_ago in (0.1, 2, 13, 30, 30.5, 80):
+            self.log(hours_ago)
+        self.log(40, 'task_completed')
+        self.assertEqual(roll_up_events(now=self.now), 6)
+        self.assertEqual(get_watermark(), datetime(2026, 3, 10, 12, tzinfo=dt_timezone.utc))
+        self.log(0.2)
+
+        for days in (1, 2, 5):
+            start = self.now - timedelta(days=days, minutes=7)
+            raw = AnalyticsEvent.objects.filter(timestamp__gte=start)
+            self.assertEqual(self.counts(start), {
+                event_type: raw.filter(event_type=event_type).count()
+                for event_type in set(raw.values_list('event_type', flat=True))
+            })
+
+    def test_late_events_within_the_lag_are_rolled_up(self):
+        self.log(3)
+        roll_up_events(now=self.now)
+        # Flushed by the write-behind buffer after its hour was rolled up
+        self.log(3)
+        self.assertEqual(roll_up_events(now=self.now), 2)
+        bucket = datetime(2026, 3, 10, 9, tzinfo=dt_timezone.utc)
+        self.assertEqual(HourlyAnalyticsRollup.objects.get(bucket=bucket).count, 2)
+        self.assertEqual(self.counts(self.now - timedelta(days=1)), {'task_created': 2})
+
+    def test_rerunning_does_not_double_count(self):
+        self.log(5)
+        roll_up_events(now=self.now)
+        roll_up_events(now=self.now)
+        self.assertEqual(HourlyAnalyticsRollup.objects.get().count, 1)
+        self.assertEqual(self.counts(self.now - timedelta(days=1)), {'task_created': 1})
+
+
+class BatchIngestTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('batch', 'batch@example.com', 'Passw0rd!')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def post(self, body, content_type, url='/api/events/batch/'):
+        return self.client.generic('POST', url, body, content_type=content_type)
+
+    def test_json_array_is_written_in_one_insert_and_errors_reported_by_index(self):
+        events = [
+            {'event_type': 'task_created', 'entity_type': 'task', 'entity_id': 1, 'metadata': {'project_id': 4}},
+            {'event_type': 'bogus', 'entity_type': 'task', 'entity_id': 2},
+            {'event_type': 'task_moved', 'entity_type': 'task', 'entity_id': '3', 'timestamp': '2026-01-02T03:04:05Z'},
+        ]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post(json.dumps({'events': events}), 'application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (2, 1))
+        self.assertEqual(response.data['errors'][0]['index'], 1)
+        self.assertEqual(len([query for query in queries if query['sql'].startswith('INSERT')]), 1)
+        stored = AnalyticsEvent.objects.get(entity_id=3)
+        self.assertEqual(stored.timestamp, datetime(2026, 1, 2, 3, 4, 5, tzinfo=dt_timezone.utc))
+        self.assertEqual(AnalyticsEvent.objects.get(entity_id=1).project_id, 4)
+
+    def test_ndjson_is_chosen_by_content_type_or_query(self):
+        body = '{"event_type": "task_created", "entity_type": "task", "entity_id": 1}\nnot json\n'
+        response = self.post(body, 'application/x-ndjson')
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (1, 1))
+        response = self.post(body, 'text/plain', url='/api/events/batch/?ndjson=1')
+        self.assertEqual((response.data['accepted'], response.data['rejected']), (1, 1))
+
+    def test_malformed_json_is_rejected(self):
+        body = '[{"event_type": "task_created",\n "entity_type": "task", "entity_id": 1}'
+        for content_type in ('application/json', 'text/plain'):
+            response = self.post(body, content_type)
+            self.assertEqual(response.status_code, 400)
+            self.assertTrue(response.data['message'].startswith('Invalid JSON'))
+        self.assertFalse(AnalyticsEvent.objects.exists())
+
+
+class TaskListQueryTests(TestCase):
+    """The planned task list runs a fixed number of queries however many tasks it renders"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('planner', 'planner@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Planned', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+        TaskViewSet.compiled_list = False
+        self.addCleanup(setattr, TaskViewSet, 'compiled_list', True)
+
+    def add_tasks(self, count):
+        for index in range(Task.objects.count(), Task.objects.count() + count):
+            assignee = User.objects.create_user(f'planned{index}', f'planned{index}@example.com', 'Passw0rd!')
+            ProjectMember.objects.create(project=self.project, user=assignee)
+            task = Task.objects.create(
+                title=f'Planned {index}', project=self.project, created_by=self.manager,
+                assignee=assignee, due_date=date.today(),
+            )
+            TaskComment.objects.create(task=task, user=assignee, content='Seen')
+
+    def list_queries(self, url):
+        # Rendered fragments would hide the queries on the second request
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def test_query_count_does_not_grow_with_tasks(self):
+        for url in ('/api/tasks/?page_size=100', '/api/tasks/?page_size=100&fields=id,assignee.username,comment_count'):
+            with self.subTest(url=url):
+                self.add_tasks(2)
+                few = self.list_queries(url)
+                self.add_tasks(6)
+                self.assertEqual(self.list_queries(url), few)
+
+
+class KeysetPaginationTests(TestCase):
+    """Cursor pages neither repeat nor skip rows when rows are inserted between requests"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('pager', 'pager@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Paged', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        for index in range(7):
+            cls.create_task(f'Paged {index}', date(2026, 5, 1 + index % 2))
+
+    @classmethod
+    def create_task(cls, title, due_date):
+        return Task.objects.create(title=title, project=cls.project, created_by=cls.manager, due_date=due_date)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_inserts_between_pages_do_not_shift_the_cursor(self):
+        for ordering in ('-created_at', 'due_date'):
+            with self.subTest(ordering=ordering):
+                expected = list(Task.objects.order_by(ordering, 'id').values_list('id', flat=True))
+                page = self.get(f'/api/tasks/?cursor=&page_size=3&ordering={ordering}&fields=id')
+                seen = [task['id'] for task in page['results']]
+                # Sorts first under -created_at, and among the ties under due_date
+                self.create_task('Inserted', date(2026, 5, 1))
+                while page['next']:
+                    page = self.get(page['next'])
+                    seen.extend(task['id'] for task in page['results'])
+                self.assertEqual([task_id for task_id in seen if task_id in expected], expected)
+                self.assertEqual(len(seen), len(set(seen)))
+
+    def test_previous_link_returns_the_earlier_page(self):
+        first = self.get('/api/tasks/?cursor=&page_size=3&fields=id')
+        second = self.get(first['next'])
+        self.assertEqual(self.get(second['previous'])['results'], first['results'])
+
+    def test_tampered_cursor_is_rejected(self):
+        self.assertEqual(self.client.get('/api/tasks/?cursor=not-a-cursor').status_code, 404)
+
+
+class TaskAccessTests(TestCase):
+    """The materialized visibility table follows memberships and task moves"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('access', 'access@example.com', 'Passw0rd!', role='scrum_master')
+        cls.employee = User.objects.create_user('access-emp', 'access-emp@example.com', 'Passw0rd!')
+        cls.project, cls.other = [
+            Project.objects.create(
+                name=name, description='', created_by=cls.manager,
+                start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            )
+            for name in ('Visible', 'Elsewhere')
+        ]
+        for project in (cls.project, cls.other):
+            ProjectMember.objects.create(project=project, user=cls.manager, role='admin')
+        cls.task = Task.objects.create(title='Guarded', project=cls.project, created_by=cls.manager, due_date=date.today())
+
+    def assertVisible(self, visible):
+        self.assertEqual(visible_tasks(self.employee).filter(pk=self.task.pk).exists(), visible)
+        self.assertEqual(sync_task_access(Task.objects.values_list('id', flat=True), dry_run=True), (0, 0))
+
+    def test_member_add_and_remove(self):
+        self.assertVisible(False)
+        membership = ProjectMember.objects.create(project=self.project, user=self.employee)
+        self.assertVisible(True)
+        client = APIClient()
+        client.force_authenticate(self.employee)
+        self.assertEqual(client.get(f'/api/tasks/{self.task.pk}/').status_code, 200)
+        membership.delete()
+        self.assertVisible(False)
+        self.assertEqual(client.get(f'/api/tasks/{self.task.pk}/').status_code, 404)
+
+    def test_creator_keeps_access_after_leaving(self):
+        membership = ProjectMember.objects.create(project=self.project, user=self.employee)
+        self.task = Task.objects.create(title='Own', project=self.project, created_by=self.employee, due_date=date.today())
+        membership.delete()
+        self.assertVisible(True)
+
+    def test_moving_a_task_follows_the_new_project_members(self):
+        ProjectMember.objects.create(project=self.other, user=self.employee)
+        self.assertVisible(False)
+        self.task.project = self.other
+        self.task.save()
+        self.assertVisible(True)
+
+
+class TaskSearchTests(TestCase):
+    """The FTS index follows task and comment writes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('finder', 'finder@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Searched', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        cls.task = Task.objects.create(
+            title='Refactor billing', description='Split the invoice module', project=cls.project,
+            created_by=cls.manager, due_date=date.today(),
+        )
+
+    def search(self, text):
+        return list(search_tasks(Task.objects.all(), text).values_list('id', flat=True))
+
+    def test_index_is_used(self):
+        self.assertTrue(fts_available())
+
+    def test_update_replaces_indexed_text(self):
+        self.assertEqual(self.search('invoi'), [self.task.id])
+        self.task.title = 'Rewrite payments'
+        self.task.description = ''
+        self.task.save()
+        self.assertEqual(self.search('billing'), [])
+        self.assertEqual(self.search('invoice'), [])
+        self.assertEqual(self.search('payments'), [self.task.id])
+
+    def test_comments_are_indexed_until_deleted(self):
+        comment = TaskComment.objects.create(task=self.task, user=self.manager, content='Blocked on the ledger export')
+        self.assertEqual(self.search('ledger'), [self.task.id])
+        comment.delete()
+        self.assertEqual(self.search('ledger'), [])
+
+    def test_deleted_task_is_not_found(self):
+        self.task.delete()
+        self.assertEqual(self.search('billing'), [])
+
+    def test_title_matches_rank_above_description_matches(self):
+        other = Task.objects.create(
+            title='Invoice export', description='', project=self.project, created_by=self.manager, due_date=date.today(),
+        )
+        ranked = search_tasks(Task.objects.all(), 'invoice').order_by('search_rank')
+        self.assertEqual(list(ranked.values_list('id', flat=True)), [other.id, self.task.id])
+
+
+class BulkTaskTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('bulker', 'bulker@example.com', 'Passw0rd!', role='scrum_master')
+        cls.employee = User.objects.create_user('bulk-emp', 'bulk-emp@example.com', 'Passw0rd!')
+        cls.project, cls.other = [
+            Project.objects.create(
+                name=name, description='', created_by=cls.manager,
+                start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+            )
+            for name in ('Bulk', 'Bulk target')
+        ]
+        for project in (cls.project, cls.other):
+            ProjectMember.objects.create(project=project, user=cls.manager, role='admin')
+        ProjectMember.objects.create(project=cls.project, user=cls.employee)
+        cls.tasks = [
+            Task.objects.create(
+                title=f'Bulk {index}', project=cls.project, created_by=cls.manager,
+                assignee=cls.employee if index == 0 else None, due_date=date.today(),
+            )
+            for index in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def bulk(self, operations, atomic=False):
+        return self.client.post('/api/tasks/bulk/', {'operations': operations, 'atomic': atomic}, format='json')
+
+    def test_valid_operations_are_applied_and_failures_reported(self):
+        first, second, third = self.tasks
+        response = self.bulk([
+            {'id': first.id, 'status': 'done'},
+            {'id': second.id, 'project_id': self.other.id, 'priority': 'urgent'},
+            {'id': third.id, 'status': 'bogus'},
+            {'id': 999999, 'status': 'done'},
+        ])
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['updated'], response.data['failed']), (2, 2))
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok', 'ok', 'error', 'error'])
+
+        first.refresh_from_db()
+        second.refresh_from_db()
+        self.assertEqual(first.status, 'done')
+        self.assertIsNotNone(first.completed_at)
+        self.assertEqual((second.project_id, second.priority), (self.other.id, 'urgent'))
+        events = AnalyticsEvent.objects.filter(entity_type='task').order_by('entity_id')
+        self.assertEqual(list(events.values_list('event_type', flat=True)), ['task_completed', 'task_updated'])
+        for project in (self.project, self.other):
+            counter = ProjectTaskCounter.objects.get(project=project)
+            tasks = Task.objects.filter(project=project)
+            self.assertEqual((counter.total, counter.done), (tasks.count(), tasks.filter(status='done').count()))
+        self.assertEqual(sync_task_access([second.id], dry_run=True), (0, 0))
+
+    def test_atomic_batch_writes_nothing_when_one_operation_fails(self):
+        response = self.bulk([{'id': self.tasks[0].id, 'status': 'done'}, {'id': self.tasks[1].id, 'status': 'bogus'}], atomic=True)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['results'][0]['status'], 'skipped')
+        self.assertFalse(Task.objects.filter(status='done').exists())
+
+    def test_employees_may_only_move_their_own_tasks(self):
+        self.client.force_authenticate(self.employee)
+        response = self.bulk([
+            {'id': self.tasks[0].id, 'status': 'review'},
+            {'id': self.tasks[0].id, 'priority': 'low'},
+            {'id': self.tasks[1].id, 'status': 'review'},
+        ])
+        self.assertEqual([result['status'] for result in response.data['results']], ['ok', 'error', 'error'])
+
+    def test_assignee_must_be_a_member_of_the_target_project(self):
+        response = self.bulk([{'id': self.tasks[0].id, 'project_id': self.other.id}])
+        self.assertEqual(response.data['results'][0]['status'], 'error')
+        self.assertEqual(Task.objects.get(pk=self.tasks[0].id).project_id, self.project.id)
+
+
+class DeltaSyncTests(TestCase):
+    """Every write path journals what the delta sync needs to replay"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('syncer', 'syncer@example.com', 'Passw0rd!', role='scrum_master')
+        cls.employee = User.objects.create_user('sync-emp', 'sync-emp@example.com', 'Passw0rd!')
+        cls.project = Project.objects.create(
+            name='Synced', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        cls.membership = ProjectMember.objects.create(project=cls.project, user=cls.employee)
+        cls.tasks = [
+            Task.objects.create(title=f'Synced {index}', project=cls.project, created_by=cls.manager, due_date=date.today())
+            for index in range(2)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.employee)
+        snapshot = self.changes()
+        self.assertTrue(snapshot['reset'])
+        self.assertEqual({task['id'] for task in snapshot['tasks']}, {task.id for task in self.tasks})
+        self.cursor = snapshot['cursor']
+
+    def changes(self, since=None):
+        response = self.client.get('/api/sync/changes/', {'since': since} if since else {})
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def delta(self):
+        data = self.changes(self.cursor)
+        self.assertFalse(data['reset'])
+        self.cursor = data['cursor']
+        return data
+
+    def test_nothing_changed(self):
+        data = self.delta()
+        self.assertEqual((data['tasks'], data['projects'], data['deleted']['tasks']), ([], [], []))
+
+    def test_update_and_delete_are_replayed(self):
+        first, second = self.tasks
+        first.title = 'Renamed'
+        first.save()
+        deleted_id = second.id
+        second.delete()
+        data = self.delta()
+        self.assertEqual([task['title'] for task in data['tasks']], ['Renamed'])
+        self.assertEqual(data['deleted']['tasks'], [deleted_id])
+
+    def test_bulk_update_is_journaled(self):
+        manager = APIClient()
+        manager.force_authenticate(self.manager)
+        manager.post('/api/tasks/bulk/', {'operations': [{'id': self.tasks[0].id, 'status': 'review'}]}, format='json')
+        self.assertEqual([task['status'] for task in self.delta()['tasks']], ['review'])
+
+    def test_leaving_a_project_tombstones_its_rows(self):
+        membership_id = self.membership.id
+        self.membership.delete()
+        data = self.delta()
+        self.assertEqual(data['deleted']['tasks'], sorted(task.id for task in self.tasks))
+        self.assertEqual(data['deleted']['projects'], [self.project.id])
+        self.assertIn(membership_id, data['deleted']['memberships'])
+
+    def test_creator_outside_the_project_keeps_syncing_own_task(self):
+        own = Task.objects.create(title='Own', project=self.project, created_by=self.employee, due_date=date.today())
+        self.membership.delete()
+        self.assertEqual([task['id'] for task in self.delta()['tasks']], [own.id])
+        own.title = 'Renamed own'
+        own.save()
+        self.assertEqual([task['title'] for task in self.delta()['tasks']], ['Renamed own'])
+        own_id = own.id
+        own.delete()
+        self.assertEqual(self.delta()['deleted']['tasks'], [own_id])
+
+    def test_only_embedded_user_fields_are_journaled(self):
+        before = SyncChange.objects.count()
+        self.manager.update_last_active()
+        self.manager.lock_account()
+        self.manager.unlock_account()
+        self.assertEqual(SyncChange.objects.count(), before)
+        self.manager.job_title = 'Lead'
+        self.manager.save()
+        self.assertEqual({task['created_by']['job_title'] for task in self.delta()['tasks']}, {'Lead'})
+
+    def test_unknown_cursor_resets(self):
+        self.assertTrue(self.changes(int(self.cursor) + 100)['reset'])
+        self.assertEqual(self.client.get('/api/sync/changes/', {'since': 'abc'}).status_code, 400)
+
+
+class DashboardAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('dash', 'dash@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Dashboarded', description='', created_by=cls.user,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        now = timezone.now()
+        for days_ago, event_type, entity_type in (
+            (0, 'task_created', 'task'), (0, 'task_completed', 'task'), (1, 'task_created', 'task'),
+            (1, 'project_updated', 'project'), (2, 'task_moved', 'task'), (40, 'task_created', 'task'),
+        ):
+            AnalyticsEvent.objects.create(
+                user=cls.user, event_type=event_type, entity_type=entity_type,
+                entity_id=cls.project.id if entity_type == 'project' else 1,
+                metadata={'project_id': cls.project.id} if entity_type == 'project' else {},
+                timestamp=now - timedelta(days=days_ago),
+            )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def dashboard(self, query):
+        response = self.client.get(f'/api/events/dashboard/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_summary_and_buckets(self):
+        data = self.dashboard('days=30&periods=3')
+        self.assertEqual(data['summary'], {
+            'task_created': 2, 'task_completed': 1, 'task_moved': 1, 'project_created': 0, 'total_events': 5,
+        })
+        today = timezone.now().date()
+        activity = {bucket['date']: (bucket['events'], bucket['task_created']) for bucket in data['activity_over_time']}
+        self.assertEqual(activity, {
+            today.isoformat(): (2, 1),
+            (today - timedelta(days=1)).isoformat(): (2, 1),
+            (today - timedelta(days=2)).isoformat(): (1, 0),
+        })
+        self.assertEqual(data['most_active_projects'], [
+            {'entity_id': self.project.id, 'count': 1, 'project_name': 'Dashboarded'},
+        ])
+
+    def test_query_count_does_not_grow_with_the_window(self):
+        def queries(query):
+            with CaptureQueriesContext(connection) as captured:
+                self.dashboard(query)
+            return len(captured)
+
+        self.assertEqual(queries('days=7&periods=2'), queries('days=365&periods=52&granularity=week'))
+
+
+class TaskTimeMetricsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('timed', 'timed@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Timed', description='', created_by=cls.user,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        created = datetime(2026, 2, 1, 9, tzinfo=dt_timezone.utc)
+        for title, priority, started, lead in (
+            ('Started', 'high', 2, 10),
+            ('Never started', 'high', None, 20),
+            ('Quick', 'low', 1, 4),
+            ('Open', 'low', 1, None),
+        ):
+            task = Task.objects.create(
+                title=title, priority=priority, project=cls.project, created_by=cls.user, due_date=date.today(),
+            )
+            completed_at = created + timedelta(hours=lead) if lead else None
+            Task.objects.filter(pk=task.pk).update(created_at=created, completed_at=completed_at, status='done' if lead else 'todo')
+            if started is not None:
+                AnalyticsEvent.objects.create(
+                    user=cls.user, event_type='task_moved', entity_type='task', entity_id=task.pk,
+                    metadata={'from_status': 'todo', 'to_status': 'in-progress'},
+                    timestamp=created + timedelta(hours=started),
+                )
+
+    def test_lead_and_cycle_time(self):
+        metrics = task_time_metrics(Task.objects.all())
+        lead, cycle = metrics['lead_time'], metrics['cycle_time']
+        self.assertEqual((lead['overall']['count'], lead['overall']['mean'], lead['overall']['p50']), (3, 11.33, 10.0))
+        # A task never moved to in-progress has no cycle time
+        self.assertEqual((cycle['overall']['count'], cycle['overall']['mean']), (2, 5.5))
+        self.assertEqual(
+            [(group['priority'], group['count'], group['mean']) for group in lead['by_priority']],
+            [('high', 2, 15.0), ('low', 1, 4.0)],
+        )
+
+    def test_no_completed_tasks(self):
+        metrics = task_time_metrics(Task.objects.filter(completed_at__isnull=True))
+        self.assertEqual(metrics['lead_time']['overall'], {'count': 0, 'mean': None, 'p50': None, 'p90': None, 'p99': None})
+        self.assertEqual(metrics['cycle_time']['by_project'], [])
+
+
+class PromotedMetadataTests(TestCase):
+    """Hot metadata keys are kept in indexed columns for every write path"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('promoted', 'promoted@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Promoted', description='', created_by=cls.user,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.user, role='admin')
+
+    def log(self, **fields):
+        return AnalyticsEvent.objects.create(user=self.user, event_type='task_moved', entity_type='task', entity_id=1, **fields)
+
+    def columns(self, event):
+        event.refresh_from_db()
+        return tuple(getattr(event, field) for field in AnalyticsEvent.PROMOTED_FIELDS)
+
+    def test_save_copies_metadata_into_columns(self):
+        event = self.log(metadata={'project_id': str(self.project.id), 'from_status': 'todo', 'to_status': 'done', 'priority': 'high'})
+        self.assertEqual(self.columns(event), (self.project.id, 'todo', 'done', 'high'))
+        self.assertEqual(self.columns(self.log(metadata={'project_id': 'n/a'})), (None, '', '', ''))
+        project_event = AnalyticsEvent.objects.create(
+            user=self.user, event_type='project_updated', entity_type='project', entity_id=self.project.id,
+        )
+        self.assertEqual(self.columns(project_event)[0], self.project.id)
+
+    def test_status_change_endpoint_fills_the_columns(self):
+        task = Task.objects.create(title='Moved', project=self.project, created_by=self.user, due_date=date.today())
+        client = APIClient()
+        client.force_authenticate(self.user)
+        response = client.post(f'/api/tasks/{task.id}/change_status/', {'status': 'review'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        event = AnalyticsEvent.objects.get(entity_id=task.id, event_type='task_moved')
+        self.assertEqual(self.columns(event), (self.project.id, 'todo', 'review', 'medium'))
+
+    def test_backfill_fills_rows_written_before_the_columns(self):
+        event = self.log(metadata={'to_status': 'review'})
+        AnalyticsEvent.objects.filter(pk=event.pk).update(to_status='')
+        call_command('backfill_analytics_columns', chunk_size=1, stdout=StringIO())
+        self.assertEqual(self.columns(event)[2], 'review')
+
+
+class ProjectAnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('analyst', 'analyst@example.com', 'Passw0rd!', role='scrum_master')
+        cls.member = User.objects.create_user('analysed', 'analysed@example.com', 'Passw0rd!')
+        cls.outsider = User.objects.create_user('unanalysed', 'unanalysed@example.com', 'Passw0rd!')
+        cls.project = Project.objects.create(
+            name='Analysed', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        ProjectMember.objects.create(project=cls.project, user=cls.member)
+        for status, assignee, due_in in (
+            ('todo', cls.member, -2), ('in-progress', cls.member, 3), ('done', cls.member, -5), ('todo', None, 10),
+        ):
+            task = Task.objects.create(
+                title=f'Analysed {status}', project=cls.project, created_by=cls.manager,
+                assignee=assignee, due_date=date.today() + timedelta(days=due_in),
+            )
+            Task.objects.filter(pk=task.pk).update(status=status)
+        cls.url = f'/api/analytics/project/{cls.project.id}/?periods=7'
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def analytics(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return response.data['data']
+
+    def test_breakdown_and_workload(self):
+        data = self.analytics()
+        self.assertEqual((data['total_tasks'], data['open_tasks'], data['overdue_tasks'], data['due_this_week']), (4, 3, 1, 1))
+        self.assertEqual(data['status_breakdown'], {'todo': 2, 'in-progress': 1, 'review': 0, 'done': 1})
+        self.assertEqual(data['progress_percentage'], 25.0)
+        workload = {row['username']: (row['total'], row['open'], row['overdue']) for row in data['workload']}
+        self.assertEqual(workload, {'analysed': (3, 2, 1), 'analyst': (0, 0, 0)})
+        self.assertEqual(data['unassigned'], {'total': 1, 'open': 1})
+        self.assertEqual(len(data['throughput']), 7)
+
+    def test_cached_until_a_task_write(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                total = self.analytics()['total_tasks']
+            return total, len(captured)
+
+        computed = queries()
+        cached = queries()
+        self.assertLess(cached[1], computed[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            Task.objects.create(title='Late addition', project=self.project, created_by=self.manager, due_date=date.today())
+        self.assertEqual(queries(), (5, computed[1]))
+
+    def test_process_local_cache_keeps_results_briefly(self):
+        for shared, timeout in ((False, LOCAL_CACHE_TIMEOUT), (True, CACHE_TIMEOUT)):
+            cache.clear()
+            with mock.patch('core.project_stats.cache_is_shared', return_value=shared), \
+                    mock.patch('core.project_stats.cache.set', wraps=cache.set) as cache_set:
+                self.analytics()
+            self.assertEqual(cache_set.call_args.args[2], timeout)
+
+    def test_invisible_project_is_not_found(self):
+        self.client.force_authenticate(self.outsider)
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+
+class SlimProjectListTests(TestCase):
+    """?view=slim rows stay bounded however many members a project has"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('slim', 'slim@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Crowded', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        cls.add_members(cls.project, MEMBER_PREVIEW_SIZE + 3)
+        Task.objects.create(title='Counted', project=cls.project, created_by=cls.manager, due_date=date.today())
+
+    @classmethod
+    def add_members(cls, project, count):
+        start = User.objects.count()
+        for index in range(start, start + count):
+            user = User.objects.create_user(f'crowd{index}', f'crowd{index}@example.com')
+            ProjectMember.objects.create(project=project, user=user)
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def projects(self, query=''):
+        response = self.client.get(f'/api/projects/?{query}')
+        self.assertEqual(response.status_code, 200)
+        return {project['id']: project for project in response.data}
+
+    def test_slim_rows_cap_the_member_preview(self):
+        slim = self.projects('view=slim')[self.project.id]
+        full = self.projects()[self.project.id]
+        self.assertEqual(len(slim['member_ids']), MEMBER_PREVIEW_SIZE + 4)
+        self.assertEqual([member['id'] for member in slim['members_preview']], slim['member_ids'][:MEMBER_PREVIEW_SIZE])
+        self.assertNotIn('members', slim)
+        self.assertEqual((slim['task_count'], slim['member_count']), (full['task_count'], full['member_count']))
+
+    def test_query_count_does_not_grow_with_projects_or_members(self):
+        def queries():
+            with CaptureQueriesContext(connection) as captured:
+                self.projects('view=slim')
+            return len(captured)
+
+        before = queries()
+        other = Project.objects.create(
+            name='Also crowded', description='', created_by=self.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        self.add_members(other, 4)
+        self.add_members(self.project, 4)
+        self.assertEqual(queries(), before)
+
+
+class SparseFieldsetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.manager = User.objects.create_user('sparse', 'sparse@example.com', 'Passw0rd!', role='scrum_master')
+        cls.project = Project.objects.create(
+            name='Sparse', description='', created_by=cls.manager,
+            start_date=date(2026, 1, 1), end_date=date(2026, 12, 31),
+        )
+        ProjectMember.objects.create(project=cls.project, user=cls.manager, role='admin')
+        cls.task = Task.objects.create(
+            title='Sparse task', project=cls.project, created_by=cls.manager, assignee=cls.manager, due_date=date.today(),
+        )
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.manager)
+
+    def get(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_fields_select_top_level_and_nested_fields(self):
+        url = f'/api/tasks/{self.task.id}/'
+        self.assertEqual(self.get(f'{url}?fields=id,title'), {'id': self.task.id, 'title': 'Sparse task'})
+        self.assertEqual(self.get(f'{url}?fields=id,assignee.username')['assignee'], {'username': 'sparse'})
+        projects = self.get('/api/projects/?fields=id,name')
+        self.assertEqual(projects, [{'id': self.project.id, 'name': 'Sparse'}])
+
+    def test_expand_collapses_other_relations_to_ids(self):
+        url = f'/api/tasks/{self.task.id}/'
+        collapsed = self.get(f'{url}?expand=')
+        self.assertEqual((collapsed['assignee'], collapsed['project']), (self.manager.id, self.project.id))
+        expanded = self.get(f'{url}?expand=assignee')
+        self.assertEqual((expanded['assignee']['username'], expanded['project']), ('sparse', self.project.id))
+
+    def test_sparse_lists_run_fewer_queries(self):
+        def queries(query):
+            cache.clear()
+            with CaptureQueriesContext(connection) as captured:
+                self.get(f'/api/tasks/?{query}')
+            return len(captured)
+
+        self.assertLess(queries('fields=id,title'), queries(''))
+
+    def test_writes_ignore_the_selection(self):
+        response = self.client.patch(f'/api/tasks/{self.task.id}/?fields=id', {'title': 'Renamed'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['title'], 'Renamed')
+        self.assertIn('assignee', response.data)
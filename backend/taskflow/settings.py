@@ -1,4 +1,5 @@
 import os
+import sys
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -10,6 +11,9 @@ SECRET_KEY = 'django-insecure-taskflow-development-key'
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = True
 
+# manage.py test: background writers stay off so nothing outlives the test database
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 ALLOWED_HOSTS = ['localhost', '127.0.0.1']
 
 # Application definition
@@ -44,6 +48,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.ActivityMiddleware',
 ]
 
 if DEBUG:
@@ -174,16 +179,103 @@ EMAIL_HOST_PASSWORD = ''  # Set in production
 
 # REST Framework settings
 REST_FRAMEWORK = {
+    # request.user comes from a small versioned cache instead of a query per request
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-        'rest_framework.authentication.SessionAuthentication',
-        'rest_framework.authentication.BasicAuthentication',
+        'api.authentication.CachedJWTAuthentication',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
     ],
 }
 
+# Session auth only serves the browsable API during development
+if DEBUG:
+    REST_FRAMEWORK['DEFAULT_AUTHENTICATION_CLASSES'].append('rest_framework.authentication.SessionAuthentication')
+
+# Local-memory cache, evicting least recently used entries past MAX_ENTRIES. Holds
+# the project analytics and rendered-representation fragment caches; per process,
+# so point it at a shared backend (Redis, Memcached) when running several workers.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'taskflow',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+            'CULL_FREQUENCY': 10,
+        },
+    },
+}
+
+# Set REDIS_URL (and install the redis package) to share the cache between
+# workers. Fragment versions and the JWT user cache only invalidate across
+# processes through a shared cache; with LocMem they fall back to per-row
+# timestamps and short timeouts.
+if os.environ.get('REDIS_URL'):
+    CACHES['default'] = {
+        'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+        'LOCATION': os.environ['REDIS_URL'],
+    }
+
+# Server-sent change stream (api/stream.py). Events go through the StreamEvent
+# table, so any number of worker processes can serve streams. Every open stream
+# holds a thread for up to MAX_CONNECTION_SECONDS: run threaded workers
+# (gunicorn --worker-class gthread --threads N) with N comfortably above
+# MAX_STREAMS_PER_PROCESS, so streams can't starve ordinary requests.
+CHANGE_STREAM = {
+    'HEARTBEAT_SECONDS': 15,
+    'MAX_CONNECTION_SECONDS': 300,
+    'RETRY_MILLISECONDS': 3000,
+    'BUFFER_SIZE': 256,
+    'MAX_STREAMS_PER_PROCESS': 50,
+    'POLL_INTERVAL_SECONDS': 1,
+    'HISTORY_SECONDS': 3600,
+    'GAP_TIMEOUT_SECONDS': 30,
+    'POLLER': not TESTING,
+}
+
+# Write-behind analytics (core/analytics_buffer.py). With ENABLED off every
+# event is written synchronously inside the request, as before.
+ANALYTICS_BUFFER = {
+    'ENABLED': not TESTING,
+    'MAX_QUEUE_SIZE': 10000,
+    'BATCH_SIZE': 500,
+    'FLUSH_INTERVAL_MS': 1000,
+    'OVERFLOW': 'drop',
+    'BLOCK_TIMEOUT_MS': 100,
+}
+
+# Coalesced last_active tracking (core/activity.py). At most one timestamp per
+# user per COALESCE_SECONDS, written in one batched UPDATE every
+# FLUSH_INTERVAL_SECONDS, so last_active lags by at most the sum of the two.
+ACTIVITY_TRACKER = {
+    'ENABLED': not TESTING,
+    'COALESCE_SECONDS': 60,
+    'FLUSH_INTERVAL_SECONDS': 30,
+    'BATCH_SIZE': 200,
+}
+
+# Revoked refresh tokens (core/revocation.py), checked through an in-process
+# Bloom filter that is rebuilt larger once it holds FILTER_CAPACITY entries.
+# Other processes' revocations are picked up when the shared cache says so,
+# or after SYNC_INTERVAL_SECONDS with a per-process cache.
+TOKEN_REVOCATION = {
+    'FILTER_CAPACITY': 100000,
+    'FALSE_POSITIVE_RATE': 0.001,
+    'SYNC_INTERVAL_SECONDS': 30,
+}
+
+# Sliding-window login rate limits (core/ratelimit.py), checked before any
+# password is hashed. Counters live in the default cache, so they are per
+# process with LocMem and global with a shared backend such as Redis.
+LOGIN_RATE_LIMITS = {
+    'ENABLED': True,
+    'IP_LIMIT': 30,
+    'IP_WINDOW_SECONDS': 60,
+    'IDENTIFIER_LIMIT': 10,
+    'IDENTIFIER_WINDOW_SECONDS': 900,
+    'TRUSTED_PROXIES': 0,
+}
+
 # Debug toolbar settings
 INTERNAL_IPS = ['127.0.0.1']
 
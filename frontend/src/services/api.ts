@@ -59,6 +59,10 @@ api.interceptors.response.use(
 
           const { access } = response.data
           localStorage.setItem('access', access)
+          // Refresh tokens are rotated: the one just used is revoked
+          if (response.data.refresh) {
+            localStorage.setItem('refresh', response.data.refresh)
+          }
           console.log('Token refresh successful')
 
           // Retry the original request with new token
@@ -132,6 +136,15 @@ export const authService = {
   
   logout: async () => {
     console.log('API Service: Logging out user')
+    const refresh = localStorage.getItem('refresh')
+    if (refresh) {
+      try {
+        // Revoke the refresh token server-side; local logout proceeds regardless
+        await api.post('/users/logout/', { refresh })
+      } catch (error: any) {
+        console.error('API Service: Token revocation failed', error.response?.status, error.message)
+      }
+    }
     localStorage.removeItem('access')
     localStorage.removeItem('refresh')
     localStorage.removeItem('user')
@@ -342,6 +355,7 @@ export const analyticsService = {
 
 // Events services
 export const eventsService = {
+  // 201 with the stored event, or 202 with id null while the server buffers writes
   createEvent: (eventData: Partial<AnalyticsEvent>) => api.post('/events/', eventData),
   getEvents: (params?: { event_type?: string; entity_type?: string; days?: number }) =>
     api.get('/events/list/', { params }),